@@ -1,37 +1,101 @@
 # Mic: PDM data on D12, clock on TX
-# NeoPixels: 5 on D5 (left side), 5 on D6 (right side)
-# Button: momentary on D9 to GND
+# NeoPixels: as described by /layout.txt (geometry.py); without one,
+#   5 on D5 (left side) and 5 on D6 (right side) as an upside-down U
+# Button: momentary on D9 to GND; short press = next mode, double press =
+#   previous mode, long press = next brightness level
 
+import gc
 import time
-import math
 import array
-import random
 
+import asyncio
 import board
 import audiobusio
 import neopixel
 
-from digitalio import DigitalInOut, Pull
-from adafruit_debouncer import Debouncer
+import audio_level
+import buttons
+from color_tables import load_rainbow
+from framebuffer import FrameBuffer
+from output import OutputStage, CurrentLimiter
+from transition import Crossfade
+from geometry import load_layout, u_layout
+from features import Features, make_chain
+from spectrum import SpectrumAnalyzer
+from tempo import BeatTracker, spectral_flux
+from scheduler import Ticker, pause
+import modes
+from modes import NEEDS_AUDIO, NEEDS_SPECTRUM, NEEDS_BEAT
+import profiler
+import allocguard
+import calstore
+import frametrace
 
 # -------------------------
 # Toggles / constants
 # -------------------------
 DEBUG = True          # Toggle console output here
-FPS = 60              # Main loop rate target (approx)
+FPS = 60              # Render rate target
+INPUT_PERIOD = 0.02   # how often the input task drains the button's event queue (s)
+AUDIO_IDLE_POLL = 0.05  # how often the capture task checks back while audio is unused (s)
+DSP_POLL = 0.002      # how often the DSP task looks for a finished capture (s)
+# Output stage (output.py): one per-channel table does brightness, gamma and
+# color correction on the way into the frame buffer; the strips run at 1.0
 BRIGHTNESS = 0.35
+BRIGHTNESS_STEP = 0.05   # serial "+" / "-"
+BRIGHTNESS_LEVELS = (0.1, 0.2, 0.35, 0.6, 1.0)  # long press steps through these
+GAMMA = 2.0
+COLOR_CORRECTION = (255, 255, 255)  # per-channel max, e.g. (255, 176, 240) for typical 5050 strips
+# Current limiter (output.CurrentLimiter): every frame's draw is estimated
+# from its channel sums; over budget the pushed frame is scaled down
+CURRENT_BUDGET_MA = 1500    # what the supply can give the LEDs (mA); 0 = no limit
+LED_MA_PER_CHANNEL = 20.0   # one channel at full, per pixel (WS2812B)
+LED_IDLE_MA = 1.0           # per pixel with everything off
 AUTO_WRITE = False
-
-PIN_LEFT = board.D5
-PIN_RIGHT = board.D6
+TRANSITION_TIME = 0.4  # crossfade between modes (s); 0 = hard cut through black
+
+# Stage profiler (profiler.py); Testing/ProfileDecode.py reads the reports.
+# Off in the shipping build: its ns stamps are long ints, which allocate
+# every frame.
+PROFILE = False              # per-stage timing, reported as compact @P lines
+PROFILE_REPORT_EVERY = 5.0   # seconds between reports (0 = only on the serial "p" command)
+PROFILE_HISTORY = 128        # samples kept per stage
+
+# Allocation guard (allocguard.py): per-mode heap use in steady state, as @A
+# lines on the serial "a" command. Checks the build as configured: with
+# PROFILE on, the board's count includes the profiler's long-int stamps
+# (the host model in Testing/AllocCheck.py doesn't see long ints).
+ALLOC_GUARD = False
+ALLOC_GUARD_WARMUP = 30      # frames after a mode change before counting
+
+# Feature trace (frametrace.py): FEATURE_TRACE records every frame's audio
+# features and frame buffer to a file (on the simulator, or a board with a
+# writable filesystem). FEATURE_REPLAY plays one back into the renderers
+# instead of the mic and checks every frame against the recorded one
+# (Testing/GoldenFrames.py)
+FEATURE_TRACE = None
+FEATURE_REPLAY = None
+
+LAYOUT_FILE = "/layout.txt"   # strips and pixel positions (geometry.py); the U below if missing
+LAYOUT_PINS = ("D5", "D6")    # default U: left side, right side
 N_PER_SIDE = 5
 
 BUTTON_PIN = board.D9
+# Gestures (buttons.py), timed from keypad's event timestamps
+LONG_PRESS = 0.6     # held this long (s) = long press
+DOUBLE_PRESS = 0.3   # second press within this of the first release (s) = double press;
+                     # a short press acts once this has passed. 0 = no double press
 
 MIC_CLOCK = board.TX
 MIC_DATA = board.D12
 SAMPLE_RATE = 16000
 SAMPLES = 320
+CAPTURE_CHUNK = 80    # samples per mic.record call; other tasks run between chunks (0 = whole window)
+LEVEL_BACKEND = None  # None = fastest available ("ulab", "numpy", "int")
+
+# Feature chain: "float" (reference) or "fixed" (integer math, for boards
+# without an FPU; Testing/FixedChainCheck.py compares the two)
+FEATURE_CHAIN = "float"
 
 # Audio smoothing (envelope follower)
 ATTACK = 0.55   # faster rise = more reactive
@@ -54,18 +118,74 @@ SLOW_ENV_RELEASE = 0.003
 PUNCH_BOOST = 3.5        # how much louder-than-baseline counts as a "hit"
 BAR_PEAK_FALL = 0.015    # speed of the peak marker in the bar mode
 
+# Noise gate (audio_level.NoiseGate): the first captures measure the room's
+# noise floor, which then keeps adapting slowly. Below it the sound modes
+# draw their silent frame once and stop redrawing, DSP stops at the level,
+# and auto-gain holds instead of climbing on mic hiss
+NOISE_GATE = True
+GATE_CALIBRATION = 50    # captures measured at boot (1 s of 320-sample windows)
+GATE_OPEN = 2.5          # opens above this x noise floor
+GATE_CLOSE = 1.6         # closes after GATE_HOLD captures in a row below this x noise floor
+GATE_HOLD = 50
+GATE_FLOOR_MAX = 0.003   # normalized level; cap on the floor, in case music plays through calibration
+
+# Calibration persistence (calstore.py): auto-gain, the slow baseline and the
+# noise floor come back from microcontroller.nvm at boot and are saved again
+# once they've settled, so the lights track the room from the first frame
+CAL_PERSIST = True
+CAL_SETTLE = 20.0        # seconds of uninterrupted audio before the values count as settled
+CAL_AVERAGE = 25.0       # ... then averaged over this long before a save
+CAL_SAVE_EVERY = 600.0   # at most one nvm write per this many seconds
+CAL_NVM_OFFSET = 0       # bytes into nvm
+CAL_SLOTS = 8            # records rotated through to spread the writes
+
+# Spectral bands (SOUND_BANDS / SOUND_KICK)
+FFT_SIZE = 256           # <= capture window; Testing/SpectrumBenchmark.py shows the cost per size
+N_BANDS = 5              # log-spaced between BAND_F_MIN and BAND_F_MAX
+BAND_F_MIN = 60.0
+BAND_F_MAX = 6000.0
+BAND_ATTACK = 0.6
+BAND_RELEASE = 0.15
+SPECTRUM_BACKEND = None  # None = "python" on the board (no garbage), "numpy" on a host; or "ulab"
+BAND_HUE_LOW = 0.0       # bass color
+BAND_HUE_HIGH = 0.66     # treble color
+
+# Beat tracking (modes with NEEDS_BEAT)
+BPM_MIN = 70.0
+BPM_MAX = 180.0
+BEAT_MIN_CONFIDENCE = 0.2  # below this the beat modes fall back to plain loudness
+FLOW_PER_BEAT = 0.125      # how far the rainbow flow steps around the U each beat
+BEAT_SPARKS = 8            # extra sparks right on the beat
+
+# Rainbow color table (hue x value lookup, 3 bytes per entry)
+RAINBOW_HUE_STEPS = 64
+RAINBOW_VALUE_STEPS = 32
+RAINBOW_TABLE_FILE = "/rainbow.bin"  # prebuilt by color_tables.py; built at boot if missing
+
 # -------------------------
 # Hardware setup
 # -------------------------
-pixels_left = neopixel.NeoPixel(PIN_LEFT, N_PER_SIDE, brightness=BRIGHTNESS, auto_write=AUTO_WRITE)
-pixels_right = neopixel.NeoPixel(PIN_RIGHT, N_PER_SIDE, brightness=BRIGHTNESS, auto_write=AUTO_WRITE)
-
-button_io = DigitalInOut(BUTTON_PIN)
-button_io.pull = Pull.UP
-button = Debouncer(button_io)
+layout = load_layout(LAYOUT_FILE) or u_layout(LAYOUT_PINS, N_PER_SIDE)
+strips = [neopixel.NeoPixel(getattr(board, pin), n, brightness=1.0, auto_write=AUTO_WRITE)
+          for pin, n in zip(layout.pins, layout.sizes)]
+limiter = None
+if CURRENT_BUDGET_MA:
+    limiter = CurrentLimiter(sum(layout.sizes), CURRENT_BUDGET_MA, LED_MA_PER_CHANNEL, LED_IDLE_MA)
+output = OutputStage(BRIGHTNESS, GAMMA, COLOR_CORRECTION, limiter)
+fb = FrameBuffer(strips, layout, output)
+fader = Crossfade(fb, TRANSITION_TIME) if TRANSITION_TIME else None
+
+button = buttons.Buttons(BUTTON_PIN, LONG_PRESS, DOUBLE_PRESS)
 
 mic = audiobusio.PDMIn(MIC_CLOCK, MIC_DATA, sample_rate=SAMPLE_RATE, bit_depth=16)
-samples = array.array("H", [0] * SAMPLES)
+# Two capture buffers: the capture task fills one while DSP reads the other
+sample_bufs = (array.array("H", [0] * SAMPLES), array.array("H", [0] * SAMPLES))
+capture_views = ({}, {})  # per buffer: window length -> (window view, chunk views, level view)
+level_engine = audio_level.make_engine(LEVEL_BACKEND)
+spectrum = SpectrumAnalyzer(FFT_SIZE, SAMPLE_RATE, N_BANDS, BAND_F_MIN, BAND_F_MAX,
+                            attack=BAND_ATTACK, release=BAND_RELEASE, backend=SPECTRUM_BACKEND)
+beat_tracker = BeatTracker(bpm_min=BPM_MIN, bpm_max=BPM_MAX, min_confidence=BEAT_MIN_CONFIDENCE)
+band_prev = array.array("f", [0.0] * N_BANDS)  # last band levels, for spectral flux
 
 # -------------------------
 # Helpers
@@ -74,345 +194,354 @@ def dbg(*args):
     if DEBUG:
         print(*args)
 
-def clamp01(x):
-    if x < 0.0:
-        return 0.0
-    if x > 1.0:
-        return 1.0
-    return x
-
-def clamp(x, lo, hi):
-    if x < lo:
-        return lo
-    if x > hi:
-        return hi
-    return x
-
-def mean_u16(buf):
-    s = 0
-    for v in buf:
-        s += v
-    return s / len(buf)
-
-def normalized_rms_u16(buf):
-    # Remove DC bias and compute RMS, normalized to ~0..1
-    m = int(mean_u16(buf))
-    acc = 0
-    for v in buf:
-        d = v - m
-        acc += d * d
-    return math.sqrt(acc / len(buf)) / 65535.0
-
-def apply_gamma(color, gamma=2.2):
-    r, g, b = color
-    r = int(((r / 255.0) ** gamma) * 255.0 + 0.5)
-    g = int(((g / 255.0) ** gamma) * 255.0 + 0.5)
-    b = int(((b / 255.0) ** gamma) * 255.0 + 0.5)
-    return (r, g, b)
-
-def hsv_to_rgb(h, s, v):
-    h = h % 1.0
-    i = int(h * 6.0)
-    f = (h * 6.0) - i
-    p = v * (1.0 - s)
-    q = v * (1.0 - f * s)
-    t = v * (1.0 - (1.0 - f) * s)
-    i = i % 6
-
-    if i == 0:
-        r, g, b = v, t, p
-    elif i == 1:
-        r, g, b = q, v, p
-    elif i == 2:
-        r, g, b = p, v, t
-    elif i == 3:
-        r, g, b = p, q, v
-    elif i == 4:
-        r, g, b = t, p, v
-    else:
-        r, g, b = v, p, q
-
-    return (int(r * 255), int(g * 255), int(b * 255))
-
-def rainbow_soft_hot(h, v):
-    """
-    h: 0..1 hue
-    v: 0..1 base brightness
-    Softens reds/oranges so they don't look stark.
-    """
-    h = h % 1.0
-
-    # Base rainbow: slightly less than full saturation already
-    s = 0.90
-
-    d_red = min(abs(h - 0.0), abs(h - 1.0))
-    d_orange = abs(h - 0.08)
-
-    hot = 0.0
-    if d_red < 0.10:
-        hot = max(hot, (0.10 - d_red) / 0.10)
-    if d_orange < 0.08:
-        hot = max(hot, (0.08 - d_orange) / 0.08)
-
-    s = s * (1.0 - 0.45 * hot)
-    v2 = v * (1.0 - 0.25 * hot)
-
-    c = hsv_to_rgb(h, s, v2)
-    return apply_gamma(c, gamma=2.0)
-
-def fill_all(color):
-    pixels_left.fill(color)
-    pixels_right.fill(color)
-
-def show():
-    pixels_left.show()
-    pixels_right.show()
-
 def clear_all():
-    fill_all((0, 0, 0))
-    show()
-
-def set_u_index(i, color):
-    # i is 0..(2*N_PER_SIDE-1) along the upside-down U
-    # 0 is top-center LEFT[0], then LEFT goes down to LEFT[N-1],
-    # then continue from RIGHT[N-1] up to RIGHT[0] (mirrored)
-    n = N_PER_SIDE
-    if i < n:
-        pixels_left[i] = color
-    else:
-        j = (2 * n - 1) - i
-        pixels_right[j] = color
-
-def clear_u():
-    for i in range(N_PER_SIDE):
-        pixels_left[i] = (0, 0, 0)
-        pixels_right[i] = (0, 0, 0)
-
-def draw_bar(level, on_color=(80, 160, 255), off_color=(0, 0, 0)):
-    for i in range(N_PER_SIDE):
-        c = on_color if i < level else off_color
-        pixels_left[i] = c
-        pixels_right[i] = c
-
-def lerp(a, b, t):
-    return a + (b - a) * t
-
-def lerp_color(c1, c2, t):
-    return (int(lerp(c1[0], c2[0], t)),
-            int(lerp(c1[1], c2[1], t)),
-            int(lerp(c1[2], c2[2], t)))
+    fb.fill(0, 0, 0)
+    fb.show()
+
+def rainbow_table():
+    # Built (or read from flash) when a rainbow mode is entered, dropped when it's left
+    return load_rainbow(RAINBOW_TABLE_FILE, RAINBOW_HUE_STEPS, RAINBOW_VALUE_STEPS)
 
 # -------------------------
 # Modes
 # -------------------------
-MODE_OFF = 0
-MODE_STATIC = 1
-MODE_RAINBOW_BREATHE = 2
-MODE_SOUND_BAR = 3
-MODE_SOUND_COLOR = 4
-MODE_SOUND_SPARKLE = 5
-MODE_RAINBOW_FLOW = 6
-MODE_SOUND_PULSE = 7
-
-MODE_NAMES = (
-    "OFF",
-    "STATIC",
-    "RAINBOW_BREATHE",
-    "SOUND_BAR",
-    "SOUND_COLOR",
-    "SOUND_SPARKLE",
-    "RAINBOW_FLOW",
-    "SOUND_PULSE",
+# One entry per mode, in button order (modes.py); the mode number indexes it
+# Colors are linear; the output stage applies GAMMA (these give the same
+# bytes on the wire as the old gamma-free values did)
+PASTEL_RED = (255, 151, 167)
+BAR_COOL = (101, 202, 255)
+BAR_WARM = (255, 167, 87)
+WHITE = (255, 255, 255)
+WARM_WHITE = (255, 237, 214)
+
+MODES = (
+    modes.Off(fb),
+    modes.Static(fb, PASTEL_RED),
+    modes.RainbowBreathe(fb, rainbow_table),
+    modes.SoundBar(fb, BAR_COOL, BAR_WARM, BAR_PEAK_FALL),
+    modes.SoundColor(fb, WHITE),
+    modes.SoundSparkle(fb, BEAT_SPARKS),
+    modes.RainbowFlow(fb, rainbow_table, FLOW_PER_BEAT),
+    modes.SoundPulse(fb, WARM_WHITE),
+    modes.SoundBands(fb, rainbow_table, N_BANDS, BAND_HUE_LOW, BAND_HUE_HIGH),
+    modes.SoundKick(fb),
 )
-
-mode = MODE_SOUND_BAR
-
-PASTEL_RED = (255, 90, 110)
-
-# Sound envelope state
-env = 0.0
-slow_env = 0.0
-auto_gain = 1.0
-bar_peak = 0.0
+MODE_NAMES = tuple(m.name for m in MODES)
+MODE_NEEDS = tuple(m.needs for m in MODES)
+# Capture window per mode, in samples (<= SAMPLES). Shorter = lower latency
+# (160 samples is 10 ms at 16 kHz) at the cost of a noisier level.
+MODE_WINDOW = tuple((m.window or SAMPLES) if m.needs & NEEDS_AUDIO else 0 for m in MODES)
+
+START_MODE = "SOUND_BAR"
+mode = MODE_NAMES.index(START_MODE)
+active = None  # the mode being drawn; the render task enter()s / exit()s on a change
+
+# Sound envelope state: the chain runs in the DSP task, features is the
+# latest-value snapshot the render task reads
+chain = make_chain(
+    FEATURE_CHAIN, mic_gain=MIC_GAIN, attack=ATTACK, release=RELEASE, env_max=ENV_MAX,
+    auto_gain=AUTO_GAIN, auto_gain_target=AUTO_GAIN_TARGET,
+    auto_gain_rise=AUTO_GAIN_RISE, auto_gain_fall=AUTO_GAIN_FALL,
+    auto_gain_min=AUTO_GAIN_MIN, auto_gain_max=AUTO_GAIN_MAX,
+    slow_env_attack=SLOW_ENV_ATTACK, slow_env_release=SLOW_ENV_RELEASE,
+    punch_boost=PUNCH_BOOST)
+features = Features()
+features.bands = spectrum.bands
+gate = None
+if NOISE_GATE:
+    gate = audio_level.NoiseGate(GATE_CALIBRATION, open_ratio=GATE_OPEN, close_ratio=GATE_CLOSE,
+                                 hold=GATE_HOLD, floor_max=GATE_FLOOR_MAX)
+
+nvm = calstore.default_nvm() if CAL_PERSIST else None
+cal = None
+if nvm is not None:
+    cal = calstore.CalStore(nvm, CAL_NVM_OFFSET, CAL_SLOTS, calstore.settings_key(MIC_GAIN, ENV_MAX),
+                            min_interval=CAL_SAVE_EVERY, smoothing=2.0 / (CAL_AVERAGE * 4),
+                            min_observed=int(CAL_AVERAGE * 4))  # observed 4 times a second
+    saved = cal.load()
+    if saved is not None:
+        chain.restore(saved[0], saved[1])
+        features.hold(chain.env_n, 0.0)
+        if gate is not None and saved[2] > 0.0:
+            gate.restore(saved[2])
+audio_since = None  # when audio last started running (None = paused)
+capture_seq = 0    # bumps when a capture completes
+ready_view = None  # last completed capture, handed from capture to DSP
+ready_level = None  # ... as prepared for the level engine
 
 # Animation state
+mode_entered = True  # first frame of a mode
+idle_drawn = False   # the gated (silent) frame of a sound mode is on the strips
+relight = False      # brightness changed: the active mode redraws what it only draws on entry
 t0 = time.monotonic()
-hue_base = 0.0
-flow_phase = 0.0
-
-dbg("Boot. Starting mode:", MODE_NAMES[mode])
+frame_ticker = Ticker(FPS)
+if PROFILE:
+    prof = profiler.Profiler(history=PROFILE_HISTORY)
+else:
+    prof = profiler.NullProfiler()
+guard = allocguard.AllocGuard(len(MODE_NAMES), ALLOC_GUARD_WARMUP) if ALLOC_GUARD else None
+boot_time = time.monotonic()
+recorder = None
+if FEATURE_TRACE:
+    recorder = frametrace.FeatureRecorder(FEATURE_TRACE, [(n, 3) for n in layout.sizes])
+replay = frametrace.FeatureReplay(FEATURE_REPLAY) if FEATURE_REPLAY else None
 
 # -------------------------
-# Main loop
+# Tasks
 # -------------------------
-while True:
-    loop_start = time.monotonic()
-
-    # Button update + mode switching
-    button.update()
-    if button.fell:
-        mode = (mode + 1) % len(MODE_NAMES)
-        dbg("Mode ->", MODE_NAMES[mode])
+def capture_views_for(k, window):
+    views = capture_views[k].get(window)
+    if views is None:
+        mv = memoryview(sample_bufs[k])[:window]
+        step = CAPTURE_CHUNK or window
+        views = (mv, [mv[i:i + step] for i in range(0, window, step)], level_engine.prepare(mv))
+        capture_views[k][window] = views
+    return views
+
+def set_mode(m):
+    global mode, mode_entered
+    mode = m % len(MODE_NAMES)
+    dbg("Mode ->", MODE_NAMES[mode])
+    if fader is None:
         clear_all()
-
-    # Read audio
-    mic.record(samples, len(samples))
-    rms = normalized_rms_u16(samples) * MIC_GAIN * auto_gain
-
-    # Envelope follower (smooth it)
-    if rms > env:
-        env = env + (rms - env) * ATTACK
-    else:
-        env = env + (rms - env) * RELEASE
-
-    # Normalize envelope to 0..1 for consistent scaling everywhere
-    env_n = clamp01(env / ENV_MAX)
-
-    # Adaptive gain: keep the normalized envelope hovering near AUTO_GAIN_TARGET
-    if AUTO_GAIN:
-        target = AUTO_GAIN_TARGET
-        if env_n < target * 0.7:
-            auto_gain += AUTO_GAIN_RISE * (target - env_n)
-        elif env_n > target * 1.3:
-            auto_gain -= AUTO_GAIN_FALL * (env_n - target)
-        auto_gain = clamp(auto_gain, AUTO_GAIN_MIN, AUTO_GAIN_MAX)
-
-    # Slow baseline + transient punch (beats) that don't care about absolute volume
-    if env > slow_env:
-        slow_env = slow_env + (env - slow_env) * SLOW_ENV_ATTACK
-    else:
-        slow_env = slow_env + (env - slow_env) * SLOW_ENV_RELEASE
-    slow_env_n = clamp01(slow_env / ENV_MAX)
-    punch = clamp01((env_n - slow_env_n) * PUNCH_BOOST)
-
-    if DEBUG:
-        dbg("r", round(rms, 4), "n", round(env_n, 3), "p", round(punch, 3), "g", round(auto_gain, 2), "m", MODE_NAMES[mode])
-
-    # Mode rendering
-    now = time.monotonic()
-    dt = now - t0
-    t0 = now
-
-    if mode == MODE_OFF:
-        clear_u()
-        show()
-
-    elif mode == MODE_STATIC:
-        fill_all(PASTEL_RED)
-        show()
-
-    elif mode == MODE_RAINBOW_BREATHE:
-        # Breathing brightness + traveling rainbow across the U
-        hue_base = (hue_base + dt * 0.08) % 1.0  # slow drift
-        breathe = 0.30 + 0.70 * (0.5 + 0.5 * math.sin(now * 2.0))  # 0.30..1.0
-
-        clear_u()
-        total = 2 * N_PER_SIDE
-        for i in range(total):
-            h = hue_base + (i / total) * 0.65
-            c = rainbow_soft_hot(h, breathe)
-            set_u_index(i, c)
-        show()
-
-    elif mode == MODE_RAINBOW_FLOW:
-        flow_speed = 0.18 + 0.55 * env_n + 0.75 * punch
-        flow_phase = (flow_phase + dt * flow_speed) % 1.0
-
-        # Brightness leans on the adaptive loudness
-        v = clamp01(0.18 + 0.55 * env_n + 0.35 * punch)
-
-        total = 2 * N_PER_SIDE
-        clear_u()
-
-        # Each pixel has a hue offset; phase pushes the pattern forward around the U.
-        for i in range(total):
-            # Move forward along the U: increasing phase makes the whole rainbow advance.
-            h = (flow_phase + (i / total)) % 1.0
-            c = rainbow_soft_hot(h, v)
-            set_u_index(i, c)
-
-        show()
-
-    elif mode == MODE_SOUND_BAR:
-        level = int(env_n * N_PER_SIDE + 0.5)
-        if level > N_PER_SIDE:
-            level = N_PER_SIDE
-
-        # Peak marker (slowly falls so you can see the last hit)
-        if env_n > bar_peak:
-            bar_peak = env_n
+    mode_entered = True
+
+async def input_task():
+    # keypad queues the presses in the background; this only reads them back
+    while True:
+        t = prof.stamp()
+        gesture = button.next()
+        while gesture:
+            if gesture == buttons.SHORT:
+                set_mode(mode + 1)
+            elif gesture == buttons.DOUBLE:
+                set_mode(mode - 1)
+            else:
+                cycle_brightness()
+            gesture = button.next()
+        prof.record(profiler.STAGE_INPUT, t)
+        await asyncio.sleep(INPUT_PERIOD)
+
+async def capture_task():
+    # mic.record blocks, so record in short chunks and yield between them
+    global ready_view, ready_level, capture_seq, audio_since
+    if replay is not None:
+        return  # features come from the trace
+    k = 0
+    capturing = False  # not at boot: a restored calibration must reach the first update
+    while True:
+        if not MODE_NEEDS[mode] & NEEDS_AUDIO:
+            if capturing:
+                chain.resume()  # once, as audio stops
+                capturing = False
+            audio_since = None
+            await asyncio.sleep(AUDIO_IDLE_POLL)
+            continue
+        capturing = True
+        view, chunks, level_view = capture_views_for(k, MODE_WINDOW[mode])
+        busy = 0
+        for c in chunks:
+            t = prof.stamp()
+            mic.record(c, len(c))
+            busy += prof.stamp() - t
+            await pause()
+        prof.add(profiler.STAGE_CAPTURE, busy // 1000)  # blocked in record(), not waiting between chunks
+        ready_view = view
+        ready_level = level_view
+        capture_seq += 1
+        k ^= 1
+
+async def dsp_task():
+    # Polls for the next capture rather than awaiting an Event: Event.wait()
+    # makes a new coroutine every time, a plain sleep doesn't allocate
+    global audio_since
+    seen = 0
+    while True:
+        while capture_seq == seen:
+            await asyncio.sleep(DSP_POLL)
+        seen = capture_seq
+        needs = MODE_NEEDS[mode]
+        if not needs & NEEDS_AUDIO:
+            continue  # captured before the switch: would use up the chain's resume
+        t = prof.stamp()
+        now = time.monotonic()
+        if FEATURE_CHAIN == "fixed":
+            raw = level_engine.rms_raw(ready_level)
+            level = raw / audio_level.RAW_FULL_SCALE
         else:
-            bar_peak = max(0.0, bar_peak - BAR_PEAK_FALL)
-
-        total = N_PER_SIDE
-        brightness = 0.35 + 0.65 * env_n
-
-        for i in range(total):
-            pos_t = i / float(total - 1 if total > 1 else 1)
-            # Warm up toward the bottom + react to transients
-            cool = (40, 160, 255)
-            warm = (255, 110, 30)
-            warm_mix = clamp01(pos_t * 0.75 + punch * 0.5)
-            base_color = lerp_color(cool, warm, warm_mix)
-            if i < level:
-                c = (int(base_color[0] * brightness),
-                     int(base_color[1] * brightness),
-                     int(base_color[2] * brightness))
+            level = level_engine.rms(ready_level)
+            raw = int(level * audio_level.RAW_FULL_SCALE)
+        if gate is not None and not gate.update(raw):
+            # Nothing above the room's noise: hold everything at silence
+            if not features.gated:
+                features.gated = True
+                features.hold(0.0, 0.0)
+                features.publish_beat(0.0, 0, 0.0, False, now)
+                beat_tracker.reset()
+            audio_since = None
+            prof.record(profiler.STAGE_DSP, t)
+            continue
+        features.gated = False
+        fresh = chain.resuming
+        if audio_since is None:
+            audio_since = now
+        chain.update(raw if FEATURE_CHAIN == "fixed" else level)
+        if fresh:
+            features.hold(chain.env_n, chain.punch)
+            spectrum.reset()
+            beat_tracker.reset()
+        if needs & NEEDS_SPECTRUM:
+            spectrum.update(ready_view)
+        if needs & NEEDS_BEAT:
+            onset = beat_tracker.level_flux(level)
+            if needs & NEEDS_SPECTRUM:
+                onset += spectral_flux(spectrum.levels, band_prev)
+            beat_tracker.update(onset, now)
+            features.publish_beat(beat_tracker.bpm, beat_tracker.beats, beat_tracker.phase,
+                                  beat_tracker.locked, now)
+        features.publish(chain.rms, chain.env_n, chain.punch, chain.auto_gain, now)
+        prof.record(profiler.STAGE_DSP, t)
+
+async def render_task():
+    global t0, mode, mode_entered, idle_drawn, active, relight
+    while True:
+        now = time.monotonic()
+        frame_ticker.woke(now)
+        if guard is not None:
+            guard.frame(mode)
+        t = prof.stamp()
+        dt = now - t0
+        t0 = now
+        if replay is None:
+            features.blend(now)
+        elif not replay.done:
+            # Recorded features (and mode changes) instead of the DSP task's
+            recorded = replay.next(features)
+            if recorded is not None:
+                dt = replay.dt
+                if recorded != mode:
+                    mode = recorded
+                    if fader is None:
+                        clear_all()
+                    mode_entered = True
+        if recorder is not None:
+            recorder.features(now - boot_time, mode, dt, features)
+        m = MODES[mode]
+        if m is not active:
+            if fader is not None and active is not None:
+                fader.start(active, m)
             else:
-                c = (0, 0, 0)
-            pixels_left[i] = c
-            pixels_right[i] = c
-
-        peak_idx = int(bar_peak * N_PER_SIDE + 0.2)
-        if peak_idx >= N_PER_SIDE:
-            peak_idx = N_PER_SIDE - 1
-        if peak_idx >= 0:
-            peak_color = (255, 255, 255) if bar_peak > 0.05 else (0, 0, 0)
-            pixels_left[peak_idx] = peak_color
-            pixels_right[peak_idx] = peak_color
-        show()
-
-    elif mode == MODE_SOUND_COLOR:
-        loud = env_n
-        hue = lerp(0.70, 0.02, loud)
-        val = 0.25 + 0.75 * loud
-        c = hsv_to_rgb(hue, 1.0, val)
-
-        # Add a soft white flash on hits so it pops without being blinding
-        if punch > 0.05:
-            flash = clamp01(punch * 0.9)
-            c = lerp_color(c, (255, 255, 255), flash)
-
-        fill_all(c)
-        show()
-
-    elif mode == MODE_SOUND_SPARKLE:
-        loud = env_n
-        base = hsv_to_rgb(0.58, 0.9, 0.18 + 0.30 * loud + 0.25 * punch)
-        sparkle = hsv_to_rgb(0.10 + 0.12 * punch, 0.4, 1.0)
-
-        fill_all(base)
-
-        sparks = int(loud * 6.0 + punch * 8.0 + 0.4)
-        total = 2 * N_PER_SIDE
-        for _ in range(sparks):
-            idx = random.randrange(total)
-            set_u_index(idx, sparkle)
-
-        show()
-
-    elif mode == MODE_SOUND_PULSE:
-        # Uniform pulse for reflections; rides on adaptive loudness + hits
-        brightness = clamp01(0.05 + 0.80 * env_n + 0.45 * punch)
-        warm_white = (255, 220, 180)
-        c = (int(warm_white[0] * brightness),
-             int(warm_white[1] * brightness),
-             int(warm_white[2] * brightness))
-        fill_all(c)
-        show()
-
-    # Frame pacing
-    target_dt = 1.0 / FPS
-    elapsed = time.monotonic() - loop_start
-    if elapsed < target_dt:
-        time.sleep(target_dt - elapsed)
+                if active is not None:
+                    active.exit()
+                m.enter()
+            active = m
+        if relight and (fader is None or not fader.running):
+            # New output tables: redo what modes only draw on entry (its own
+            # tables stay; enter()/exit() pair up with mode changes only)
+            relight = False
+            m.redraw()
+            idle_drawn = False
+        if fader is not None and fader.running:
+            fader.render(features, dt)
+            idle_drawn = False
+        else:
+            # Gated sound modes draw their silent frame once, then leave it up
+            idle = features.gated and m.needs & NEEDS_AUDIO
+            if mode_entered or not (idle and idle_drawn):
+                m.render(features, dt)
+            idle_drawn = bool(idle)
+        prof.record(profiler.STAGE_RENDER, t)
+        if recorder is not None and 1 in fb.dirty:
+            recorder.frame(now - boot_time, fb.buf)
+        if replay is not None and not replay.done:
+            replay.check(fb.buf)
+
+        # Push changed strips only; static modes cost no bus time after their first frame
+        t = prof.stamp()
+        fb.show()
+        prof.record(profiler.STAGE_SHOW, t)
+        mode_entered = False
+        t = prof.stamp()
+        await frame_ticker.wait()
+        prof.record(profiler.STAGE_SLEEP, t)
+
+def set_brightness(value):
+    global relight
+    output.set_brightness(value)
+    relight = True
+    dbg("Brightness -> %.2f" % output.brightness)
+
+def cycle_brightness():
+    for level in BRIGHTNESS_LEVELS:
+        if level > output.brightness + 0.001:
+            set_brightness(level)
+            return
+    set_brightness(BRIGHTNESS_LEVELS[0])
+
+def print_report():
+    print(prof.report(frame_ticker.overruns))
+    print("@F %s rms=%.4f env=%.3f punch=%.3f gain=%.2f bpm=%.1f" % (
+        MODE_NAMES[mode], chain.rms, chain.env_n, chain.punch, chain.auto_gain, beat_tracker.bpm))
+    if gate is not None:
+        print("@G %s floor=%.5f changes=%d" % (
+            "open" if gate.open else "closed", gate.noise_floor, gate.changes))
+    if limiter is not None:
+        print("@I ma=%d peak=%d budget=%d headroom=%d limited=%d/%d" % (
+            limiter.ma, limiter.peak_ma, limiter.budget_ma, limiter.headroom_ma,
+            limiter.limited, limiter.frames))
+
+async def report_task():
+    # Timing reports at an interval and on serial commands:
+    # p = report, d = dump, r = reset, a = allocation guard report,
+    # + / - = brightness up / down
+    last = time.monotonic()
+    while True:
+        cmd = profiler.read_command()
+        if cmd == "p":
+            print_report()
+        elif cmd == "d":
+            for line in prof.dump():
+                print(line)
+        elif cmd == "r":
+            prof.reset()
+            if limiter is not None:
+                limiter.reset()
+        elif cmd == "a" and guard is not None:
+            for line in guard.report(MODE_NAMES):
+                print(line)
+            guard.skip()  # the printing isn't the mode's doing
+        elif cmd == "+":
+            set_brightness(output.brightness + BRIGHTNESS_STEP)
+        elif cmd == "-":
+            set_brightness(output.brightness - BRIGHTNESS_STEP)
+        now = time.monotonic()
+        if PROFILE and PROFILE_REPORT_EVERY and not ALLOC_GUARD and now - last >= PROFILE_REPORT_EVERY:
+            last = now
+            print_report()
+        if cal is not None:
+            if audio_since is None:
+                cal.restart()
+            elif now - audio_since >= CAL_SETTLE:
+                cal.observe(chain.auto_gain, chain.slow_env / ENV_MAX,
+                            gate.noise_floor if gate is not None else 0.0)
+                if cal.save_if_due(now):
+                    dbg("Calibration saved: gain %.3f baseline %.3f floor %.5f" % cal.saved)
+                    if guard is not None:
+                        guard.skip()
+        await asyncio.sleep(0.25)
+
+async def main():
+    await asyncio.gather(
+        asyncio.create_task(input_task()),
+        asyncio.create_task(capture_task()),
+        asyncio.create_task(dsp_task()),
+        asyncio.create_task(render_task()),
+        asyncio.create_task(report_task()),
+    )
+
+dbg("Boot. Starting mode:", MODE_NAMES[mode], "level:", level_engine.name)
+if cal is not None and cal.saved is not None:
+    dbg("Calibration restored: gain %.3f baseline %.3f floor %.5f" % cal.saved)
+if ALLOC_GUARD:
+    gc.collect()
+asyncio.run(main())
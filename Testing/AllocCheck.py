@@ -0,0 +1,41 @@
+# Steady-state allocation check for every Final.py mode.
+#   python3 Testing/AllocCheck.py [seconds_per_mode]
+# Runs Final.py on the host simulator (virtual clock) with ALLOC_GUARD on,
+# steps through every mode with the button and prints allocguard's per-mode
+# report. Exits with status 1 if any mode allocated after its warmup.
+# Under CPython the counts come from allocguard's bytecode model of the
+# MicroPython heap (see allocguard.py); on the board send "a" instead.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+
+BOOT = 0.5
+PRESS_HOLD = 0.04
+
+
+def main(dwell):
+    n_modes = len(sim.run("Final.py", seconds=0.1, realtime=False)["MODE_NAMES"])
+    presses = [(BOOT + dwell * j, PRESS_HOLD) for j in range(n_modes)]
+    g = sim.run("Final.py", seconds=BOOT + dwell * (n_modes + 1), presses=presses,
+                realtime=False, seed=1, config={"ALLOC_GUARD": True})
+    guard = g["guard"]
+    guard.close()
+
+    for line in guard.report(g["MODE_NAMES"]):
+        print(line)
+    names = g["MODE_NAMES"]
+    missing = [names[m] for m in range(n_modes) if not guard.frames[m]]
+    failed = [names[m] for m in guard.failures()]
+    if missing:
+        print("no steady-state frames for:", ", ".join(missing))
+    if failed:
+        print("allocating in steady state:", ", ".join(failed))
+    return 1 if failed or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.5))
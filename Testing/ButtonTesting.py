@@ -1,26 +1,45 @@
+# Button on D9 to GND, read through keypad's event queue (buttons.py next
+# to this file on the board). Prints every press / release with its
+# timestamp and how long it was held, and the gestures they make.
+# On the host, against a scripted press timeline:
+#   python3 -m sim --script Testing/ButtonTesting.py --verbose --press 1 --press 1.2 --press 2:1
+
 import board
-import digitalio
 import time
 
-# Button on D9
-button = digitalio.DigitalInOut(board.D9)
-button.direction = digitalio.Direction.INPUT
-button.pull = digitalio.Pull.UP  # internal pull-up
+import keypad
+import buttons
 
-last_state = button.value
+button = buttons.Buttons(board.D9)
+keys = button.keys
+gestures = button.gestures
+event = keypad.Event()   # our own: the raw events are printed here, not in next()
 
 print("Button test ready. Press the button.")
 
+down_at = 0
 while True:
-    current_state = button.value
-
-    # Detect state change
-    if current_state != last_state:
-        if not current_state:
-            print("PRESSED")
+    # Same loop as Buttons.next(), through the public keys and gestures,
+    # with the raw events printed on the way
+    if keys.events.overflowed:
+        keys.events.clear()
+        gestures.reset()
+        print("event queue overflowed, events lost")
+    while keys.events.get_into(event):
+        g = gestures.poll(event.timestamp)
+        if g:
+            print("  ->", buttons.NAMES[g])
+        if event.pressed:
+            down_at = event.timestamp
+            print("PRESSED  at %d ms" % event.timestamp)
         else:
-            print("RELEASED")
-
-        last_state = current_state
-
-    time.sleep(0.01)  # simple debounce
+            print("RELEASED at %d ms, held %d ms" % (
+                event.timestamp, buttons.ticks_diff(event.timestamp, down_at)))
+        g = gestures.event(event.pressed, event.timestamp)
+        if g:
+            print("  ->", buttons.NAMES[g])
+    if gestures.busy:
+        g = gestures.poll(buttons.ticks())
+        if g:
+            print("  ->", buttons.NAMES[g])
+    time.sleep(0.1)  # slow on purpose: the events keep their own time
@@ -0,0 +1,127 @@
+# Calibration persistence (calstore.py) on the host simulator.
+#   python3 Testing/CalibrationCheck.py
+# 1. Record handling on a plain bytearray: slot rotation, sequence wrap,
+#    a torn newest record falling back to the one before, foreign keys.
+# 2. Final.py cold (empty nvm file) long enough to save its calibration,
+#    then cold and warm boots sampled every 0.1 s: over the first second the
+#    warm one should already average the settled auto-gain and baseline,
+#    the cold one is still on its way.
+#    Input is the synthetic beat at a moderate level, where auto-gain
+#    settles (full-scale bursts just pin env_n at 1 and gain swings).
+#    Also a warm boot into a mode without audio, switched to a sound mode
+#    half a second later: the restored baseline should still be there.
+# Exits with status 1 on any failure.
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+import calstore
+
+SETTLE_RUN = 60.0     # > Final.py's CAL_SETTLE + CAL_AVERAGE, so the cold run saves
+FIRST_SECOND = [0.1 * k for k in range(1, 11)]
+BURST = 1500
+WARM_TOLERANCE = 0.10  # relative, first-second averages vs the saved values
+
+
+def check_records():
+    failures = []
+    nvm = bytearray(b"\xff" * 256)
+    store = calstore.CalStore(nvm, offset=16, slots=4, key=7)
+    if store.load() is not None:
+        failures.append("erased nvm loaded a record")
+    for i in range(10):
+        store.save(1.0 + i, 0.1 * i, 0.001)
+    again = calstore.CalStore(nvm, offset=16, slots=4, key=7)
+    if again.load() is None or abs(again.saved[0] - 10.0) > 1e-6:
+        failures.append("newest record not found after rotation: %r" % (again.saved,))
+    # Tear the newest record: the one before should come back
+    o = 16 + again._slot * calstore.RECORD_SIZE
+    nvm[o + 8] ^= 0xFF
+    torn = calstore.CalStore(nvm, offset=16, slots=4, key=7)
+    if torn.load() is None or abs(torn.saved[0] - 9.0) > 1e-6:
+        failures.append("torn record didn't fall back: %r" % (torn.saved,))
+    # Sequence numbers wrapping past 0xFFFF
+    wrap = calstore.CalStore(bytearray(b"\xff" * 256), slots=4, key=7)
+    wrap._seq = 0xFFFE
+    for i in range(3):
+        wrap.save(20.0 + i, 0.0, 0.0)
+    back = calstore.CalStore(wrap.nvm, slots=4, key=7)
+    if back.load() is None or abs(back.saved[0] - 22.0) > 1e-6:
+        failures.append("sequence wrap picked the wrong record: %r" % (back.saved,))
+    if calstore.CalStore(nvm, offset=16, slots=4, key=8).load() is not None:
+        failures.append("record with another settings key was used")
+    # Wear limit: one write per interval, and only on real change
+    limited = calstore.CalStore(bytearray(b"\xff" * 256), slots=4, min_interval=600.0)
+    writes = 0
+    for t in range(0, 3600, 10):
+        limited.observe(1.0 + 0.001 * t, 0.3, 0.001)
+        writes += limited.save_if_due(t)
+    if writes > 6:
+        failures.append("%d writes in an hour" % writes)
+    print("records: %s" % ("ok" if not failures else "FAILED"))
+    return failures
+
+
+def run(nvm, seconds, presses=(), config=None):
+    g = sim.run("Final.py", seconds=seconds, presses=presses, realtime=False, seed=1, nvm=nvm,
+                audio=sim.SyntheticAudio(burst=BURST), config=config)
+    return g["chain"], g["cal"]
+
+
+def idle_boot(nvm):
+    """Baseline just after the first updates, warm boot into RAINBOW_BREATHE then on to SOUND_BAR."""
+    names = sim.run("Final.py", seconds=0.1, realtime=False)["MODE_NAMES"]
+    chain, _ = run(nvm, 1.5, presses=[(0.5, 0.08)],
+                   config={"mode": names.index("RAINBOW_BREATHE"), "DOUBLE_PRESS": 0})
+    return chain.slow_env / chain.env_max
+
+
+def first_second(nvm):
+    """Mean auto-gain and baseline over the first second after boot."""
+    gain = baseline = 0.0
+    for seconds in FIRST_SECOND:
+        chain, _ = run(nvm, seconds)
+        gain += chain.auto_gain
+        baseline += chain.slow_env / chain.env_max
+    return gain / len(FIRST_SECOND), baseline / len(FIRST_SECOND)
+
+
+def main():
+    failures = check_records()
+    with tempfile.TemporaryDirectory() as tmp:
+        nvm = os.path.join(tmp, "nvm.bin")
+        chain, cal = run(nvm, SETTLE_RUN)
+        if not cal.writes:
+            failures.append("nothing saved after %.0f s" % SETTLE_RUN)
+            print("\n".join(failures))
+            return 1
+        gain, baseline, floor = cal.saved
+        print("saved after %.0f s: gain %.3f baseline %.3f noise floor %.5f (%d write)" % (
+            SETTLE_RUN, gain, baseline, floor, cal.writes))
+
+        cold_gain, cold_base = first_second(os.path.join(tmp, "empty.bin"))
+        warm_gain, warm_base = first_second(nvm)
+        print("first second, cold boot: gain %.3f baseline %.3f" % (cold_gain, cold_base))
+        print("first second, warm boot: gain %.3f baseline %.3f" % (warm_gain, warm_base))
+        if abs(warm_gain - gain) > WARM_TOLERANCE * gain:
+            failures.append("warm boot gain %.3f, saved %.3f" % (warm_gain, gain))
+        if abs(warm_base - baseline) > WARM_TOLERANCE * max(baseline, 0.05):
+            failures.append("warm boot baseline %.3f, saved %.3f" % (warm_base, baseline))
+        idle_base = idle_boot(nvm)
+        print("warm boot without audio, then a sound mode: baseline %.3f" % idle_base)
+        if abs(idle_base - baseline) > WARM_TOLERANCE * max(baseline, 0.05):
+            failures.append("baseline %.3f after booting without audio, saved %.3f" % (idle_base, baseline))
+        _, warm_cal = run(nvm, 10.0)
+        if warm_cal.writes:
+            failures.append("warm boot wrote nvm within 10 s")
+    for f in failures:
+        print(f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@ import time, ssl, wifi, socketpool, board
 import adafruit_requests
 from adafruit_bitmap_font import bitmap_font
 from adafruit_display_text import bitmap_label
+import weather_cache
 
 # ----- CONFIG -----
 LAT, LON = 47.2529, -122.4443
@@ -10,6 +11,8 @@ UNITS = "imperial"
 FONT_PATH = "/fonts/cjk16.bdf"
 TEXT_COLOR = 0xFF0000
 UPDATE_SECS = 30
+CACHE_FILE = "/weather.json"   # last good observation, shown at boot (needs a writable filesystem)
+CACHE_FRESH_SECONDS = 600      # no request at all while the observation is younger than this
 
 CITY_MAP = {
     "San Francisco": "旧金山",
@@ -88,15 +91,6 @@ URL = (
     f"?lat={LAT}&lon={LON}&units={UNITS}&appid={OWM_KEY}"
 )
 
-# ----- WIFI/HTTP -----
-print("Connecting Wi-Fi…")
-wifi.radio.connect(SSID, PASS)
-print("Connected to", SSID)
-print("IP:", wifi.radio.ipv4_address)
-
-pool = socketpool.SocketPool(wifi.radio)
-requests = adafruit_requests.Session(pool, ssl.create_default_context())
-
 # ----- FONT/LABEL -----
 font = bitmap_font.load_font(FONT_PATH)
 
@@ -122,17 +116,39 @@ def make_text(temp, city_en, cond_en):
     cond = cn_or_en_cond(cond_en)
     return f"现在{city}是{deg(temp)}\n{cond}"
 
+def show(obs):
+    if obs.get("temp") is None:
+        label.text = "Error:\nno temperature"
+        return
+    label.text = make_text(obs["temp"], obs.get("name", ""),
+                           obs.get("description", "") or obs.get("main", ""))
+
+# ----- CACHE -----
+# The last good observation goes up before Wi-Fi is connected
+cache = weather_cache.WeatherCache(CACHE_FILE, CACHE_FRESH_SECONDS)
+if cache.load():
+    show(cache.observation)
+
+# ----- WIFI/HTTP -----
+requests = None
+
+def connect():
+    global requests
+    print("Connecting Wi-Fi…")
+    wifi.radio.connect(SSID, PASS)
+    print("Connected to", SSID)
+    print("IP:", wifi.radio.ipv4_address)
+    pool = socketpool.SocketPool(wifi.radio)
+    requests = adafruit_requests.Session(pool, ssl.create_default_context())
+
 while True:
     try:
-        r = requests.get(URL)
-        d = r.json()
-        temp = d["main"]["temp"]
-        city = d.get("name", "")
-        cond_en = ""
-        w = d.get("weather")
-        if isinstance(w, list) and w:
-            cond_en = w[0].get("description", "") or w[0].get("main", "")
-        label.text = make_text(temp, city, cond_en)
+        if requests is None:
+            connect()
+        if cache.update(requests, URL) == weather_cache.UPDATED:
+            show(cache.observation)
     except Exception as e:
-        label.text = f"Error:\n{e}"
+        print("Update failed:", e)
+        if cache.observation is None:
+            label.text = f"Error:\n{e}"
     time.sleep(UPDATE_SECS)
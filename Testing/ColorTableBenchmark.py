@@ -0,0 +1,81 @@
+# Rainbow color cost per frame, before (rainbow_soft_hot per pixel) and
+# after (RainbowTable lookup), for 10 / 100 / 1000 pixels.
+# Host: python3 Testing/ColorTableBenchmark.py
+
+import sys
+import time
+
+try:
+    import os
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+except (AttributeError, NameError):
+    pass  # on the board color_tables.py sits next to this file
+
+from color_tables import RainbowTable, rainbow_soft_hot
+
+PIXEL_COUNTS = (10, 100, 1000)
+RESOLUTIONS = ((32, 16), (64, 32), (128, 64))
+FRAMES = 20
+
+
+def frame_direct(buf, n, phase, v):
+    o = 0
+    for i in range(n):
+        r, g, b = rainbow_soft_hot(phase + i / n, v)
+        buf[o] = r
+        buf[o + 1] = g
+        buf[o + 2] = b
+        o += 3
+
+
+def frame_table(buf, n, phase, v, rt):
+    t = rt.table
+    o = 0
+    for i in range(n):
+        k = rt.index(phase + i / n, v)
+        buf[o] = t[k]
+        buf[o + 1] = t[k + 1]
+        buf[o + 2] = t[k + 2]
+        o += 3
+
+
+def us_per_frame(fn, *args):
+    t = time.monotonic_ns()
+    for f in range(FRAMES):
+        fn(*args[:2], f * 0.013, 0.3 + 0.7 * (f % 10) / 10, *args[2:])
+    return (time.monotonic_ns() - t) / FRAMES / 1000.0
+
+
+def max_error(rt):
+    worst = 0
+    for hi in range(257):
+        for vi in range(33):
+            h, v = hi / 256, vi / 32
+            want = rainbow_soft_hot(h, v)
+            got = rt.color(h, v)
+            worst = max(worst, max(abs(a - b) for a, b in zip(want, got)))
+    return worst
+
+
+def main():
+    print("%-10s %8s %10s %8s" % ("table", "bytes", "build ms", "max err"))
+    tables = {}
+    for hs, vs in RESOLUTIONS:
+        t = time.monotonic_ns()
+        rt = RainbowTable(hs, vs, gamma=2.0)  # same response as the reference
+        build_ms = (time.monotonic_ns() - t) / 1e6
+        tables[(hs, vs)] = rt
+        print("%-10s %8d %10.1f %8d" % ("%dx%d" % (hs, vs), len(rt.table), build_ms, max_error(rt)))
+
+    print()
+    rt = tables[(64, 32)]
+    print("%-8s %14s %14s %8s" % ("pixels", "direct us/frm", "table us/frm", "speedup"))
+    for n in PIXEL_COUNTS:
+        buf = bytearray(n * 3)
+        before = us_per_frame(frame_direct, buf, n)
+        after = us_per_frame(frame_table, buf, n, rt)
+        print("%-8d %14.1f %14.1f %7.1fx" % (n, before, after, before / after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# Current limiter (output.CurrentLimiter) and the frame buffer's running
+# byte sum it estimates from, on the host.
+#   python3 Testing/CurrentCheck.py
+# 1. Random set / set_row / fill / copy_from / crossfade writes: the
+#    incremental FrameBuffer.load has to equal a rescan after every one.
+# 2. Worst-case frames (all white, STATIC, the white peak row, a white
+#    flash through the output tables) pushed through the simulator's
+#    NeoPixels: what reaches the strips must be within budget, and frames
+#    already under it must go out untouched.
+# 3. Final.py at full brightness on a 300-pixel layout, traced: no pushed
+#    frame over budget with the limiter, and how far over without it.
+# Exits with status 1 on any failure.
+
+import os
+import sys
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+import frametrace
+from geometry import u_layout, grid_layout
+from framebuffer import FrameBuffer
+from output import OutputStage, CurrentLimiter
+from transition import Crossfade
+
+BUDGET_MA = 2000
+MA_PER_CHANNEL = 20.0
+IDLE_MA = 1.0
+PIXELS = 300
+FRAME_GAP = 0.008   # pixel records closer than this belong to one frame
+
+
+def current_ma(data, pixels):
+    """The limiter's model applied to bytes as pushed."""
+    return pixels * IDLE_MA + sum(data) * MA_PER_CHANNEL / 255.0
+
+
+def check_load():
+    failures = []
+    rng = random.Random(1)
+    layout = grid_layout(("D5", "D6"), 12, 9)
+    output = OutputStage(0.8, 2.0, (255, 176, 240))
+    out = FrameBuffer(None, layout, output)
+    other = FrameBuffer(None, layout, output)
+    fader = Crossfade(out, 1.0)
+    for step in range(3000):
+        op = rng.randrange(6)
+        c = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        if op == 0:
+            out.set(rng.randrange(out.total), *c)
+        elif op == 1:
+            out.set_row(rng.randrange(out.n_rows), *c)
+        elif op == 2:
+            out.fill(*c)
+        elif op == 3:
+            other.set(rng.randrange(other.total), *c)
+            other.copy_from(out) if rng.randrange(2) else out.copy_from(other)
+        elif op == 4:
+            fader.old_fb.fill(*c)
+            fader.new_fb.set(rng.randrange(out.total), *c)
+            fader.blend(rng.randrange(257))
+        else:
+            out.fill_raw(*c)
+        for fb in (out, other):
+            if fb.load != sum(fb.buf):
+                failures.append("step %d op %d: load %d, rescan %d" % (step, op, fb.load, sum(fb.buf)))
+                return failures
+    print("running byte sum: 3000 random writes, matches a rescan after each")
+    return failures
+
+
+def check_worst_cases():
+    failures = []
+    sim.install()
+    import neopixel
+    layout = u_layout(("D5", "D6"), PIXELS // 2)
+    strips = [neopixel.NeoPixel(pin, n, brightness=1.0, auto_write=False)
+              for pin, n in zip(layout.pins, layout.sizes)]
+    limiter = CurrentLimiter(PIXELS, BUDGET_MA, MA_PER_CHANNEL, IDLE_MA)
+    output = OutputStage(1.0, 2.0, (255, 255, 255), limiter)
+    fb = FrameBuffer(strips, layout, output)
+
+    def white():
+        fb.fill(255, 255, 255)
+
+    def static():
+        fb.fill(255, 151, 167)   # Final.py's PASTEL_RED
+
+    def peak_row():
+        fb.fill(0, 0, 0)
+        fb.set_row(0, 255, 255, 255)
+
+    def flash():
+        fb.fill(255, 240, 230)
+
+    def one_pixel():
+        fb.fill(0, 0, 0)
+        fb.set(0, 255, 255, 255)
+
+    def half():
+        for i in range(fb.total):
+            v = 255 if i % 2 else 0
+            fb.set(i, v, v, v)
+
+    print("%-10s %10s %10s %10s %8s" % ("frame", "est mA", "pushed mA", "budget", "scale"))
+    for name, draw in (("white", white), ("static", static), ("peak row", peak_row),
+                       ("flash", flash), ("one pixel", one_pixel), ("half", half)):
+        draw()
+        estimate = limiter.estimate_ma(fb.load)
+        exact = current_ma(fb.buf, PIXELS)
+        fb.show()
+        pushed = b"".join(bytes(s.buf) for s in strips)
+        pushed_ma = current_ma(pushed, PIXELS)
+        print("%-10s %10.0f %10.0f %10d %8d" % (name, estimate, pushed_ma, BUDGET_MA, limiter.scale))
+        if abs(estimate - exact) > 1e-6:
+            failures.append("%s: estimate %.1f mA, rescan %.1f mA" % (name, estimate, exact))
+        if pushed_ma > BUDGET_MA:
+            failures.append("%s: pushed %.0f mA over the %d mA budget" % (name, pushed_ma, BUDGET_MA))
+        if pushed_ma > limiter.ma + 1e-6:
+            failures.append("%s: limiter reports %.0f mA, pushed %.0f" % (name, limiter.ma, pushed_ma))
+        if exact <= BUDGET_MA and pushed != bytes(fb.buf):
+            failures.append("%s: under budget but scaled" % name)
+    return failures
+
+
+def frames(path, pixels):
+    """Peak pushed mA over whole frames of a trace, and the frame count."""
+    peak = 0.0
+    count = 0
+    last_t = None
+    state = None
+    for t, s in frametrace.read(path).frames():
+        if last_t is not None and t - last_t > FRAME_GAP:
+            peak = max(peak, current_ma(b"".join(state), pixels))
+            count += 1
+        last_t = t
+        state = list(s)
+    if state is not None:
+        peak = max(peak, current_ma(b"".join(state), pixels))
+        count += 1
+    return peak, count
+
+
+def check_final():
+    failures = []
+    names = sim.run("Final.py", seconds=0.1, realtime=False)["MODE_NAMES"]
+    with tempfile.TemporaryDirectory() as tmp:
+        layout_path = os.path.join(tmp, "layout.txt")
+        u_layout(("D5", "D6"), PIXELS // 2).save(layout_path)
+        for mode in ("STATIC", "SOUND_COLOR", "SOUND_BAR", "RAINBOW_FLOW"):
+            row = []
+            for budget in (BUDGET_MA, 0):
+                trace = os.path.join(tmp, "%s%d.ltrc" % (mode, budget))
+                g = sim.run("Final.py", seconds=3.0, realtime=False, seed=1, trace=trace,
+                            audio=sim.SyntheticAudio(),
+                            config={"LAYOUT_FILE": layout_path, "mode": names.index(mode),
+                                    "BRIGHTNESS": 1.0, "CURRENT_BUDGET_MA": budget,
+                                    "LED_MA_PER_CHANNEL": MA_PER_CHANNEL,
+                                    "LED_IDLE_MA": IDLE_MA, "NOISE_GATE": False})
+                peak, count = frames(trace, PIXELS)
+                limiter = g["limiter"]
+                row.append("%s peak %6.0f mA%s" % (
+                    "limited" if budget else "off    ", peak,
+                    " (%d/%d frames scaled)" % (limiter.limited, limiter.frames) if limiter else ""))
+                if budget and peak > budget:
+                    failures.append("%s: a pushed frame drew %.0f mA" % (mode, peak))
+            print("  %-13s %s | %s" % (mode, row[0], row[1]))
+    return failures
+
+
+def main():
+    failures = check_load()
+    failures += check_worst_cases()
+    print("Final.py, %d pixels, brightness 1.0, budget %d mA:" % (PIXELS, BUDGET_MA))
+    failures += check_final()
+    for f in failures:
+        print(f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
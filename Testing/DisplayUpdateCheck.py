@@ -0,0 +1,208 @@
+# Weather dashboard display updates (Testing/IconWeather/code.py, view.py)
+# under the simulator's displayio stand-in, on the host.
+#   python3 Testing/DisplayUpdateCheck.py
+# Runs code.py on the virtual clock against a local stand-in for the
+# OpenWeatherMap endpoint, polling every POLL_SECONDS for POLLS polls: the
+# observation changes only now and then, as OpenWeatherMap's does, and the
+# server fails for a couple of polls in the middle. Checks that the screen
+# ends up showing the last observation, that auto_refresh stays off and
+# that there is exactly one display refresh per poll that changed
+# something (none for the others).
+#
+# Then replays the same polls through the app's view, and through plain
+# assignments to every label with auto_refresh on (the update_ui the view
+# replaced), and prints for each: label renders, pixels rendered, display
+# refreshes, pixels sent to the panel and host time per poll. Exits with
+# status 1 on any failure.
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+
+SCRIPT = os.path.join("Testing", "IconWeather", "code.py")
+ICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "IconWeather", "Icons")
+POLL_SECONDS = 60
+POLLS = 30
+FAILING = (12, 13)        # polls the server answers 500
+REPEATS = 20
+
+
+def observation(k):
+    """What the server reports at poll k: temperature drifts, rain comes in at 18."""
+    rain = k >= 18
+    temp = 58.3 + (k // 5) * 0.4
+    return {
+        "weather": [{"id": 500 if rain else 803, "main": "Rain" if rain else "Clouds",
+                     "description": "light rain" if rain else "broken clouds",
+                     "icon": "10d" if rain else "04d"}],
+        "main": {"temp": temp, "feels_like": temp - 1.1, "pressure": 1016, "humidity": 77},
+        "dt": 1760700000 + (k // 10) * 600,
+        "name": "San Francisco",
+        "cod": 200,
+    }
+
+
+class Server:
+    def __init__(self):
+        self.hits = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                k = server.hits
+                server.hits += 1
+                if k in FAILING:
+                    self.send_response(500)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(observation(k)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d/data/2.5/weather" % self.httpd.server_port
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def polls(g):
+    """(observation or None, status) per poll, as the app's weather cache sees them."""
+    steps = []
+    for k in range(POLLS):
+        if k in FAILING:
+            steps.append((None, "Offline"))
+        else:
+            found = {p: g["weather_cache"].json_extract.lookup(observation(k), p)
+                     for p in g["weather_cache"].OWM_PATHS}
+            steps.append((g["weather_cache"].observation(found), "Updated"))
+    return steps
+
+
+def expected_refreshes(g, steps):
+    shown = {"title": "Weather", "temp": "--", "cond": "--", "status": "", "icon": None}
+    n = 1   # the layout, at boot
+    for obs, status in steps:
+        fields = {"status": status} if obs is None else g["screen"](obs, status)
+        if any(shown[f] != fields[f] for f in fields):
+            n += 1
+        shown.update(fields)
+    return n
+
+
+def labels(g):
+    return [g[name] for name in ("title", "temp_lbl", "cond_lbl", "updated")]
+
+
+def with_view(g, obs, status):
+    if obs is None:
+        g["view"].set("status", status)
+    else:
+        g["update_ui"](obs, status)
+    g["view"].refresh()
+
+
+def unconditional(g, obs, status):
+    # Every label assigned and the temperature resized on every poll, with
+    # auto_refresh on
+    if obs is None:
+        g["updated"].text = status
+        return
+    fields = g["screen"](obs, status)
+    g["title"].text = fields["title"]
+    temp_lbl = g["temp_lbl"]
+    temp_lbl.text = fields["temp"]
+    avail = max(30, (g["W"] - g["MARGIN"]) - int(g["W"] * 0.52))
+    for s in (4, 3, 2, 1):
+        if len(temp_lbl.text) * 6 * s <= avail:
+            temp_lbl.scale = s
+            temp_lbl.anchored_position = (g["W"] - g["MARGIN"], g["HEADER_H"] + g["MARGIN"])
+            break
+    g["cond_lbl"].text = fields["cond"]
+    g["updated"].text = status
+    g["icons"].show(fields["icon"])
+
+
+def replay(g, steps, update, auto_refresh):
+    display = g["display"]
+    display.auto_refresh = auto_refresh
+    for lbl in labels(g):
+        lbl.renders = lbl.rendered_pixels = 0
+    display.refreshes = display.pixels = 0
+    for obs, status in steps:
+        update(g, obs, status)
+    counts = (sum(lbl.renders for lbl in labels(g)), sum(lbl.rendered_pixels for lbl in labels(g)),
+              display.refreshes, display.pixels)
+    t = time.perf_counter()
+    for _ in range(REPEATS):
+        for obs, status in steps:
+            update(g, obs, status)
+    us = (time.perf_counter() - t) / (REPEATS * len(steps)) * 1e6
+    display.auto_refresh = False
+    return counts + (us,)
+
+
+def main():
+    failures = []
+    server = Server()
+    with tempfile.TemporaryDirectory() as tmp:
+        g = sim.run(SCRIPT, seconds=POLLS * POLL_SECONDS, realtime=False,
+                    config={"API": server.url, "ICON_DIR": ICON_DIR, "POLL_SECONDS": POLL_SECONDS,
+                            "CACHE_FILE": os.path.join(tmp, "weather.json"),
+                            "CACHE_FRESH_SECONDS": 0})
+    server.close()
+    sim.state.seconds = None   # the replays below run past the limit
+    display, view = g["display"], g["view"]
+    steps = polls(g)
+
+    want = g["screen"](steps[-1][0], "Updated")
+    got = {"title": g["title"].text, "temp": g["temp_lbl"].text, "cond": g["cond_lbl"].text,
+           "status": g["updated"].text, "icon": g["icons"].current}
+    want_refreshes = expected_refreshes(g, steps)
+    print("%d polls: %d requests, %d display refreshes (%d expected), %d fields set, %d unchanged"
+          % (POLLS, server.hits, display.refreshes, want_refreshes, view.writes, view.skips))
+    print("showing: %s" % ", ".join("%s=%r" % kv for kv in sorted(got.items())))
+    if server.hits != POLLS:
+        failures.append("%d requests for %d polls" % (server.hits, POLLS))
+    if got != want:
+        failures.append("screen shows %r, not %r" % (got, want))
+    if display.auto_refresh:
+        failures.append("auto_refresh is on")
+    if display.refreshes != want_refreshes or view.refreshes != want_refreshes:
+        failures.append("%d display / %d view refreshes, %d expected"
+                        % (display.refreshes, view.refreshes, want_refreshes))
+
+    print("\n%-14s %8s %11s %10s %11s %9s" % ("update", "renders", "render px", "refreshes",
+                                             "px sent", "us/poll"))
+    rows = (("view", with_view, False), ("unconditional", unconditional, True))
+    results = {}
+    for name, update, auto_refresh in rows:
+        results[name] = replay(g, steps, update, auto_refresh)
+        print("%-14s %8d %11d %10d %11d %9.0f" % ((name,) + results[name]))
+    print("(%d polls each; px sent: dirty areas at refresh, 2 bytes a pixel over SPI)" % len(steps))
+    if results["view"][3] >= results["unconditional"][3]:
+        failures.append("the view sent as much as unconditional updates")
+    for f in failures:
+        print(f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
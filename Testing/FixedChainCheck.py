@@ -0,0 +1,154 @@
+# Fixed-point feature chain against the float reference.
+# Host:  python3 Testing/FixedChainCheck.py [clip.wav ...]
+# Board: copy next to features.py / audio_level.py and run it.
+# Feeds the same audio through FeatureChain (rms()) and FixedFeatureChain
+# (rms_raw()), checks env_n / punch / auto_gain stay within tolerance of the
+# float path, and prints the time per update for both. Auto-gain steps when
+# env_n crosses a threshold, and the two paths can cross one update apart,
+# so each fixed value is compared against the closest of the float path's
+# values one update either side. The built-in input
+# is integer-generated, so its checksum of the fixed chain's state has to
+# come out as EXPECTED_CHECKSUM on every port: that's the bit-for-bit check.
+
+import sys
+import time
+import array
+
+try:
+    import os
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+except (AttributeError, NameError):
+    pass  # on the board the modules sit next to this file
+
+import audio_level
+from features import FeatureChain, FixedFeatureChain
+
+SAMPLES = 320
+# A threshold crossing the paths disagree on (by ~1e-4 in env_n) leaves
+# auto_gain one step apart for a while: up to ~3% of gain, 2% of env_n.
+TOL_ENV_N = 0.02       # absolute, 0..1
+TOL_PUNCH = 0.02       # absolute, 0..1
+TOL_GAIN = 0.03        # relative
+SYNTHETIC_FRAMES = 3000  # one minute at 50 updates a second
+EXPECTED_CHECKSUM = 877014
+
+
+def synthetic_levels(frames=SYNTHETIC_FRAMES):
+    """RMS per update in sample units: quiet room, talking, music with kicks, loud, fade, silence."""
+    seed = 1
+    kick = 0
+    levels = []
+    for f in range(frames):
+        seed = (seed * 75 + 74) % 65537
+        noise = seed % 64
+        t = f * 10 // frames          # ten sections
+        if t < 1:
+            v = 30 + noise // 2
+        elif t < 3:
+            v = 200 + (seed % 600) * ((f // 20) % 2)
+        elif t < 8:
+            if f % 25 == 0:
+                kick = 4000 if t < 6 else 12000
+            kick = kick * 3 // 4
+            v = (600 if t < 6 else 3000) + kick + noise * 4
+        elif t < 9:
+            v = 3000 * (frames - f) // frames + noise
+        else:
+            v = noise // 8
+        levels.append(v)
+    return levels
+
+
+def wav_buffers(path):
+    # 16-bit signed PCM -> unsigned, the way PDMIn hands it to Final.py
+    import wave
+    bufs = []
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(path + ": need 16-bit PCM")
+        channels = w.getnchannels()
+        while True:
+            pcm = array.array("h", w.readframes(SAMPLES))[::channels]
+            if len(pcm) < SAMPLES:
+                break
+            bufs.append(array.array("H", [v + 32768 for v in pcm]))
+    return bufs
+
+
+def wav_levels(path):
+    """(float levels, integer levels) per capture window of a WAV file."""
+    floats = audio_level.IntLevel()
+    ints = audio_level.IntLevel()
+    bufs = wav_buffers(path)
+    return [floats.rms(b) for b in bufs], [ints.rms_raw(b) for b in bufs]
+
+
+def outputs(chain, inputs):
+    env_n = []
+    punch = []
+    gain = []
+    for x in inputs:
+        chain.update(x)
+        env_n.append(chain.env_n)
+        punch.append(chain.punch)
+        gain.append(chain.auto_gain)
+    return env_n, punch, gain
+
+
+def worst(ref, fix, relative=False):
+    """Largest difference, each fixed value against the nearest float value within one update."""
+    w = 0.0
+    last = len(ref) - 1
+    for i in range(len(fix)):
+        d = min(abs(fix[i] - ref[j]) / (ref[j] if relative else 1.0)
+                for j in range(max(0, i - 1), min(last, i + 1) + 1))
+        w = max(w, d)
+    return w
+
+
+def compare(name, levels, raws):
+    ref_env, ref_punch, ref_gain = outputs(FeatureChain(), levels)
+    fix_env, fix_punch, fix_gain = outputs(FixedFeatureChain(), raws)
+    worst_env = worst(ref_env, fix_env)
+    worst_punch = worst(ref_punch, fix_punch)
+    worst_gain = worst(ref_gain, fix_gain, relative=True)
+
+    fix = FixedFeatureChain()
+    checksum = 0
+    for raw in raws:
+        fix.update(raw)
+        for v in fix.state():
+            checksum = (checksum * 31 + v) % 1000003
+
+    float_us = per_update_us(FeatureChain(), levels)
+    fixed_us = per_update_us(FixedFeatureChain(), raws)
+    ok = worst_env <= TOL_ENV_N and worst_punch <= TOL_PUNCH and worst_gain <= TOL_GAIN
+    print("%s: %d updates" % (name, len(levels)))
+    print("  max |env_n| diff %.4f  |punch| diff %.4f  auto_gain diff %.2f%%  %s" % (
+        worst_env, worst_punch, worst_gain * 100.0, "ok" if ok else "OUT OF TOLERANCE"))
+    print("  float %.1f us/update  fixed %.1f us/update  checksum %d" % (float_us, fixed_us, checksum))
+    return ok, checksum
+
+
+def per_update_us(chain, inputs):
+    t = time.monotonic_ns()
+    for x in inputs:
+        chain.update(x)
+    return (time.monotonic_ns() - t) / len(inputs) / 1000.0
+
+
+def main(paths):
+    levels = synthetic_levels()
+    ok, checksum = compare("synthetic", [v / audio_level.FULL_SCALE for v in levels],
+                           [v * audio_level.RAW_SCALE for v in levels])
+    if EXPECTED_CHECKSUM is not None and checksum != EXPECTED_CHECKSUM:
+        print("  checksum should be %d: fixed-point output differs on this port" % EXPECTED_CHECKSUM)
+        ok = False
+    for path in paths:
+        levels, raws = wav_levels(path)
+        ok = compare(path, levels, raws)[0] and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,143 @@
+# Noise gate (audio_level.NoiseGate) on the host simulator.
+#   python3 Testing/GateCheck.py [room_noise.wav ...]
+# Noise-only WAV fixtures (written to a temp dir: mic hiss, hiss with mains
+# hum, plus any recordings given) through Final.py's sound modes with the
+# gate on and off. With it on, once the boot calibration and the hold are
+# over nothing should reach the strips and auto-gain shouldn't have moved;
+# off, for comparison, shows the flicker it removes. Then hiss followed by
+# beats: the gate has to open within OPEN_LATENCY of the first one.
+# Exits with status 1 on any failure.
+
+import os
+import sys
+import math
+import array
+import wave
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+
+RATE = 16000
+SECONDS = 8.0
+SETTLED = 3.0           # calibration (1 s) + hold (1 s) + margin
+MUSIC_AT = 4.0          # beats start here in the music fixture
+OPEN_LATENCY = 0.1
+MODE_NAMES = ()         # Final.py's, read at start
+MODES = ("SOUND_BAR", "SOUND_COLOR", "SOUND_SPARKLE", "RAINBOW_FLOW", "SOUND_KICK")
+
+
+def write_wav(path, samples):
+    pcm = array.array("h", samples)
+    if sys.byteorder == "big":
+        pcm.byteswap()
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(pcm.tobytes())
+
+
+def hiss(n, amp, seed):
+    rng = random.Random(seed)
+    return [rng.randint(-amp, amp) for _ in range(n)]
+
+
+def fixtures(tmp):
+    """name -> path of the generated noise-only fixtures."""
+    n = int(SECONDS * RATE)
+    paths = {}
+    paths["hiss"] = os.path.join(tmp, "hiss.wav")
+    write_wav(paths["hiss"], hiss(n, 60, 1))
+    hum = hiss(n, 40, 2)
+    for i in range(n):
+        hum[i] += int(90 * math.sin(2 * math.pi * 60 * i / RATE)
+                      + 30 * math.sin(2 * math.pi * 180 * i / RATE))
+    paths["hum"] = os.path.join(tmp, "hum.wav")
+    write_wav(paths["hum"], hum)
+    return paths
+
+
+def music_fixture(tmp):
+    """Hiss, then decaying bursts at 120 BPM from MUSIC_AT on."""
+    n = int(SECONDS * RATE)
+    samples = hiss(n, 60, 3)
+    start = int(MUSIC_AT * RATE)
+    beat = RATE // 2
+    for i in range(start, n):
+        k = (i - start) % beat
+        samples[i] += int(1500 * math.exp(-k / (0.04 * RATE)) * math.sin(k * 0.07))
+    path = os.path.join(tmp, "music.wav")
+    write_wav(path, samples)
+    return path
+
+
+def run(path, mode, seconds, gate=True):
+    config = {"mode": MODE_NAMES.index(mode), "NOISE_GATE": gate, "DEBUG": False}
+    return sim.run("Final.py", seconds=seconds, realtime=False, seed=1, quiet=True,
+                   audio=sim.WavAudio(path), config=config)
+
+
+def shows(g):
+    return sum(s.shows for s in g["strips"])
+
+
+def check_noise(name, path):
+    failures = []
+    print("%s:" % name)
+    for mode in MODES:
+        row = []
+        for gate in (True, False):
+            early = run(path, mode, SETTLED, gate)
+            late = run(path, mode, SECONDS, gate)
+            pushes = shows(late) - shows(early)
+            rate = pushes / (SECONDS - SETTLED)
+            row.append("%s %5.1f pushes/s gain %.2f" % (
+                "gated" if gate else "open ", rate, late["chain"].auto_gain))
+            if gate:
+                g = late["gate"]
+                if g.open or pushes:
+                    failures.append("%s %s: gate %s, %d pushes after %.0f s (floor %.5f)" % (
+                        name, mode, "open" if g.open else "closed", pushes, SETTLED, g.noise_floor))
+                if late["chain"].auto_gain > 1.0:
+                    failures.append("%s %s: auto-gain climbed to %.2f behind the gate" % (
+                        name, mode, late["chain"].auto_gain))
+        print("  %-14s %s | %s" % (mode, row[0], row[1]))
+    return failures
+
+
+def check_music(path):
+    failures = []
+    for mode in MODES:
+        before = run(path, mode, MUSIC_AT - 0.05)["gate"]
+        after = run(path, mode, MUSIC_AT + OPEN_LATENCY)
+        g = after["gate"]
+        ok = not before.open and g.open and after["features"].env_n > 0.0
+        print("  %-14s closed before the beats: %s, open %.0f ms in: %s  floor %.5f" % (
+            mode, not before.open, OPEN_LATENCY * 1000, g.open, g.noise_floor))
+        if not ok:
+            failures.append("music %s: gate didn't open on the first beat" % mode)
+    return failures
+
+
+def main(paths):
+    global MODE_NAMES
+    MODE_NAMES = sim.run("Final.py", seconds=0.1, realtime=False)["MODE_NAMES"]
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        noise = fixtures(tmp)
+        for p in paths:
+            noise[os.path.basename(p)] = p
+        for name, path in noise.items():
+            failures += check_noise(name, path)
+        print("hiss, then beats at %.0f s:" % MUSIC_AT)
+        failures += check_music(music_fixture(tmp))
+    for f in failures:
+        print(f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
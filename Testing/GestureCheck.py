@@ -0,0 +1,158 @@
+# Button gestures (buttons.py) on the host.
+#   python3 Testing/GestureCheck.py
+# 1. Press / release timelines straight into buttons.Gestures, including
+#    across the ticks wrap, against the gestures they should make.
+# 2. Final.py on the simulator with scripted presses through the keypad
+#    stand-in: the mode and brightness each timeline should end on, and
+#    every press still counted when the input task only gets to the queue
+#    every 100 ms, recovery when the queue overflows, and brightness steps
+#    that don't rebuild a mode's tables.
+# Exits with status 1 on any failure.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+
+sim.install()
+import buttons
+from buttons import SHORT, LONG, DOUBLE
+
+LONG_MS = 600
+DOUBLE_MS = 300
+
+# (name, [(pressed, ms), ...] with an end time last as (None, ms), gestures)
+TIMELINES = (
+    ("short", [(1, 0), (0, 80), (None, 1000)], [SHORT]),
+    ("two shorts", [(1, 0), (0, 80), (1, 500), (0, 580), (None, 1500)], [SHORT, SHORT]),
+    ("double", [(1, 0), (0, 80), (1, 250), (0, 330), (None, 1500)], [DOUBLE]),
+    ("double, held", [(1, 0), (0, 80), (1, 250), (0, 2000), (None, 3000)], [DOUBLE]),
+    ("long", [(1, 0), (0, 1500), (None, 2000)], [LONG]),
+    ("long, then short", [(1, 0), (0, 700), (1, 800), (0, 850), (None, 2000)], [LONG, SHORT]),
+    ("just under long", [(1, 0), (0, 590), (None, 1500)], [SHORT]),
+    ("triple", [(1, 0), (0, 50), (1, 150), (0, 200), (1, 300), (0, 350), (None, 1500)], [DOUBLE, SHORT]),
+)
+
+
+def play(timeline, start, double_ms=DOUBLE_MS, poll_every=20):
+    """Feed a timeline in ms from `start` (ticks), polling as the input task would."""
+    g = buttons.Gestures(LONG_MS, double_ms)
+    out = []
+    now = 0
+    for pressed, t in timeline:
+        while now + poll_every <= t:
+            now += poll_every
+            r = g.poll((start + now) & buttons.TICKS_MASK)
+            if r:
+                out.append(r)
+        if pressed is None:
+            break
+        stamp = (start + t) & buttons.TICKS_MASK
+        r = g.poll(stamp)
+        if r:
+            out.append(r)
+        r = g.event(bool(pressed), stamp)
+        if r:
+            out.append(r)
+    return out
+
+
+def check_gestures():
+    failures = []
+    for name, timeline, want in TIMELINES:
+        for start in (1000, buttons.TICKS_PERIOD - 300):
+            got = play(timeline, start)
+            if got != want:
+                failures.append("%s from tick %d: %s, want %s" % (
+                    name, start, [buttons.NAMES[x] for x in got], [buttons.NAMES[x] for x in want]))
+    got = play([(1, 0), (0, 80), (1, 250), (0, 330), (None, 1000)], 0, double_ms=0)
+    if got != [SHORT, SHORT]:
+        failures.append("double press off: %s, want two SHORTs" % [buttons.NAMES[x] for x in got])
+    print("gesture timelines: %d, each from a plain tick and across the wrap" % len(TIMELINES))
+    return failures
+
+
+def table_loads():
+    """RAINBOW_FLOW through three long presses: how often its rainbow table was loaded."""
+    names = sim.run("Final.py", seconds=0.1, realtime=False)["MODE_NAMES"]
+    loads = []
+
+    def count(frame, event, arg):
+        if event == "call" and frame.f_code.co_name == "rainbow_table":
+            loads.append(frame.f_code.co_filename)
+
+    sys.setprofile(count)
+    try:
+        mode, brightness, g = final([(1.0, 1.0), (2.5, 1.0), (4.0, 1.0)],
+                                    {"mode": names.index("RAINBOW_FLOW")})
+    finally:
+        sys.setprofile(None)
+    return len(loads), brightness
+
+
+def final(presses, config=None):
+    g = sim.run("Final.py", seconds=presses[-1][0] + 2.0, presses=presses, realtime=False,
+                seed=1, config=dict({"PROFILE_REPORT_EVERY": 0}, **(config or {})))
+    return g["MODE_NAMES"][g["mode"]], g["output"].brightness, g
+
+
+def check_final():
+    failures = []
+    names = sim.run("Final.py", seconds=0.1, realtime=False)["MODE_NAMES"]
+    start = names.index("SOUND_BAR")
+    n = len(names)
+    cases = (
+        ("short", [(1.0, 0.08)], names[(start + 1) % n], 0.35),
+        ("double", [(1.0, 0.08), (1.25, 0.08)], names[(start - 1) % n], 0.35),
+        ("long", [(1.0, 1.0)], names[start], 0.6),
+        ("long x3", [(1.0, 1.0), (2.5, 1.0), (4.0, 1.0)], names[start], 0.1),
+        ("3 shorts", [(1.0, 0.08), (1.6, 0.08), (2.2, 0.08)], names[(start + 3) % n], 0.35),
+    )
+    for name, presses, want_mode, want_brightness in cases:
+        mode, brightness, g = final(presses)
+        ok = mode == want_mode and abs(brightness - want_brightness) < 1e-6
+        print("  %-9s -> %-15s brightness %.2f %s" % (name, mode, brightness, "" if ok else "FAIL"))
+        if not ok:
+            failures.append("%s: %s at %.2f, want %s at %.2f" % (
+                name, mode, brightness, want_mode, want_brightness))
+    # The queue keeps presses the loop is too busy to look at
+    presses = [(1.0 + 0.25 * j, 0.05) for j in range(n)]
+    mode, brightness, g = final(presses, {"INPUT_PERIOD": 0.1, "DOUBLE_PRESS": 0})
+    print("  %d 50 ms presses, queue read every 100 ms -> %s (%d queue overflows)" % (
+        n, mode, g["button"].overflows))
+    if mode != names[start]:
+        failures.append("slow reader: ended on %s, want %s after %d presses" % (mode, names[start], n))
+    # More presses than the queue holds before the loop looks: recovers (the
+    # overflow flag is read-only, clear() resets it) and still reads presses
+    presses = [(1.0 + 0.1 * j, 0.05) for j in range(40)] + [(7.0, 0.08)]
+    try:
+        mode, brightness, g = final(presses, {"INPUT_PERIOD": 5.0, "DOUBLE_PRESS": 0})
+        overflows = g["button"].overflows
+    except Exception as e:
+        mode, overflows = "%s: %s" % (type(e).__name__, e), 0
+    print("  %d presses before the queue is read -> %s (%d queue overflows)" % (
+        len(presses) - 1, mode, overflows))
+    if not overflows:
+        failures.append("overflow: %s with no overflow recovered" % mode)
+    # Brightness steps redraw with the new output tables, they don't re-enter
+    loads, brightness = table_loads()
+    print("  3 long presses on RAINBOW_FLOW -> brightness %.2f, rainbow table loaded %d time(s)" % (
+        brightness, loads))
+    if loads != 1:
+        failures.append("brightness changes loaded the rainbow table %d times, want 1" % loads)
+    return failures
+
+
+def main():
+    failures = check_gestures()
+    print("Final.py with scripted presses:")
+    failures += check_final()
+    for f in failures:
+        print(f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# Golden-frame regression for the renderers, on the host simulator.
+#   python3 Testing/GoldenFrames.py [check|record|compare]
+# record:  runs Final.py on synthetic audio (fixed seed), pressing through
+#          every mode, with FEATURE_TRACE on, into Testing/golden/modes.ltrc.
+# check:   (default) replays that trace with FEATURE_REPLAY: no capture, no
+#          DSP, the recorded features go straight to the renderers and
+#          every frame buffer is compared with the recorded one. A renderer
+#          change that moves a single byte shows up as a mismatch. Then
+#          does compare as well.
+# compare: records afresh from the same audio and presses and diffs the
+#          feature values and frame buffers against the golden ones, for
+#          changes on the DSP side. The virtual clock starts at the same
+#          time every run, so a fresh recording matches bit for bit.
+# Also prints wall-clock time per frame, live (capture + DSP + render) and
+# replayed (render only). Exits with status 1 on any mismatch.
+
+import os
+import sys
+import time
+import struct
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+import frametrace
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "modes.ltrc")
+DWELL = 1.5      # seconds in each mode
+FIELDS = ("dt", "env_n", "punch", "bpm", "beat_phase", "rms", "auto_gain")
+MODE_NAMES = None
+
+
+def run(seconds, presses, config):
+    t = time.perf_counter()
+    g = sim.run("Final.py", seconds=seconds, presses=presses, realtime=False, seed=1,
+                audio=sim.SyntheticAudio(seed=1), config=config)
+    return g, time.perf_counter() - t
+
+
+def record(path):
+    global MODE_NAMES
+    MODE_NAMES = sim.run("Final.py", seconds=0.1, realtime=False)["MODE_NAMES"]
+    n = len(MODE_NAMES)
+    presses = [(1.0 + DWELL * j, 0.04) for j in range(n)]
+    g, wall = run(1.0 + DWELL * n, presses,
+                  {"FEATURE_TRACE": path, "PROFILE_REPORT_EVERY": 0, "TRANSITION_TIME": 0.4})
+    recorder = g["recorder"]
+    recorder.close()
+    return recorder.frames, wall
+
+
+def feature_frames(path):
+    """(mode, flags, field values, bands) per FEATURES record."""
+    out = []
+    for kind, t, payload in frametrace.read(path):
+        if kind == frametrace.FEATURES:
+            head = struct.unpack_from(frametrace.FEATURES_HEAD, payload)
+            n = (len(payload) - frametrace.FEATURES_HEAD_SIZE) // 8
+            bands = struct.unpack_from("<%dd" % n, payload, frametrace.FEATURES_HEAD_SIZE)
+            out.append((head[0], head[1], head[2:], bands))
+    return out
+
+
+def frame_buffers(path):
+    return [payload for kind, t, payload in frametrace.read(path) if kind == frametrace.FRAME]
+
+
+def check(path):
+    frames = len(feature_frames(path))
+    g, wall = run(frames / 60.0 + 1.0, (),
+                  {"FEATURE_REPLAY": path, "PROFILE_REPORT_EVERY": 0, "TRANSITION_TIME": 0.4})
+    replay = g["replay"]
+    failures = []
+    if not replay.done:
+        failures.append("replay stopped after %d of %d frames" % (replay.frames, frames))
+    if replay.mismatches:
+        failures.append("%d of %d frames differ from the golden ones, first at frame %d" % (
+            replay.mismatches, replay.frames, replay.first_mismatch))
+    print("replay: %d frames checked, %d mismatches, %.0f us/frame" % (
+        replay.frames, replay.mismatches, wall / max(1, replay.frames) * 1e6))
+    return failures
+
+
+def compare(path):
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        fresh = os.path.join(tmp, "fresh.ltrc")
+        count, wall = record(fresh)
+        print("live:   %d frames, %.0f us/frame" % (count, wall / count * 1e6))
+        want = feature_frames(path)
+        got = feature_frames(fresh)
+        if len(want) != len(got):
+            failures.append("%d feature frames, golden has %d" % (len(got), len(want)))
+        worst = [0.0] * len(FIELDS)
+        bands = 0.0
+        for i, (a, b) in enumerate(zip(want, got)):
+            if a[0] != b[0] or a[1] != b[1]:
+                failures.append("frame %d: mode/flags %d/%d, golden %d/%d" % (i, b[0], b[1], a[0], a[1]))
+                break
+            for k in range(len(FIELDS)):
+                worst[k] = max(worst[k], abs(a[2][k] - b[2][k]))
+            for x, y in zip(a[3], b[3]):
+                bands = max(bands, abs(x - y))
+        print("max feature differences from the golden trace:")
+        for name, d in zip(FIELDS + ("bands",), worst + [bands]):
+            print("  %-10s %g" % (name, d))
+            if d:
+                failures.append("%s differs by up to %g" % (name, d))
+        want = frame_buffers(path)
+        got = frame_buffers(fresh)
+        differ = sum(1 for a, b in zip(want, got) if a != b) + abs(len(want) - len(got))
+        print("frame buffers: %d recorded, %d differ" % (len(got), differ))
+        if differ:
+            failures.append("%d frame buffers differ" % differ)
+    return failures
+
+
+def main(argv):
+    what = argv[1] if len(argv) > 1 else "check"
+    if what == "record":
+        os.makedirs(os.path.dirname(GOLDEN), exist_ok=True)
+        count, wall = record(GOLDEN)
+        print("recorded %d frames through %d modes into %s (%.0f us/frame)" % (
+            count, len(MODE_NAMES), GOLDEN, wall / count * 1e6))
+        return 0
+    failures = []
+    if what != "compare":
+        failures += check(GOLDEN)
+    failures += compare(GOLDEN)
+    for f in failures:
+        print(f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,205 @@
+# Packs Icons/*.bmp into one sprite sheet for code.py (icons.py):
+# Icons/sheet.bmp, one row of equal cells, each icon pre-scaled the way
+# code.py scales it for the display and centred in its cell, in a shared
+# palette of 2**bits colors (4-bit indexed by default, so 16 colors: the
+# icons are a glyph and its antialiasing on the background), and
+# Icons/sheet.txt, the icon file names in cell order. Copy both into
+# ICON_DIR with the rest; the single .bmp files are only needed for icons
+# that aren't in the sheet.
+#
+#   python3 Testing/IconWeather/build_sprites.py [--width 240 --height 135] [--bits 4]
+#
+# Plain Python, no imaging libraries: reads uncompressed 24/32-bit BMPs,
+# writes an uncompressed 1/4/8-bit indexed BMP (what displayio.OnDiskBitmap
+# and adafruit_imageload read).
+
+import os
+import sys
+import glob
+import struct
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ICONS = os.path.join(HERE, "Icons")
+SHEET = "sheet.bmp"
+NAMES = "sheet.txt"
+
+# code.py's layout, for the icon box
+MARGIN = 6
+HEADER_H = 20
+MAX_SCALE = 4
+
+
+def icon_box(width, height):
+    """(x, y, w, h) code.py puts the icon in."""
+    top = HEADER_H + MARGIN
+    bottom = (height - MARGIN) - MARGIN   # the condition label's baseline, less a margin
+    avail_h = max(8, bottom - top)
+    avail_w = max(8, int(width * 0.45) - 2 * MARGIN)
+    return MARGIN, top, avail_w, avail_h
+
+
+def icon_scale(iw, ih, box):
+    """Integer scale code.py gives an iw x ih icon in `box`."""
+    sx = max(1, min(box[2] // iw, box[3] // ih))
+    return max(1, min(sx, MAX_SCALE))
+
+
+def read_bmp(path):
+    """(width, height, [(r, g, b), ...] top row first) of an uncompressed 24/32-bit BMP."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:2] != b"BM":
+        raise ValueError("%s: not a BMP" % path)
+    offset = struct.unpack_from("<I", data, 10)[0]
+    width, height, planes, bpp, compression = struct.unpack_from("<iiHHI", data, 18)
+    if bpp not in (24, 32) or compression not in (0, 3):
+        raise ValueError("%s: %d-bit / compression %d not supported" % (path, bpp, compression))
+    step = bpp // 8
+    row = (width * step + 3) & ~3
+    rows = range(abs(height))
+    pixels = []
+    for y in rows:
+        src = abs(height) - 1 - y if height > 0 else y   # positive height: bottom-up
+        o = offset + src * row
+        for x in range(width):
+            b, g, r = data[o:o + 3]
+            pixels.append((r, g, b))
+            o += step
+    return width, abs(height), pixels
+
+
+def scaled(width, height, pixels, s):
+    if s == 1:
+        return pixels
+    out = []
+    for y in range(height * s):
+        line = pixels[(y // s) * width:(y // s + 1) * width]
+        for x in range(width * s):
+            out.append(line[x // s])
+    return out
+
+
+def median_cut(counts, n):
+    """Up to n colors for {color: count}: split the widest box at its weighted median."""
+    boxes = [list(counts.items())]
+    while len(boxes) < n:
+        best = None
+        for i, box in enumerate(boxes):
+            if len(box) < 2:
+                continue
+            spans = [max(c[0][k] for c in box) - min(c[0][k] for c in box) for k in range(3)]
+            axis = spans.index(max(spans))
+            if best is None or spans[axis] > best[0]:
+                best = (spans[axis], i, axis)
+        if best is None:
+            break
+        _, i, axis = best
+        box = sorted(boxes.pop(i), key=lambda c: c[0][axis])
+        total = sum(c[1] for c in box)
+        acc = 0
+        cut = 1
+        for j, c in enumerate(box):
+            acc += c[1]
+            if acc * 2 >= total:
+                cut = min(max(j + 1, 1), len(box) - 1)
+                break
+        boxes += [box[:cut], box[cut:]]
+    palette = []
+    for box in boxes:
+        total = sum(c[1] for c in box)
+        palette.append(tuple((sum(c[0][k] * c[1] for c in box) + total // 2) // total for k in range(3)))
+    return palette
+
+
+def nearest(palette, color, memo):
+    i = memo.get(color)
+    if i is None:
+        i = min(range(len(palette)),
+                key=lambda k: sum((palette[k][j] - color[j]) ** 2 for j in range(3)))
+        memo[color] = i
+    return i
+
+
+def write_bmp(path, width, height, indices, palette, bits):
+    """Uncompressed indexed BMP, bottom-up rows."""
+    row = ((width * bits + 31) // 32) * 4
+    colors = 1 << bits
+    pal = b"".join(struct.pack("<BBBB", b, g, r, 0) for r, g, b in palette)
+    pal += b"\x00" * (colors * 4 - len(pal))
+    offset = 14 + 40 + len(pal)
+    body = bytearray()
+    per_byte = 8 // bits
+    for y in range(height - 1, -1, -1):
+        line = bytearray(row)
+        for x in range(width):
+            v = indices[y * width + x]
+            k = x // per_byte
+            shift = 8 - bits * (x % per_byte + 1)
+            line[k] |= v << shift
+        body += line
+    header = struct.pack("<2sIHHI", b"BM", offset + len(body), 0, 0, offset)
+    info = struct.pack("<IiiHHIIiiII", 40, width, height, 1, bits, 0, len(body), 2835, 2835, colors, 0)
+    with open(path, "wb") as f:
+        f.write(header + info + pal + body)
+    return offset + len(body)
+
+
+def build(icon_dir=ICONS, width=240, height=135, bits=4):
+    """Writes the sheet and names; returns (names, cell_w, cell_h, palette, sheet bytes)."""
+    box = icon_box(width, height)
+    icons = []
+    for path in sorted(glob.glob(os.path.join(icon_dir, "*.bmp"))):
+        name = os.path.basename(path)
+        if name == SHEET:
+            continue
+        w, h, pixels = read_bmp(path)
+        s = icon_scale(w, h, box)
+        icons.append((name, w * s, h * s, scaled(w, h, pixels, s)))
+    if not icons:
+        raise ValueError("no icons in %s" % icon_dir)
+    cell_w = max(w for _, w, _, _ in icons)
+    cell_h = max(h for _, _, h, _ in icons)
+
+    counts = {}
+    for _, _, _, pixels in icons:
+        for c in pixels:
+            counts[c] = counts.get(c, 0) + 1
+    palette = median_cut(counts, 1 << bits)
+    # Fill the cells around each icon with the color of its corner (the icons' background)
+    fill = icons[0][3][0]
+
+    sheet_w = cell_w * len(icons)
+    indices = bytearray(sheet_w * cell_h)
+    memo = {}
+    background = nearest(palette, fill, memo)
+    for k in range(len(indices)):
+        indices[k] = background
+    for n, (name, w, h, pixels) in enumerate(icons):
+        ox = n * cell_w + (cell_w - w) // 2
+        oy = (cell_h - h) // 2
+        for y in range(h):
+            base = (oy + y) * sheet_w + ox
+            for x in range(w):
+                indices[base + x] = nearest(palette, pixels[y * w + x], memo)
+    size = write_bmp(os.path.join(icon_dir, SHEET), sheet_w, cell_h, indices, palette, bits)
+    with open(os.path.join(icon_dir, NAMES), "w") as f:
+        f.write("\n".join(name for name, _, _, _ in icons) + "\n")
+    return [name for name, _, _, _ in icons], cell_w, cell_h, palette, size
+
+
+def main(argv):
+    p = argparse.ArgumentParser(description="Pack the weather icons into one indexed sprite sheet.")
+    p.add_argument("--icons", default=ICONS, help="directory of icon .bmp files (the sheet goes there too)")
+    p.add_argument("--width", type=int, default=240, help="display width (default 240, Feather ESP32-S3 TFT)")
+    p.add_argument("--height", type=int, default=135, help="display height")
+    p.add_argument("--bits", type=int, default=4, choices=(1, 4, 8), help="bits per pixel (default 4)")
+    args = p.parse_args(argv)
+    names, cell_w, cell_h, palette, size = build(args.icons, args.width, args.height, args.bits)
+    print("%d icons, %dx%d cells, %d colors, %s: %d bytes" % (
+        len(names), cell_w, cell_h, len(palette), SHEET, size))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,14 +1,20 @@
 import time, ssl, wifi, socketpool, adafruit_requests
 import board, displayio, terminalio
 from adafruit_display_text import bitmap_label
+import weather_cache
+from icons import Icons
+from view import View, TextWidths
 
 # ---------------- CONFIG ----------------
 LAT = 37.7195
 LON = -122.4411
 UNITS = "imperial"
 APPID = "API" #API KEY HERE
-ICON_DIR = "/icons"
+API = "https://api.openweathermap.org/data/2.5/weather"
+ICON_DIR = "/icons"   # Icons/ from here, with the sheet build_sprites.py makes
 POLL_SECONDS = 60
+CACHE_FILE = "/weather.json"   # last good observation, shown at boot (needs a writable filesystem)
+CACHE_FRESH_SECONDS = 600      # no request at all while the observation is younger than this
 
 # Colors
 BG = 0x101218
@@ -16,16 +22,10 @@ CARD = 0x181B22
 TEXT_MAIN = 0xFFFFFF
 TEXT_DIM = 0xA9B1C6
 
-# ---------------- WIFI ------------------
-from secrets import secrets
-wifi.radio.connect(secrets["ssid"], secrets["password"])
-pool = socketpool.SocketPool(wifi.radio)
-requests = adafruit_requests.Session(pool, ssl.create_default_context())
-
 # ---------------- DISPLAY ----------------
 display = board.DISPLAY
 W, H = display.width, display.height
-display.auto_refresh = True
+display.auto_refresh = False   # view.refresh() sends each update in one go
 root = displayio.Group()
 display.root_group = root
 
@@ -52,43 +52,11 @@ cond_lbl = bitmap_label.Label(terminalio.FONT, text="--", color=TEXT_DIM, scale=
                               anchor_point=(0.5, 1), anchored_position=(W/2, H - MARGIN))
 root.append(temp_lbl); root.append(cond_lbl)
 
-icon_tg = None
-def remove_icon():
-    global icon_tg
-    if icon_tg and icon_tg in root:
-        root.remove(icon_tg)
-    icon_tg = None
-
-def load_scaled_icon(name):
-    global icon_tg
-    try:
-        bmp = displayio.OnDiskBitmap(f"{ICON_DIR}/{name}")
-    except Exception as e:
-        print("Icon load failed:", e); return
-
-    top = HEADER_H + MARGIN
-    bottom = int(cond_lbl.anchored_position[1]) - MARGIN
-    avail_h = max(8, bottom - top)
-    avail_w = max(8, int(W * 0.45) - 2*MARGIN)
-
-    iw, ih = bmp.width, bmp.height
-    if iw < 1 or ih < 1:
-        return
-    sx = max(1, min(avail_w // iw, avail_h // ih))
-    sx = max(1, min(sx, 4))
-
-    box_w = iw * sx
-    box_h = ih * sx
-    x = MARGIN + (avail_w - box_w) // 2
-    y = top + (avail_h - box_h) // 2
-
-    icon_tg = displayio.TileGrid(bmp, pixel_shader=bmp.pixel_shader, x=int(x), y=int(y))
-    try:
-        icon_tg.scale = sx
-    except Exception:
-        pass
-
-    root.insert(1, icon_tg)
+# Icon box: left of the temperature, between the header and the condition line
+ICON_BOX = (MARGIN, HEADER_H + MARGIN,
+            max(8, int(W * 0.45) - 2*MARGIN),
+            max(8, int(cond_lbl.anchored_position[1]) - MARGIN - (HEADER_H + MARGIN)))
+icons = Icons(root, 1, ICON_DIR, ICON_BOX)
 
 def icon_for(code, tag):
     if code == 781: return "tornado.bmp"
@@ -113,74 +81,89 @@ def nice_case(s):
     parts = s.replace("_", " ").replace("-", " ").split()
     return " ".join(p[:1].upper() + p[1:] for p in parts)
 
-def fetch_weather():
-    url = ("https://api.openweathermap.org/data/2.5/weather"
-           + "?lat=" + str(LAT)
-           + "&lon=" + str(LON)
-           + "&units=" + UNITS
-           + "&appid=" + APPID)
-    r = requests.get(url, timeout=10)
-    if hasattr(r, "status_code") and r.status_code != 200:
-        print("HTTP", r.status_code)
-        try: print("Body:", r.text)
-        except: pass
-        return None
-    try:
-        return r.json()
-    except Exception as e:
-        print("JSON parse error:", e)
-        return None
+URL = (API
+       + "?lat=" + str(LAT)
+       + "&lon=" + str(LON)
+       + "&units=" + UNITS
+       + "&appid=" + APPID)
 
-def autosize_temp():
+widths = TextWidths(terminalio.FONT)
+
+def autosize_temp(txt):
     right_col_left = int(W * 0.52)
     avail = max(30, (W - MARGIN) - right_col_left)
-    txt = temp_lbl.text if temp_lbl.text else "88F"
-    per_char = 6
+    width = widths.width(txt or "88F")
     for s in (4, 3, 2, 1):
-        if len(txt) * per_char * s <= avail:
-            temp_lbl.scale = s
-            temp_lbl.anchored_position = (W - MARGIN, HEADER_H + MARGIN)
+        if width * s <= avail:
+            if temp_lbl.scale != s:   # a new scale renders the label again
+                temp_lbl.scale = s
+                temp_lbl.anchored_position = (W - MARGIN, HEADER_H + MARGIN)
             break
 
-def update_ui(data):
-    name = data.get("name", "Weather")
-    main = data.get("main", {})
-    wlist = data.get("weather", [])
-    if wlist:
-        w0 = wlist[0]
-        code = w0.get("id", 800)
-        desc = nice_case(w0.get("description") or "clear")
-        tag = w0.get("icon", "01d")
-    else:
-        code, desc, tag = 800, "Clear", "01d"
-
-    title.text = name
-    temp_lbl.text = t_ascii(main.get("temp"))
-    autosize_temp()
-    feels = main.get("feels_like")
+def show_icon(name):
+    if name is None:
+        icons.hide()
+        return True
+    return icons.show(name)
+
+# Each update names what every field should show; only changed ones are set
+view = View(display)
+view.label("title", title)
+view.label("temp", temp_lbl, autosize_temp)
+view.label("cond", cond_lbl)
+view.label("status", updated)
+view.bind("icon", show_icon)
+
+def screen(obs, status="Updated"):
+    code = obs.get("id", 800)
+    desc = nice_case(obs.get("description") or "clear")
+    tag = obs.get("icon", "01d")
+    feels = obs.get("feels_like")
     cond_text = desc + ("" if feels is None else " · Feels " + t_ascii(feels))
-    cond_lbl.text = cond_text[:40]
-    updated.text = "Updated"
+    return {"title": obs.get("name") or "Weather",
+            "temp": t_ascii(obs.get("temp")),
+            "cond": cond_text[:40],
+            "status": status,
+            "icon": icon_for(code, tag)}
 
-    remove_icon()
-    load_scaled_icon(icon_for(code, tag))
+def update_ui(obs, status="Updated"):
+    view.apply(screen(obs, status))
 
 def show_error(msg):
-    remove_icon()
-    title.text = "Weather"
-    temp_lbl.text = "--"
-    cond_lbl.text = msg
-    updated.text = ""
+    view.apply({"title": "Weather", "temp": "--", "cond": msg, "status": "", "icon": None})
+
+# ---------------- CACHE ----------------
+# Whatever was showing before the reset goes up before Wi-Fi is connected
+cache = weather_cache.WeatherCache(CACHE_FILE, CACHE_FRESH_SECONDS)
+if cache.load():
+    update_ui(cache.observation, "Cached")
+view.refresh()
+
+# ---------------- WIFI ------------------
+from secrets import secrets
+requests = None
+
+def connect():
+    global requests
+    wifi.radio.connect(secrets["ssid"], secrets["password"])
+    pool = socketpool.SocketPool(wifi.radio)
+    requests = adafruit_requests.Session(pool, ssl.create_default_context())
 
 # ---------------- LOOP ----------------
 while True:
     try:
-        data = fetch_weather()
-        if data and int(str(data.get("cod", "200"))) == 200:
-            update_ui(data)
-        else:
-            show_error("API error")
+        if requests is None:
+            connect()
+        status = cache.update(requests, URL)
+        if status == weather_cache.UPDATED:
+            update_ui(cache.observation)
+        elif status == weather_cache.NOT_MODIFIED:
+            view.set("status", "Updated")
     except Exception as e:
         print("Update failed:", e)
-        show_error("Network")
+        if cache.observation is not None:
+            view.set("status", "Offline")   # keep showing the last good one
+        else:
+            show_error("API error" if isinstance(e, RuntimeError) else "Network")
+    view.refresh()
     time.sleep(POLL_SECONDS)
\ No newline at end of file
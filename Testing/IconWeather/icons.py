@@ -0,0 +1,116 @@
+# Weather icon for code.py: one TileGrid in the display group, changed
+# only when the icon does.
+#
+# With the sprite sheet from build_sprites.py (ICON_DIR/sheet.bmp and
+# sheet.txt) every icon is a cell of one bitmap, already scaled for the
+# display: switching icons is setting the grid's tile index, no file
+# opened. The sheet goes into RAM through adafruit_imageload when that's
+# installed (about 18 KB at 4 bits), otherwise it's read from flash with
+# OnDiskBitmap. Icons missing from the sheet, or no sheet at all, load
+# from their own .bmp as before, scaled at draw time, and the last
+# `cache_size` of those TileGrids are kept, most recently used last, so
+# going back to one doesn't open its file again.
+
+import displayio
+
+try:
+    import adafruit_imageload
+except ImportError:
+    adafruit_imageload = None
+
+SHEET = "sheet.bmp"
+NAMES = "sheet.txt"
+MAX_SCALE = 4
+
+
+class Icons:
+    def __init__(self, group, index, icon_dir, box, cache_size=3):
+        """box: (x, y, w, h) the icon is centred in; it goes into `group` at `index`."""
+        self.group = group
+        self.index = index
+        self.icon_dir = icon_dir
+        self.box = box
+        self.cache_size = cache_size
+        self.current = None       # name of the icon showing, None = none
+        self.grid = None          # its TileGrid
+        self.names = ()           # sheet cells, in order
+        self.sheet = None         # TileGrid over the sheet
+        self.files = []           # [(name, TileGrid)] loaded from single files, most recent last
+        self.opens = 0            # icon files opened
+        self.changes = 0
+        self._load_sheet()
+
+    def _load_sheet(self):
+        path = self.icon_dir + "/" + SHEET
+        try:
+            with open(self.icon_dir + "/" + NAMES) as f:
+                names = tuple(f.read().split())
+            if adafruit_imageload is not None:
+                bmp, palette = adafruit_imageload.load(path, bitmap=displayio.Bitmap,
+                                                       palette=displayio.Palette)
+            else:
+                bmp = displayio.OnDiskBitmap(path)
+                palette = bmp.pixel_shader
+        except (OSError, ValueError) as e:
+            print("No icon sheet, single files:", e)
+            return
+        self.opens += 1
+        cell_w = bmp.width // len(names)
+        cell_h = bmp.height
+        x, y, w, h = self.box
+        self.sheet = displayio.TileGrid(bmp, pixel_shader=palette, width=1, height=1,
+                                        tile_width=cell_w, tile_height=cell_h,
+                                        x=x + (w - cell_w) // 2, y=y + (h - cell_h) // 2)
+        self.names = names
+
+    def _file_grid(self, name):
+        for k in range(len(self.files)):
+            if self.files[k][0] == name:
+                entry = self.files.pop(k)
+                self.files.append(entry)
+                return entry[1]
+        try:
+            bmp = displayio.OnDiskBitmap(self.icon_dir + "/" + name)
+        except Exception as e:
+            print("Icon load failed:", e)
+            return None
+        self.opens += 1
+        iw, ih = bmp.width, bmp.height
+        if iw < 1 or ih < 1:
+            return None
+        x, y, w, h = self.box
+        s = max(1, min(w // iw, h // ih, MAX_SCALE))
+        grid = displayio.TileGrid(bmp, pixel_shader=bmp.pixel_shader,
+                                  x=x + (w - iw * s) // 2, y=y + (h - ih * s) // 2)
+        try:
+            grid.scale = s
+        except Exception:
+            pass
+        self.files.append((name, grid))
+        if len(self.files) > self.cache_size:
+            self.files.pop(0)
+        return grid
+
+    def show(self, name):
+        """Put up icon `name` (a file name in ICON_DIR); nothing to do if it's already up."""
+        if name == self.current:
+            return False
+        if name in self.names:
+            grid = self.sheet
+            grid[0] = self.names.index(name)
+        else:
+            grid = self._file_grid(name)
+        if grid is not self.grid:
+            self.hide()
+            if grid is not None:
+                self.group.insert(self.index, grid)
+        self.grid = grid
+        self.current = name if grid is not None else None
+        self.changes += 1
+        return True
+
+    def hide(self):
+        if self.grid is not None and self.grid in self.group:
+            self.group.remove(self.grid)
+        self.grid = None
+        self.current = None
@@ -0,0 +1,87 @@
+# What code.py's widgets are showing, so an update only touches the ones
+# whose value changed.
+#
+# Setting a bitmap_label's text renders its whole bitmap again even when
+# the text is the same, and with the display's auto_refresh on each change
+# can go out to the panel by itself. code.py turns auto_refresh off and
+# describes the screen for each observation as {field: value}; apply()
+# compares that with what's up and calls the setters of the fields that
+# differ, and refresh() sends all of it in one display.refresh(), or
+# nothing when nothing changed.
+#
+# TextWidths keeps the pixel width of strings in a font, so sizing a label
+# to its text doesn't walk the glyphs again for a string it has seen.
+
+
+class View:
+    def __init__(self, display):
+        self.display = display
+        self.fields = {}      # name -> setter(value)
+        self.shown = {}       # name -> value on screen
+        self.dirty = True     # the first refresh() puts up the whole layout
+        self.writes = 0       # setters called
+        self.skips = 0        # ... not called, value already showing
+        self.refreshes = 0
+
+    def bind(self, name, setter, shown=None):
+        """Field `name` is put up by setter(value); setter returns False if it drew nothing."""
+        self.fields[name] = setter
+        self.shown[name] = shown
+
+    def label(self, name, label, changed=None):
+        """Field `name` is `label`'s text; changed(text) runs after it's set (e.g. to resize)."""
+        def set_text(text):
+            label.text = text
+            if changed is not None:
+                changed(text)
+        self.bind(name, set_text, label.text)
+
+    def set(self, name, value):
+        if self.shown[name] == value:
+            self.skips += 1
+            return False
+        if self.fields[name](value) is not False:
+            self.dirty = True
+        self.shown[name] = value
+        self.writes += 1
+        return True
+
+    def apply(self, fields):
+        """Set every field in {name: value}; True if any changed."""
+        changed = False
+        for name in fields:
+            if self.set(name, fields[name]):
+                changed = True
+        return changed
+
+    def refresh(self):
+        """One display.refresh() for everything set since the last one, if anything was."""
+        if not self.dirty:
+            return False
+        self.display.refresh()
+        self.dirty = False
+        self.refreshes += 1
+        return True
+
+
+class TextWidths:
+    def __init__(self, font, size=16):
+        self.font = font
+        self.size = size      # strings kept; all forgotten when it fills
+        self.cache = {}
+        self.misses = 0
+
+    def width(self, text):
+        """Unscaled pixel width of one line of `text`."""
+        w = self.cache.get(text)
+        if w is None:
+            w = 0
+            for c in text:
+                g = self.font.get_glyph(ord(c))
+                if g is not None:
+                    w += g.shift_x
+            if len(self.cache) >= self.size:
+                self.cache.clear()
+            self.cache[text] = w
+            self.misses += 1
+        return w
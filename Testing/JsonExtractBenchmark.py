@@ -0,0 +1,101 @@
+# Streaming field extraction (json_extract.py) against json.loads on
+# OpenWeatherMap payloads, on the host.
+#   python3 Testing/JsonExtractBenchmark.py [payload.json ...]
+# Testing/WeatherSamples holds one response each of /weather (what the
+# displays fetch), the 5-day /forecast and One Call, in the API's format;
+# pass your own captures (curl -o) to run those as well. For each:
+# time per parse and peak allocation (tracemalloc) for json.loads plus a
+# lookup of the paths, and for extract() fed CHUNK_SIZE-byte chunks as
+# iter_content() would, how much of the body it had to read, and whether
+# both found the same values. Host numbers; what carries over to the board
+# is that extract()'s peak stays flat while json.loads' grows with the
+# payload. extract() is Python against json's C, so it trades time for
+# that: fine once per fetch window. Exits with status 1 if the two disagree.
+
+import os
+import sys
+import time
+import json
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_extract
+from weather_cache import OWM_PATHS, CHUNK_SIZE
+
+SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "WeatherSamples")
+REPEATS = 20
+
+FORECAST_PATHS = ("cod", "city.name", "list.0.main.temp", "list.0.weather.0.id",
+                  "list.0.weather.0.icon", "list.7.main.temp", "list.39.main.temp")
+ONECALL_PATHS = ("current.temp", "current.feels_like", "current.weather.0.id",
+                 "current.weather.0.description", "current.weather.0.icon",
+                 "daily.0.temp.max", "daily.0.temp.min")
+
+
+def paths_for(body):
+    doc = json.loads(body)
+    if "list" in doc:
+        return FORECAST_PATHS
+    if "current" in doc:
+        return ONECALL_PATHS
+    return OWM_PATHS
+
+
+def chunks(body, size):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def with_loads(body, paths):
+    doc = json.loads(body)
+    return {p: json_extract.lookup(doc, p) for p in paths if json_extract.lookup(doc, p) is not None}
+
+
+def with_extract(body, paths):
+    return json_extract.extract(chunks(body, CHUNK_SIZE), paths)
+
+
+def measure(fn, body, paths):
+    t = time.perf_counter()
+    for _ in range(REPEATS):
+        result = fn(body, paths)
+    us = (time.perf_counter() - t) / REPEATS * 1e6
+    tracemalloc.start()
+    fn(body, paths)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, us, peak
+
+
+def main(argv):
+    files = [os.path.join(SAMPLES, n) for n in ("weather.json", "forecast.json", "onecall.json")]
+    files += argv[1:]
+    failures = []
+    print("%-14s %7s %5s %10s %10s %10s %10s %7s" % (
+        "payload", "bytes", "paths", "loads us", "loads peak", "extract us", "extr peak", "read"))
+    for path in files:
+        with open(path, "rb") as f:
+            body = f.read()
+        paths = paths_for(body)
+        want, loads_us, loads_peak = measure(with_loads, body, paths)
+        got, extract_us, extract_peak = measure(with_extract, body, paths)
+        ex = json_extract.Extractor(paths)
+        for c in chunks(body, CHUNK_SIZE):
+            ex.feed(c)
+            if ex.done:
+                break
+        print("%-14s %7d %5d %10.0f %9.1fK %10.0f %9.1fK %6d%%" % (
+            os.path.basename(path), len(body), len(paths), loads_us, loads_peak / 1024.0,
+            extract_us, extract_peak / 1024.0, ex.consumed * 100 // len(body)))
+        if got != want:
+            failures.append("%s: extract %r, json.loads %r" % (os.path.basename(path), got, want))
+    print("(peak: allocation during the parse, the body itself not counted; "
+          "read: share of the body extract() needed, %d-byte chunks)" % CHUNK_SIZE)
+    for f in failures:
+        print(f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
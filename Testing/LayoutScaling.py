@@ -0,0 +1,47 @@
+# Frame cost against pixel count, Final.py on the host simulator.
+#   python3 Testing/LayoutScaling.py [seconds_per_run]
+# Writes a U layout (geometry.py) for each pixel count, runs a few modes on
+# it in real time and prints the profiler's render and show stages: render
+# is the modes' Python per frame, show includes the simulated wire time
+# (30 us per RGB pixel, strips pushed one after another). The noise gate
+# is off: it spends its first second calibrating with the sound modes
+# held on their silent frame, which would be most of a run.
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+import profiler
+from geometry import u_layout
+
+PIXEL_COUNTS = (10, 30, 100, 300, 1000, 2000)
+MODES = ("RAINBOW_FLOW", "SOUND_BAR", "SOUND_SPARKLE", "SOUND_PULSE")
+
+
+def main(seconds):
+    names = sim.run("Final.py", seconds=0.1, realtime=False)["MODE_NAMES"]
+    print("%6s %-14s %10s %10s %12s %10s %6s" % (
+        "pixels", "mode", "render us", "p95 us", "us / pixel", "show us", "fps"))
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in PIXEL_COUNTS:
+            path = os.path.join(tmp, "layout%d.txt" % n)
+            u_layout(("D5", "D6"), n // 2).save(path)
+            for name in MODES:
+                g = sim.run("Final.py", seconds=seconds,
+                            config={"LAYOUT_FILE": path, "mode": names.index(name),
+                                    "PROFILE": True, "PROFILE_REPORT_EVERY": 0,
+                                    "NOISE_GATE": False})
+                prof = g["prof"]
+                render = prof.summary(profiler.STAGE_RENDER)
+                show = prof.summary(profiler.STAGE_SHOW)
+                print("%6d %-14s %10d %10d %12.2f %10d %6.1f" % (
+                    n, name, render[1], render[2], render[1] / float(n), show[1],
+                    g["frame_ticker"].ticks / seconds))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.5))
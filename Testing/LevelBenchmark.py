@@ -0,0 +1,134 @@
+# Level engine micro-benchmark.
+# Host:  python3 Testing/LevelBenchmark.py [clip.wav ...]
+# Board: copy next to audio_level.py; records buffers from the PDM mic.
+# Compares every available backend against the old two-pass helpers,
+# checks they agree within TOLERANCE, and prints time per 320-sample frame.
+
+import sys
+import time
+import math
+import array
+import random
+
+try:
+    import os
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+except (AttributeError, NameError):
+    pass  # on the board audio_level.py sits next to this file
+
+import audio_level
+
+SAMPLES = 320
+N_BUFFERS = 50
+ROUNDS = 5
+TOLERANCE = 1e-5  # absolute, on the 0..1 normalized RMS
+
+
+def reference_rms(buf):
+    # The original mean_u16 + normalized_rms_u16 from Final.py
+    s = 0
+    for v in buf:
+        s += v
+    m = int(s / len(buf))
+    acc = 0
+    for v in buf:
+        d = v - m
+        acc += d * d
+    return math.sqrt(acc / len(buf)) / 65535.0
+
+
+def wav_buffers(path):
+    # 16-bit signed PCM -> unsigned, the way PDMIn hands it to Final.py
+    import wave
+    bufs = []
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(path + ": need 16-bit PCM")
+        channels = w.getnchannels()
+        while True:
+            raw = w.readframes(SAMPLES)
+            pcm = array.array("h", raw)[::channels]
+            if len(pcm) < SAMPLES:
+                break
+            bufs.append(array.array("H", [v + 32768 for v in pcm]))
+    return bufs
+
+
+def mic_buffers(count):
+    import board
+    import audiobusio
+    mic = audiobusio.PDMIn(board.TX, board.D12, sample_rate=16000, bit_depth=16)
+    bufs = []
+    for _ in range(count):
+        b = array.array("H", [0] * SAMPLES)
+        mic.record(b, SAMPLES)
+        bufs.append(b)
+    mic.deinit()
+    return bufs
+
+
+def synthetic_buffers(count):
+    random.seed(1)
+    bufs = []
+    for k in range(count):
+        amp = 200 + 90 * k
+        dc = 32768 + random.randrange(-400, 400)
+        bufs.append(array.array("H", [
+            max(0, min(65535, int(dc + amp * math.sin(i * 0.19 * (1 + k % 5)) + random.randrange(-60, 60))))
+            for i in range(SAMPLES)
+        ]))
+    return bufs
+
+
+def load_buffers(paths):
+    if paths:
+        bufs = []
+        for p in paths:
+            bufs.extend(wav_buffers(p))
+        return bufs[:N_BUFFERS * 20], "wav"
+    try:
+        return mic_buffers(N_BUFFERS), "mic"
+    except ImportError:
+        return synthetic_buffers(N_BUFFERS), "synthetic"
+
+
+def time_per_frame_us(fn, bufs):
+    best = None
+    for _ in range(ROUNDS):
+        t = time.monotonic_ns()
+        for b in bufs:
+            fn(b)
+        dt = (time.monotonic_ns() - t) / len(bufs) / 1000.0
+        if best is None or dt < best:
+            best = dt
+    return best
+
+
+def main(paths):
+    bufs, source = load_buffers(paths)
+    print("buffers:", len(bufs), "source:", source)
+    expected = [reference_rms(b) for b in bufs]
+
+    rows = [("reference", reference_rms, 0.0)]
+    for name in audio_level.available():
+        eng = audio_level.make_engine(name)
+        worst = 0.0
+        for b, want in zip(bufs, expected):
+            worst = max(worst, abs(eng.rms(b) - want))
+        rows.append((name, eng.rms, worst))
+
+    failed = False
+    base = None
+    print("%-10s %10s %8s %12s" % ("backend", "us/frame", "speedup", "max |err|"))
+    for name, fn, err in rows:
+        us = time_per_frame_us(fn, bufs)
+        if base is None:
+            base = us
+        ok = err <= TOLERANCE
+        failed = failed or not ok
+        print("%-10s %10.1f %7.2fx %12.3g%s" % (name, us, base / us, err, "" if ok else "  FAIL"))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
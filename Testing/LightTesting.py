@@ -1,3 +1,16 @@
+# Blinks both strips through the major colors, then a chase.
+# BENCHMARK = True first times the output path instead and prints a table
+# over serial: fill(), per-pixel set, one flat slice write (what
+# framebuffer.py does) and show(), per strip and for the two strips shown
+# back to back as Final.py does, for each pixel count, brightness and pixel
+# order below. "wire" is the time the data itself takes at 800 kHz; show()
+# beyond that is overhead. "frame" is the pair's share of a 60 FPS frame.
+# On the host it needs the simulator's real clock (the virtual one only
+# moves on sleeps, so it would time nothing but show()'s modelled wire
+# time); on the virtual clock the table is skipped:
+#   python3 -m sim --script Testing/LightTesting.py --verbose --realtime --seconds 60 --set BENCHMARK=True
+
+import gc
 import time
 import board
 import neopixel
@@ -6,6 +19,79 @@ import neopixel
 NUM_PIXELS = 5
 BRIGHTNESS = 0.3
 
+BENCHMARK = False
+BENCH_PIXELS = (5, 30, 60, 150, 300)      # per strip
+BENCH_BRIGHTNESS = (1.0, 0.3)             # below 1.0 every write is scaled into a second buffer
+BENCH_ORDERS = ("GRB", "RGB", "GRBW")
+BENCH_REPEATS = 20
+FRAME_US = 1000000 // 60
+
+def bench_us(fn, repeats):
+    """Mean microseconds per call."""
+    t = time.monotonic_ns()
+    for _ in range(repeats):
+        fn()
+    return (time.monotonic_ns() - t) // 1000 // repeats
+
+def bench_strips(n, brightness, order):
+    bpp = len(order)
+    color = (10, 20, 30, 40)[:bpp]
+    data = bytearray(range(256)) * (n * bpp // 256 + 1)
+    data = memoryview(data)[:n * bpp]
+    left = neopixel.NeoPixel(board.D5, n, brightness=brightness, auto_write=False,
+                             pixel_order=getattr(neopixel, order))
+    right = neopixel.NeoPixel(board.D6, n, brightness=brightness, auto_write=False,
+                              pixel_order=getattr(neopixel, order))
+
+    def fill():
+        left.fill(color)
+
+    def set_each():
+        for i in range(n):
+            left[i] = color
+
+    def set_slice():
+        left[0:n] = data
+
+    def pair():
+        left.show()
+        right.show()
+
+    row = (bench_us(fill, BENCH_REPEATS), bench_us(set_each, BENCH_REPEATS),
+           bench_us(set_slice, BENCH_REPEATS), bench_us(left.show, BENCH_REPEATS),
+           bench_us(pair, BENCH_REPEATS))
+    left.deinit()
+    right.deinit()
+    return row
+
+def clock_measures_work():
+    """False on a clock that doesn't move with compute (the simulator's virtual one)."""
+    t = time.monotonic_ns()
+    x = 0
+    for i in range(20000):
+        x += i
+    return time.monotonic_ns() != t
+
+def benchmark():
+    if not clock_measures_work():
+        print("Benchmark skipped: the clock doesn't move with compute (use --realtime on the simulator)")
+        return
+    print("%6s %5s %6s %8s %8s %8s %8s %8s %8s %6s" % (
+        "pixels", "order", "bright", "fill", "set", "slice", "show", "wire", "pair", "frame"))
+    for order in BENCH_ORDERS:
+        for brightness in BENCH_BRIGHTNESS:
+            for n in BENCH_PIXELS:
+                gc.collect()
+                fill_us, set_us, slice_us, show_us, pair_us = bench_strips(n, brightness, order)
+                wire_us = n * len(order) * 10 + 80   # 8 bits at 800 kHz + latch
+                print("%6d %5s %6.2f %8d %8d %8d %8d %8d %8d %5d%%" % (
+                    n, order, brightness, fill_us, set_us, slice_us, show_us, wire_us,
+                    pair_us, pair_us * 100 // FRAME_US))
+    print("(microseconds per call, mean of %d)" % BENCH_REPEATS)
+
+if BENCHMARK:
+    benchmark()
+
 # NeoPixel objects
 pixels_5 = neopixel.NeoPixel(board.D5, NUM_PIXELS, brightness=BRIGHTNESS, auto_write=False)
 pixels_6 = neopixel.NeoPixel(board.D6, NUM_PIXELS, brightness=BRIGHTNESS, auto_write=False)
@@ -0,0 +1,96 @@
+# Host decoder for profiler.py output.
+#   python3 Testing/ProfileDecode.py serial.log [...]   (or pipe the console in)
+#   python3 Testing/ProfileDecode.py --sim 10 [--press 2 ...]
+# Reads @P summary lines and @R raw dumps (send "d" on the serial console to
+# get those) and prints the summaries as a table plus a text histogram of
+# every dumped stage. --sim runs Final.py on the host simulator in real time
+# and decodes its profiler directly.
+
+import os
+import sys
+import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BINS = 12
+BAR = 40
+
+
+def parse(lines):
+    reports = []
+    raw = {}
+    for line in lines:
+        line = line.strip()
+        if line.startswith("@P ") and line != "@P off":
+            f = line.split()
+            stages = {}
+            for item in f[3:]:
+                name, _, vals = item.partition("=")
+                stages[name] = [int(v) for v in vals.split(",")]
+            reports.append((int(f[1]), int(f[2]), stages))
+        elif line.startswith("@R "):
+            _, name, _count, data = (line.split() + [""])[:4]
+            xs = array.array("L")
+            xs.frombytes(bytes.fromhex(data))
+            if sys.byteorder != "little":
+                xs.byteswap()
+            raw[name] = list(xs)
+    return reports, raw
+
+
+def print_reports(reports):
+    for uptime, overruns, stages in reports:
+        print("t=%.1f s  overruns=%d" % (uptime / 1000.0, overruns))
+        print("  %-8s %9s %9s %9s %9s" % ("stage", "min us", "mean us", "p95 us", "max us"))
+        for name, (lo, mean, p95, hi) in stages.items():
+            print("  %-8s %9d %9d %9d %9d" % (name, lo, mean, p95, hi))
+
+
+def histogram(name, xs):
+    if not xs:
+        return
+    lo = min(xs)
+    hi = max(xs)
+    width = max(1, (hi - lo + BINS) // BINS)
+    counts = [0] * BINS
+    for x in xs:
+        counts[min(BINS - 1, (x - lo) // width)] += 1
+    top = max(counts)
+    print("%s: %d samples, %d..%d us" % (name, len(xs), lo, hi))
+    for b in range(BINS):
+        if counts[b]:
+            print("  %7d-%-7d %5d %s" % (lo + b * width, lo + (b + 1) * width - 1, counts[b],
+                                       "#" * max(1, counts[b] * BAR // top)))
+
+
+def run_sim(seconds, presses):
+    import sim
+    g = sim.run("Final.py", seconds=seconds, presses=[(t, 0.05) for t in presses],
+                config={"PROFILE": True})
+    prof = g["prof"]
+    return [prof.report(g["frame_ticker"].overruns)] + prof.dump()
+
+
+def main(argv):
+    if "--sim" in argv:
+        i = argv.index("--sim")
+        seconds = float(argv[i + 1])
+        presses = [float(argv[j + 1]) for j in range(len(argv) - 1) if argv[j] == "--press"]
+        lines = run_sim(seconds, presses)
+    elif len(argv) > 1:
+        lines = []
+        for path in argv[1:]:
+            with open(path) as f:
+                lines.extend(f)
+    else:
+        lines = sys.stdin
+
+    reports, raw = parse(lines)
+    print_reports(reports)
+    for name, xs in raw.items():
+        histogram(name, xs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,49 @@
+# Render-frame jitter of Final.py's task scheduler on the host simulator.
+# python3 Testing/SchedulerJitter.py [seconds_per_mode]
+# Steps through every mode with scripted button presses and reports how late
+# the render task woke up relative to its FPS deadlines. The noise gate is
+# off, so sound modes draw every frame from the start instead of idling on
+# their silent frame through the gate's calibration.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+
+START_MODE = 3     # Final.py boots into SOUND_BAR
+BOOT = 0.5         # first run includes module imports; press after that
+PRESS_GAP = 0.08   # seconds between scripted presses (double press is off, so each one counts)
+PRESS_HOLD = 0.04
+
+
+def percentile(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p * len(xs)))]
+
+
+def main(seconds):
+    print("%-16s %6s %9s %9s %9s %9s" % ("mode", "fps", "mean ms", "p95 ms", "max ms", "overruns"))
+    n_modes = len(sim.run("Final.py", seconds=BOOT)["MODE_NAMES"])
+    for m in range(n_modes):
+        steps = (m - START_MODE) % n_modes
+        presses = [(BOOT + j * PRESS_GAP, PRESS_HOLD) for j in range(steps)]
+        settle = BOOT + 0.2 + steps * PRESS_GAP
+        g = sim.run("Final.py", seconds=settle + seconds, presses=presses,
+                    config={"DOUBLE_PRESS": 0, "NOISE_GATE": False})
+
+        ticker = g["frame_ticker"]
+        late = [x * 1000.0 for x in ticker.recent()]
+        late = late[-int(seconds / ticker.period):]
+        print("%-16s %6.1f %9.2f %9.2f %9.2f %9d" % (
+            g["MODE_NAMES"][g["mode"]],
+            ticker.ticks / (settle + seconds),
+            sum(late) / len(late),
+            percentile(late, 0.95),
+            max(late),
+            ticker.overruns))
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 3.0)
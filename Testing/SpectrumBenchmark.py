@@ -0,0 +1,51 @@
+# FFT size vs frame time for the spectral band stage.
+# Host:  python3 Testing/SpectrumBenchmark.py
+# Board: copy next to spectrum.py (uses ulab + the pure-Python fallback).
+# Times SpectrumAnalyzer.update (window + FFT + bands + envelopes) per
+# backend and FFT size, as a share of the 60 FPS frame budget.
+
+import sys
+import time
+import math
+import array
+
+try:
+    import os
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+except (AttributeError, NameError):
+    pass  # on the board spectrum.py sits next to this file
+
+import spectrum
+
+SIZES = (64, 128, 256, 512, 1024)
+SAMPLE_RATE = 16000
+FRAME_MS = 1000.0 / 60
+ROUNDS = 10
+
+
+def test_buffer(n):
+    return array.array("H", [
+        int(32768 + 900 * math.sin(2 * math.pi * 90 * i / SAMPLE_RATE)
+            + 300 * math.sin(2 * math.pi * 3100 * i / SAMPLE_RATE))
+        for i in range(n)])
+
+
+def main():
+    print("%-8s %6s %10s %10s" % ("backend", "fft", "ms/update", "% frame"))
+    for backend in spectrum.available():
+        for n in SIZES:
+            try:
+                sa = spectrum.SpectrumAnalyzer(n, SAMPLE_RATE, backend=backend)
+            except ValueError:
+                continue  # too few bins for the default bands
+            buf = test_buffer(n)
+            sa.update(buf)
+            t = time.monotonic_ns()
+            for _ in range(ROUNDS):
+                sa.update(buf)
+            ms = (time.monotonic_ns() - t) / ROUNDS / 1e6
+            print("%-8s %6d %10.2f %9.0f%%" % (backend, n, ms, 100.0 * ms / FRAME_MS))
+
+
+if __name__ == "__main__":
+    main()
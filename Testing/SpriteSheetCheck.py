@@ -0,0 +1,98 @@
+# Weather icon sprite sheet (Testing/IconWeather/build_sprites.py) on the host.
+#   python3 Testing/SpriteSheetCheck.py
+# Reads Icons/sheet.bmp back as an indexed BMP and checks it against the
+# single icon files: names, cell size, every icon's pixels where code.py
+# would draw them (scaled and centred the same way), within the palette's
+# color error. Also checks the committed sheet is what the build makes now,
+# and prints flash size against the single files.
+# Exits with status 1 on any failure.
+
+import os
+import sys
+import shutil
+import struct
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "IconWeather"))
+
+import build_sprites
+
+MAX_ERROR = 24   # per channel, from 16 colors over the icons' glyph-on-background ramps
+
+
+def read_indexed(path):
+    """(width, height, [(r, g, b), ...] top row first) of an uncompressed indexed BMP."""
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = struct.unpack_from("<I", data, 10)[0]
+    header = struct.unpack_from("<I", data, 14)[0]
+    width, height, planes, bits, compression = struct.unpack_from("<iiHHI", data, 18)
+    colors = struct.unpack_from("<I", data, 46)[0] or (1 << bits)
+    palette = [(data[o + 2], data[o + 1], data[o]) for o in range(14 + header, 14 + header + colors * 4, 4)]
+    row = ((width * bits + 31) // 32) * 4
+    per_byte = 8 // bits
+    mask = (1 << bits) - 1
+    pixels = []
+    for y in range(height):
+        o = offset + (height - 1 - y) * row
+        for x in range(width):
+            v = (data[o + x // per_byte] >> (8 - bits * (x % per_byte + 1))) & mask
+            pixels.append(palette[v])
+    return width, height, pixels, bits, len(palette)
+
+
+def check():
+    failures = []
+    icons = build_sprites.ICONS
+    with open(os.path.join(icons, build_sprites.NAMES)) as f:
+        names = f.read().split()
+    width, height, sheet, bits, colors = read_indexed(os.path.join(icons, build_sprites.SHEET))
+    cell_w = width // len(names)
+    box = build_sprites.icon_box(240, 135)
+    print("sheet: %d icons, %dx%d cells, %d-bit, %d colors" % (len(names), cell_w, height, bits, colors))
+    singles = 0
+    for n, name in enumerate(names):
+        path = os.path.join(icons, name)
+        singles += os.path.getsize(path)
+        w, h, pixels = build_sprites.read_bmp(path)
+        s = build_sprites.icon_scale(w, h, box)
+        pixels = build_sprites.scaled(w, h, pixels, s)
+        w, h = w * s, h * s
+        ox = n * cell_w + (cell_w - w) // 2
+        oy = (height - h) // 2
+        worst = 0
+        for y in range(h):
+            for x in range(w):
+                a = pixels[y * w + x]
+                b = sheet[(oy + y) * width + ox + x]
+                worst = max(worst, abs(a[0] - b[0]), abs(a[1] - b[1]), abs(a[2] - b[2]))
+        print("  %-26s %3dx%-3d x%d  max error %d" % (name, w // s, h // s, s, worst))
+        if worst > MAX_ERROR:
+            failures.append("%s: color error %d" % (name, worst))
+        if w > cell_w or h > height:
+            failures.append("%s: %dx%d doesn't fit the %dx%d cell" % (name, w, h, cell_w, height))
+    sheet_size = os.path.getsize(os.path.join(icons, build_sprites.SHEET))
+    print("flash: %d bytes in %d files, %d bytes as one sheet" % (singles, len(names), sheet_size))
+
+    # The committed sheet is what the build makes from the icons now
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            shutil.copy(os.path.join(icons, name), tmp)
+        build_sprites.build(tmp)
+        for f in (build_sprites.SHEET, build_sprites.NAMES):
+            with open(os.path.join(tmp, f), "rb") as a, open(os.path.join(icons, f), "rb") as b:
+                if a.read() != b.read():
+                    failures.append("%s is out of date: run build_sprites.py" % f)
+    return failures
+
+
+def main():
+    failures = check()
+    for f in failures:
+        print(f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
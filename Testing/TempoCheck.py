@@ -0,0 +1,94 @@
+# Tempo tracker accuracy check on synthetic click tracks.
+# python3 Testing/TempoCheck.py [seconds]
+# Renders kick-on-the-beat (plus quieter off-beat hats) patterns at a range
+# of tempos, feeds them through the same capture framing, level engine and
+# spectrum analyzer as Final.py, and checks the tracked BPM and beat phase.
+# Exits with status 1 if any track misses TOLERANCE_BPM or TOLERANCE_PHASE.
+
+import sys
+import math
+import array
+import random
+
+try:
+    import os
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+except (AttributeError, NameError):
+    pass
+
+import audio_level
+from spectrum import SpectrumAnalyzer
+from tempo import BeatTracker, spectral_flux
+
+SAMPLE_RATE = 16000
+SAMPLES = 320
+UPDATE_OVERHEAD = 0.0015   # DSP/render time between captures on the board (s)
+TEMPOS = (72, 90, 100, 120, 128, 140, 174)
+TOLERANCE_BPM = 1.5
+TOLERANCE_PHASE = 0.08     # mean |phase error| at the kicks, in beats
+
+
+def click_track(bpm, seconds, seed=1):
+    rnd = random.Random(seed)
+    n = int(seconds * SAMPLE_RATE)
+    out = array.array("H", [0] * n)
+    beat = 60.0 / bpm
+    for i in range(n):
+        t = i / SAMPLE_RATE
+        tb = t % beat
+        th = (t + beat / 2) % beat
+        v = rnd.gauss(0.0, 60.0)
+        if tb < 0.08:  # kick: decaying 70 Hz sine
+            v += 9000.0 * math.exp(-tb * 40.0) * math.sin(2.0 * math.pi * 70.0 * tb)
+        if th < 0.02:  # hat: decaying noise burst
+            v += 1500.0 * math.exp(-th * 200.0) * rnd.uniform(-1.0, 1.0)
+        out[i] = int(32768 + max(-32767.0, min(32767.0, v)))
+    return out
+
+
+def track(bpm, seconds, source, engine, spectrum):
+    audio = click_track(bpm, seconds)
+    tracker = BeatTracker()
+    prev = array.array("f", [0.0] * spectrum.n_bands)
+    beat = 60.0 / bpm
+    errors = []
+    now = 0.0
+    i = 0
+    while i + SAMPLES <= len(audio):
+        buf = audio[i:i + SAMPLES]
+        i += SAMPLES
+        now += SAMPLES / SAMPLE_RATE + UPDATE_OVERHEAD
+        # samples skipped while the board is busy between captures
+        i += int(UPDATE_OVERHEAD * SAMPLE_RATE)
+        t_audio = i / SAMPLE_RATE
+        onset = tracker.level_flux(engine.rms(buf))
+        if source == "level+bands":
+            spectrum.update(buf)
+            onset += spectral_flux(spectrum.levels, prev)
+        tracker.update(onset, now)
+        # score the phase over the second half, against where the last kick was
+        if t_audio > seconds / 2:
+            want = (t_audio % beat) / beat
+            d = abs(tracker.phase - want)
+            errors.append(min(d, 1.0 - d))
+    return tracker, sum(errors) / len(errors)
+
+
+def main(seconds):
+    engine = audio_level.make_engine()
+    spectrum = SpectrumAnalyzer(256, SAMPLE_RATE)
+    failed = 0
+    print("%-12s %6s %8s %7s %7s %6s" % ("source", "true", "tracked", "conf", "phase", ""))
+    for source in ("level", "level+bands"):
+        for bpm in TEMPOS:
+            spectrum.reset()
+            tracker, phase_err = track(bpm, seconds, source, engine, spectrum)
+            ok = abs(tracker.bpm - bpm) <= TOLERANCE_BPM and phase_err <= TOLERANCE_PHASE
+            failed += not ok
+            print("%-12s %6.1f %8.2f %7.2f %7.3f %6s" % (
+                source, bpm, tracker.bpm, tracker.confidence, phase_err, "ok" if ok else "FAIL"))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else 20.0))
@@ -0,0 +1,109 @@
+# Crossfade (transition.py) cost per frame against a single mode, on the
+# host simulator.
+#   python3 Testing/TransitionBenchmark.py [frames]
+# For each layout size: boots Final.py on a U layout of that many pixels,
+# then times the modes' own render() and a fade between pairs of them
+# (both renders + the integer blend) with the fade held halfway; "single"
+# is the costlier of the two modes alone, budget the faded frame's share of
+# a 60 FPS frame. Host times: what carries over to the board is the ratio
+# between the columns. Also counts allocations per faded
+# frame (allocguard's model) and runs every mode change through the real
+# loop in real time, with and without the fade, for frame overruns.
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+import allocguard
+from geometry import u_layout
+
+PIXEL_COUNTS = (10, 100, 300, 1000)
+PAIRS = (("SOUND_COLOR", "SOUND_PULSE"),    # two fills: blended as one pixel
+         ("SOUND_BAR", "SOUND_COLOR"),
+         ("RAINBOW_FLOW", "SOUND_SPARKLE"))
+DT = 1.0 / 60
+
+
+def per_frame_us(fn, frames):
+    t = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return (time.perf_counter() - t) / frames * 1e6
+
+
+def boot(path):
+    g = sim.run("Final.py", seconds=0.2, realtime=False, seed=1, audio=sim.SyntheticAudio(),
+                config={"LAYOUT_FILE": path, "PROFILE_REPORT_EVERY": 0})
+    features = g["features"]
+    features.env_n = 0.5
+    features.punch = 0.2
+    return g
+
+
+def bench(g, frames):
+    modes = g["MODES"]
+    names = g["MODE_NAMES"]
+    fader = g["fader"]
+    features = g["features"]
+    rows = []
+    for a, b in PAIRS:
+        old = modes[names.index(a)]
+        new = modes[names.index(b)]
+        for m in (old, new):
+            m.fb = fader.out
+        old.enter()
+        new.enter()
+        single = max(per_frame_us(lambda: old.render(features, DT), frames),
+                     per_frame_us(lambda: new.render(features, DT), frames))
+        new.exit()
+        fader.start(old, new)
+
+        def faded():
+            fader.render(features, DT)
+            fader.t = fader.duration / 2  # hold it mid-fade
+        blended = per_frame_us(faded, frames)
+        counter = allocguard.TraceCounter()
+        for _ in range(20):
+            faded()
+        allocs = counter.sample()[0] / 20.0
+        counter.close()
+        fader.finish()
+        new.exit()
+        rows.append((a, b, single, blended, allocs))
+    return rows
+
+
+def overruns(fade):
+    names = sim.run("Final.py", seconds=0.1, realtime=False)["MODE_NAMES"]
+    presses = [(0.5 + 0.7 * j, 0.04) for j in range(len(names))]
+    g = sim.run("Final.py", seconds=0.5 + 0.7 * (len(names) + 1), presses=presses,
+                audio=sim.SyntheticAudio(),
+                config={"TRANSITION_TIME": 0.4 if fade else 0, "PROFILE_REPORT_EVERY": 0})
+    return g["frame_ticker"].overruns, g["frame_ticker"].ticks
+
+
+def main(frames):
+    budget = 1e6 / 60
+    print("%6s %-30s %10s %10s %8s %8s" % (
+        "pixels", "fade", "single us", "faded us", "budget", "allocs"))
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in PIXEL_COUNTS:
+            path = os.path.join(tmp, "layout%d.txt" % n)
+            u_layout(("D5", "D6"), n // 2).save(path)
+            g = boot(path)
+            for a, b, single, blended, allocs in bench(g, frames):
+                print("%6d %-30s %10.1f %10.1f %7.0f%% %8.1f" % (
+                    n, a + " -> " + b, single, blended, blended / budget * 100, allocs))
+    for fade in (False, True):
+        missed, ticks = overruns(fade)
+        print("every mode change in real time, %s: %d overruns in %d frames" % (
+            "crossfade" if fade else "hard cut", missed, ticks))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,194 @@
+# Weather cache (weather_cache.py) against a local stand-in for the
+# OpenWeatherMap endpoint, through the simulator's adafruit_requests.
+#   python3 Testing/WeatherCacheCheck.py
+# Walks a boot / reboot / stale / changed / failing sequence and checks,
+# for each step, what update() returned, whether the observation was there
+# before any request, how many requests reached the server and how many
+# body bytes it sent. Once with a server that sends ETags, once with one
+# that only sends Last-Modified, once with one that sends neither.
+# Exits with status 1 on any failure.
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+
+sim.install()
+import adafruit_requests
+import weather_cache
+from weather_cache import UPDATED, NOT_MODIFIED, FRESH
+
+FRESH_SECONDS = 0.5
+
+SAMPLE = {
+    "coord": {"lon": -122.4411, "lat": 37.7195},
+    "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04d"}],
+    "base": "stations",
+    "main": {"temp": 58.3, "feels_like": 57.2, "temp_min": 55.9, "temp_max": 61.0,
+             "pressure": 1016, "humidity": 77},
+    "visibility": 10000,
+    "wind": {"speed": 11.5, "deg": 270},
+    "clouds": {"all": 75},
+    "dt": 1760700000,
+    "sys": {"type": 2, "id": 2007135, "country": "US", "sunrise": 1760710000, "sunset": 1760750000},
+    "timezone": -25200,
+    "id": 5391959,
+    "name": "San Francisco",
+    "cod": 200,
+}
+
+
+class Server:
+    """The /weather endpoint: `version` bumps the data; validators per `mode`."""
+
+    def __init__(self, mode):
+        self.mode = mode          # "etag", "last-modified" or "none"
+        self.version = 1
+        self.fail = False
+        self.hits = 0
+        self.not_modified = 0
+        self.body_bytes = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.hits += 1
+                if server.fail:
+                    self.send_response(500)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                etag = '"v%d"' % server.version
+                modified = "Fri, 17 Oct 2025 10:%02d:00 GMT" % server.version
+                if ((server.mode == "etag" and self.headers.get("If-None-Match") == etag)
+                        or (server.mode == "last-modified"
+                            and self.headers.get("If-Modified-Since") == modified)):
+                    server.not_modified += 1
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                data = dict(SAMPLE, main=dict(SAMPLE["main"], temp=SAMPLE["main"]["temp"] + server.version))
+                body = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if server.mode == "etag":
+                    self.send_header("ETag", etag)
+                elif server.mode == "last-modified":
+                    self.send_header("Last-Modified", modified)
+                self.end_headers()
+                server.body_bytes += len(body)   # before the client can see it
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d/data/2.5/weather?lat=37.7195&lon=-122.4411" % self.httpd.server_port
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def run(mode, path):
+    failures = []
+    server = Server(mode)
+    session = adafruit_requests.Session(None, None)
+    conditional = mode != "none"
+    print("server validators: %s" % mode)
+    print("  %-30s %-29s %6s %6s %6s" % ("step", "update()", "temp", "hits", "bytes"))
+
+    def step(name, cache, want, want_temp, want_hits):
+        hits, sent = server.hits, server.body_bytes
+        try:
+            got = cache.update(session, server.url)
+        except Exception as e:
+            got = "raised " + type(e).__name__
+        obs = cache.observation
+        temp = obs["temp"] if obs else None
+        print("  %-30s %-29s %6s %6d %6d" % (name, got, temp, server.hits - hits, server.body_bytes - sent))
+        if got != want or temp != want_temp or server.hits - hits != want_hits:
+            failures.append("%s, %s: %s, temp %s, %d requests; want %s, temp %s, %d" % (
+                mode, name, got, temp, server.hits - hits, want, want_temp, want_hits))
+
+    cache = weather_cache.WeatherCache(path, FRESH_SECONDS)
+    if cache.load() is not None:
+        failures.append("%s: cold boot found an observation" % mode)
+    step("cold boot", cache, UPDATED, 59.3, 1)
+    step("again, within the window", cache, FRESH, 59.3, 0)
+
+    # Reboot: the observation is there before any request, and still fresh
+    cache = weather_cache.WeatherCache(path, FRESH_SECONDS)
+    if cache.load() is None or cache.observation["temp"] != 59.3 or not cache.from_flash:
+        failures.append("%s: reboot didn't restore the observation" % mode)
+    step("reboot, within the window", cache, FRESH, 59.3, 0)
+
+    time.sleep(FRESH_SECONDS)
+    step("stale, unchanged", cache, NOT_MODIFIED if conditional else UPDATED, 59.3, 1)
+    if conditional and cache.from_flash:
+        failures.append("%s: still marked as from flash after a 304" % mode)
+
+    # Reboot with the RTC unset: age unknown, so ask (conditionally) at once
+    with open(path) as f:
+        saved = json.load(f)
+    saved["fetched"] = 0
+    with open(path, "w") as f:
+        json.dump(saved, f)
+    cache = weather_cache.WeatherCache(path, FRESH_SECONDS)
+    cache.load()
+    step("reboot, clock not set", cache, NOT_MODIFIED if conditional else UPDATED, 59.3, 1)
+
+    server.version = 2
+    time.sleep(FRESH_SECONDS)
+    step("stale, changed", cache, UPDATED, 60.3, 1)
+
+    server.fail = True
+    time.sleep(FRESH_SECONDS)
+    step("stale, server error", cache, "raised RuntimeError", 60.3, 1)
+    server.fail = False
+
+    server.close()
+    step("stale, server gone", cache, "raised ConnectionRefusedError", 60.3, 0)
+
+    cache = weather_cache.WeatherCache(path, FRESH_SECONDS)
+    if cache.load() is None or cache.observation["temp"] != 60.3:
+        failures.append("%s: the last good observation didn't survive the failures" % mode)
+    print("  %d requests, %d answered 304, %d body bytes" % (server.hits, server.not_modified, server.body_bytes))
+    return failures
+
+
+def check_read_only():
+    cache = weather_cache.WeatherCache("/nonexistent/dir/weather.json", FRESH_SECONDS)
+    server = Server("etag")
+    try:
+        ok = cache.update(adafruit_requests.Session(None, None), server.url) == UPDATED
+    finally:
+        server.close()
+    print("read-only filesystem: updated in memory %s, writable %s" % (ok, cache.writable))
+    if not ok or cache.writable:
+        return ["read-only filesystem: update() should still work, in memory"]
+    return []
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("etag", "last-modified", "none"):
+            failures += run(mode, os.path.join(tmp, mode + ".json"))
+    failures += check_read_only()
+    for f in failures:
+        print(f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
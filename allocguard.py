@@ -0,0 +1,180 @@
+# Heap allocation guard for the main loop.
+# frame(mode) is called once per rendered frame; whatever the whole loop
+# (every task) allocated since the last call is charged to that mode. The
+# first `warmup` frames after a mode change are skipped (lazy setup is fine),
+# everything after is steady state and should allocate nothing.
+#
+# On the board (and the MicroPython unix port) the counter is gc.mem_free():
+# a drop is bytes allocated, a rise means a collection ran. CPython can't see
+# MicroPython's heap, so there the counter is a model: an opcode tracer over
+# this directory's code that counts what MicroPython would put on the heap
+# (tuple/list/dict/set/slice/string building, closures, *args calls and new
+# generators/coroutines other than asyncio.sleep). It doesn't see long ints
+# or allocations inside C modules; the board is the final word.
+#
+#   @A <mode> frames=<n> alloc_frames=<n> <bytes|allocs>=<n> worst=<n> gc=<n>
+
+import gc
+import sys
+import array
+
+
+class MemFreeCounter:
+    unit = "bytes"
+
+    def __init__(self):
+        self._free = gc.mem_free()
+
+    def sample(self):
+        """(allocated since the last sample, whether a collection ran)."""
+        free = gc.mem_free()
+        used = self._free - free
+        self._free = free
+        if used < 0:
+            return 0, True
+        return used, False
+
+    def close(self):
+        pass
+
+
+# Bytecodes that allocate on MicroPython's heap
+ALLOC_OPS = ("BUILD_TUPLE", "BUILD_LIST", "BUILD_MAP", "BUILD_SET", "BUILD_CONST_KEY_MAP",
+             "BUILD_STRING", "FORMAT_VALUE", "BUILD_SLICE", "BINARY_SLICE", "STORE_SLICE",
+             "MAKE_FUNCTION", "CALL_FUNCTION_EX", "LIST_TO_TUPLE")
+# Awaitables MicroPython's asyncio hands out without allocating
+FREE_CALLS = ("sleep",)
+
+
+class TraceCounter:
+    unit = "allocs"
+
+    def __init__(self, root=None):
+        import os
+        import dis
+        here = os.path.abspath(__file__)
+        self._dis = dis
+        self._self = here
+        self._root = root or os.path.dirname(here)
+        self._ops = set(dis.opmap[n] for n in ALLOC_OPS if n in dis.opmap)
+        self._resume = dis.opmap.get("RESUME")
+        self._ours = {}      # code -> traced?
+        self._sites = {}     # code -> allocating instruction offsets
+        self._starts = {}    # code -> offset a fresh generator frame starts at
+        self.count = 0
+        self._last = 0
+        sys.settrace(self._call)
+
+    def _is_ours(self, code):
+        ours = self._ours.get(code)
+        if ours is None:
+            import os
+            path = os.path.abspath(code.co_filename)
+            ours = os.path.dirname(path) == self._root and path != self._self
+            self._ours[code] = ours
+        return ours
+
+    def _start(self, code):
+        start = self._starts.get(code)
+        if start is None:
+            start = -1
+            if self._resume is not None:
+                for ins in self._dis.get_instructions(code):
+                    if ins.opcode == self._resume:
+                        start = ins.offset
+                        break
+            self._starts[code] = start
+        return start
+
+    def _call(self, frame, event, arg):
+        code = frame.f_code
+        # A generator/coroutine frame starting (not resuming) from our code
+        if code.co_flags & 0x2A0 and code.co_name not in FREE_CALLS:
+            caller = frame.f_back
+            if (caller is not None and self._is_ours(caller.f_code)
+                    and frame.f_lasti <= self._start(code)):
+                self.count += 1
+        if not self._is_ours(code):
+            return None
+        frame.f_trace_opcodes = True
+        return self._opcode
+
+    def _opcode(self, frame, event, arg):
+        if event == "opcode":
+            code = frame.f_code
+            sites = self._sites.get(code)
+            if sites is None:
+                sites = set(ins.offset for ins in self._dis.get_instructions(code)
+                            if ins.opcode in self._ops)
+                self._sites[code] = sites
+            if frame.f_lasti in sites:
+                self.count += 1
+        return self._opcode
+
+    def sample(self):
+        used = self.count - self._last
+        self._last = self.count
+        return used, False
+
+    def close(self):
+        sys.settrace(None)
+
+
+def make_counter():
+    if hasattr(gc, "mem_free"):
+        return MemFreeCounter()
+    if hasattr(sys, "settrace"):
+        return TraceCounter()
+    raise RuntimeError("no way to measure allocations here")
+
+
+class AllocGuard:
+    def __init__(self, n_modes, warmup=30, counter=None):
+        self.counter = counter or make_counter()
+        self.unit = self.counter.unit
+        self.warmup = warmup
+        self.frames = array.array("L", [0] * n_modes)        # steady-state frames seen
+        self.alloc_frames = array.array("L", [0] * n_modes)  # ... that allocated
+        self.allocated = array.array("L", [0] * n_modes)     # total, in `unit`
+        self.worst = array.array("L", [0] * n_modes)         # most in one frame
+        self.gc_events = array.array("L", [0] * n_modes)
+        self._mode = -1
+        self._settle = 0
+
+    def frame(self, mode):
+        used, collected = self.counter.sample()
+        if mode != self._mode:
+            self._mode = mode
+            self._settle = self.warmup
+            return
+        if self._settle:
+            self._settle -= 1
+            return
+        self.frames[mode] += 1
+        if used or collected:
+            self.alloc_frames[mode] += 1
+            self.allocated[mode] += used
+            if used > self.worst[mode]:
+                self.worst[mode] = used
+        if collected:
+            self.gc_events[mode] += 1
+
+    def skip(self):
+        """Don't charge what's allocated until the next frame (e.g. a report print)."""
+        self.counter.sample()
+
+    def failures(self):
+        """Modes that allocated in steady state."""
+        return [m for m in range(len(self.frames)) if self.alloc_frames[m]]
+
+    def report(self, names):
+        lines = []
+        for m in range(len(self.frames)):
+            if self.frames[m]:
+                lines.append("@A %s frames=%d alloc_frames=%d %s=%d worst=%d gc=%d" % (
+                    names[m], self.frames[m], self.alloc_frames[m], self.unit,
+                    self.allocated[m], self.worst[m], self.gc_events[m]))
+        return lines
+
+    def close(self):
+        self.counter.close()
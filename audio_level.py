@@ -0,0 +1,218 @@
+# Audio level engine: DC removal + RMS over a PDM sample buffer in one pass.
+# Backends, fastest first: ulab.numpy (on the board), numpy (Linux host),
+# and a plain integer loop that runs anywhere.
+# prepare(buf) once per capture buffer, then rms() on what it returned each
+# update: for the array backends that's an array view made once, instead of
+# a new one (a heap allocation) every call. rms_raw() is the same level as an
+# integer in 1/RAW_SCALE sample units, for the fixed-point feature chain.
+# NoiseGate sits on the rms_raw() levels: it measures the room's noise floor
+# and says when there's anything above it worth animating.
+
+import math
+
+try:
+    from ulab import numpy as _ulab_np
+except ImportError:
+    _ulab_np = None
+
+try:
+    import numpy as _host_np
+except ImportError:
+    _host_np = None
+
+FULL_SCALE = 65535.0
+RAW_SCALE = 16  # rms_raw() units per sample unit: quiet rooms sit near 30, so whole units are too coarse
+RAW_FULL_SCALE = FULL_SCALE * RAW_SCALE  # rms_raw() units per normalized level
+
+
+def isqrt(n):
+    """floor(sqrt(n)) for 0 <= n < 2**30, digit by digit in small ints."""
+    r = 0
+    bit = 1 << 28
+    while bit > n:
+        bit >>= 2
+    while bit:
+        if n >= r + bit:
+            n -= r + bit
+            r = (r >> 1) + bit
+        else:
+            r >>= 1
+        bit >>= 2
+    return r
+
+
+class IntLevel:
+    """
+    Integer-only single pass. Accumulates around the previous frame's DC
+    estimate, and returns exactly what the old two-pass mean/RMS helpers
+    did. Centring keeps the sums small ints only for quiet and moderate
+    input: over 320 samples the sum of squares passes 2**30 above an RMS
+    of about 1830 sample units (rms() near 0.028), and louder frames
+    become long ints on the board, which allocate. ulab has no such limit.
+    """
+    name = "int"
+
+    def __init__(self):
+        self.dc = 32768
+
+    def prepare(self, buf):
+        return buf
+
+    def _power(self, buf):
+        c = self.dc
+        s = 0
+        ss = 0
+        for v in buf:
+            d = v - c
+            s += d
+            ss += d * d
+        n = len(buf)
+        # k = int(mean) - c, so sum((v - int(mean))^2) = ss - 2ks + nk^2
+        k = s // n
+        self.dc = c + k
+        return ss - 2 * k * s + n * k * k
+
+    def rms(self, buf):
+        return math.sqrt(self._power(buf) / len(buf)) / FULL_SCALE
+
+    def rms_raw(self, buf):
+        p = min(self._power(buf) // len(buf), 0x3FFFFFFF)
+        if p < 1 << 22:
+            return isqrt(p << 8)
+        return isqrt(p) << 4
+
+
+class ArrayLevel:
+    """Vectorized std() over the raw buffer (ulab.numpy or numpy)."""
+
+    def __init__(self, np, name):
+        self._np = np
+        self.name = name
+
+    def prepare(self, buf):
+        return self._np.frombuffer(buf, dtype=self._np.uint16)
+
+    def rms(self, buf):
+        np = self._np
+        a = buf if type(buf) is np.ndarray else np.frombuffer(buf, dtype=np.uint16)
+        return float(np.std(a)) / FULL_SCALE
+
+    def rms_raw(self, buf):
+        np = self._np
+        a = buf if type(buf) is np.ndarray else np.frombuffer(buf, dtype=np.uint16)
+        return int(float(np.std(a)) * RAW_SCALE + 0.5)
+
+
+class NoiseGate:
+    """
+    Noise floor and a gate with hysteresis, on integer rms_raw() levels
+    (the float path passes int(level * RAW_FULL_SCALE)).
+    The first `calibrate` levels are the boot-time room pass: the floor is
+    their minimum. After that it follows the quietest level of every
+    `block`: straight down to a quieter one, up by 1/32 of the difference
+    per block, so a song doesn't lift it but a louder fan does, slowly.
+    floor_min / floor_max bound it (normalized levels): digital silence
+    can't pin it at 0 and music playing at boot can't make it huge.
+    The gate opens as soon as a level goes over open_ratio x floor, and
+    closes after `hold` levels in a row under close_ratio x floor. It
+    starts closed, and stays closed until there's a floor to open on (cold
+    boot, still calibrating): auto-gain shouldn't learn from the room noise.
+    """
+
+    def __init__(self, calibrate=50, block=100, open_ratio=2.5, close_ratio=1.6,
+                 hold=50, floor_min=0.00002, floor_max=0.003):
+        self.calibrate = calibrate
+        self.block = block
+        self.open_ratio = open_ratio
+        self.close_ratio = close_ratio
+        self.hold = hold
+        self._floor_min = int(floor_min * RAW_FULL_SCALE)
+        self._floor_max = int(floor_max * RAW_FULL_SCALE)
+        self.floor = 0            # rms_raw() units, 0 until measured
+        self.open = False
+        self.calibrating = True
+        self.changes = 0          # open/close transitions so far
+        self._open_at = 0
+        self._close_at = 0
+        self._quiet = 0           # levels in a row under the close threshold
+        self._block_min = 0
+        self._block_n = 0
+
+    @property
+    def noise_floor(self):
+        """The floor as a normalized level (what calstore keeps)."""
+        return self.floor / RAW_FULL_SCALE
+
+    def restore(self, noise_floor):
+        """
+        Gate on a saved floor (normalized) until the boot pass has measured
+        the room; the measurement replaces it.
+        """
+        self._set_floor(int(noise_floor * RAW_FULL_SCALE))
+
+    def _set_floor(self, floor):
+        if floor < self._floor_min:
+            floor = self._floor_min
+        elif floor > self._floor_max:
+            floor = self._floor_max
+        self.floor = floor
+        self._open_at = int(floor * self.open_ratio)
+        self._close_at = int(floor * self.close_ratio)
+
+    def update(self, raw):
+        """Feed one level; returns whether the gate is open."""
+        if self._block_n == 0 or raw < self._block_min:
+            self._block_min = raw
+        self._block_n += 1
+        if self.calibrating:
+            if self._block_n >= self.calibrate:
+                self.calibrating = False
+                self._set_floor(self._block_min)
+                self._block_n = 0
+        elif self._block_n >= self.block:
+            m = self._block_min
+            floor = self.floor
+            if m < floor:
+                self._set_floor(m)
+            elif m - floor >= 32:
+                self._set_floor(floor + ((m - floor) >> 5))
+            self._block_n = 0
+        if not self.floor:
+            return False
+
+        if raw > self._open_at:
+            self._quiet = 0
+            if not self.open:
+                self.open = True
+                self.changes += 1
+        elif raw < self._close_at:
+            self._quiet += 1
+            if self.open and self._quiet >= self.hold:
+                self.open = False
+                self.changes += 1
+        else:
+            self._quiet = 0
+        return self.open
+
+
+def available():
+    names = []
+    if _ulab_np is not None:
+        names.append("ulab")
+    if _host_np is not None:
+        names.append("numpy")
+    names.append("int")
+    return names
+
+
+def make_engine(backend=None):
+    """backend: "ulab", "numpy", "int", or None for the fastest available."""
+    if backend is None:
+        backend = available()[0]
+    if backend == "ulab" and _ulab_np is not None:
+        return ArrayLevel(_ulab_np, "ulab")
+    if backend == "numpy" and _host_np is not None:
+        return ArrayLevel(_host_np, "numpy")
+    if backend == "int":
+        return IntLevel()
+    raise ValueError("level backend not available: " + str(backend))
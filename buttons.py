@@ -0,0 +1,138 @@
+# Button input from keypad's event queue, with gestures.
+# keypad.Keys scans and debounces the pins in the background and queues
+# timestamped press / release events, so nothing is polled per frame and a
+# press is never missed, however late the loop gets round to the queue; the
+# gesture timing comes from the event timestamps, not from when they're read.
+#
+#   SHORT   pressed and released within long_press, no second press after
+#   LONG    held for long_press (reported while still held)
+#   DOUBLE  a second press within double_press of the first release
+#
+# A SHORT is only certain once double_press has gone by without a second
+# press; double_press=0 turns DOUBLE off and reports SHORT on release.
+
+import time
+
+import keypad
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+    ticks_ms = None
+
+SHORT = 1
+LONG = 2
+DOUBLE = 3
+NAMES = (None, "SHORT", "LONG", "DOUBLE")
+
+TICKS_PERIOD = 1 << 29   # supervisor.ticks_ms() and event timestamps wrap here
+TICKS_MASK = TICKS_PERIOD - 1
+
+
+def ticks():
+    """Milliseconds on the clock keypad stamps events with."""
+    if ticks_ms is not None:
+        return ticks_ms()
+    return int(time.monotonic() * 1000) & TICKS_MASK
+
+
+def ticks_diff(a, b):
+    return (a - b) & TICKS_MASK
+
+
+class Gestures:
+    """Turns one key's press / release times (ms ticks) into SHORT / LONG / DOUBLE."""
+
+    def __init__(self, long_press=600, double_press=300):
+        self.long_press = long_press
+        self.double_press = double_press
+        self.down_at = 0
+        self.held = False
+        self.consumed = False   # this press already made its gesture (LONG, or DOUBLE's second)
+        self.up_at = 0
+        self.pending = False    # released, waiting out double_press before it counts as SHORT
+
+    @property
+    def busy(self):
+        """Waiting on time passing: held down, or a SHORT not yet certain."""
+        return self.held or self.pending
+
+    def reset(self):
+        self.held = False
+        self.pending = False
+
+    def event(self, pressed, t):
+        """One press (True) or release at tick t; a gesture, or 0."""
+        if pressed:
+            self.held = True
+            self.down_at = t
+            self.consumed = False
+            if self.pending:
+                # Caller polls first, so a pending press here is within double_press
+                self.pending = False
+                self.consumed = True
+                return DOUBLE
+            return 0
+        if not self.held:
+            return 0
+        self.held = False
+        if self.consumed:
+            return 0
+        if ticks_diff(t, self.down_at) >= self.long_press:
+            return LONG
+        if self.double_press:
+            self.pending = True
+            self.up_at = t
+            return 0
+        return SHORT
+
+    def poll(self, now):
+        """Gestures completed by time alone as of tick `now`; 0 if none."""
+        if self.held:
+            if not self.consumed and ticks_diff(now, self.down_at) >= self.long_press:
+                self.consumed = True
+                return LONG
+        elif self.pending and ticks_diff(now, self.up_at) > self.double_press:
+            self.pending = False
+            return SHORT
+        return 0
+
+
+class Buttons:
+    """
+    One button on `pin` to ground, read through keypad.Keys. next() hands
+    back one gesture at a time; with nothing pressed it is a single empty
+    queue check.
+    """
+
+    def __init__(self, pin, long_press=0.6, double_press=0.3, interval=0.02):
+        self.keys = keypad.Keys((pin,), value_when_pressed=False, pull=True, interval=interval)
+        self.gestures = Gestures(int(long_press * 1000), int(double_press * 1000))
+        self._event = keypad.Event()
+        self._unread = False     # _event fetched but not fed to the gestures yet
+        self.overflows = 0
+
+    def next(self):
+        """The next gesture (SHORT / LONG / DOUBLE), or 0 when none is due."""
+        events = self.keys.events
+        ev = self._event
+        g = self.gestures
+        while True:
+            if not self._unread:
+                if events.overflowed:
+                    # Lost events: start over from a released key
+                    # (clear() resets overflowed too; it's read-only)
+                    events.clear()
+                    g.reset()
+                    self.overflows += 1
+                if not events.get_into(ev):
+                    return g.poll(ticks()) if g.busy else 0
+                self._unread = True
+            # Anything due before this event happened goes first
+            done = g.poll(ev.timestamp)
+            if done:
+                return done
+            self._unread = False
+            done = g.event(ev.pressed, ev.timestamp)
+            if done:
+                return done
@@ -0,0 +1,161 @@
+# Calibration that survives reboots: the converged auto-gain, the slow
+# envelope baseline and the measured noise floor, kept in
+# microcontroller.nvm so the chain starts calibrated on the first frame.
+#
+# `slots` records of RECORD_SIZE bytes from `offset`. A save goes into the
+# slot after the newest one, so each byte is rewritten once every `slots`
+# saves; load() takes the valid record with the highest sequence number,
+# so a write cut short by a power loss just falls back to the one before.
+# observe() the live values a few times a second once audio has settled;
+# what gets saved is their running averages (auto-gain swings within every
+# beat), after min_observed observations. save_if_due() limits how often a save happens at all: not more
+# than once every min_interval seconds, and only when a value has moved.
+#
+#   "CAL" | version u8 | seq u16 | key u16 | auto_gain, baseline, noise_floor f32 | crc16
+#
+# key fingerprints the settings the values depend on (mic gain, env_max):
+# records made with other settings are ignored.
+
+import struct
+
+try:
+    import microcontroller
+except ImportError:
+    microcontroller = None
+
+MAGIC = b"CAL"
+VERSION = 1
+RECORD = "<3sBHHfffH"
+RECORD_SIZE = struct.calcsize(RECORD)
+
+
+def default_nvm():
+    """microcontroller.nvm, or None where there isn't one."""
+    if microcontroller is None:
+        return None
+    return getattr(microcontroller, "nvm", None)
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE."""
+    crc = 0xFFFF
+    for b in data:
+        crc ^= b << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+
+def settings_key(mic_gain, env_max):
+    return (int(mic_gain * 100 + 0.5) * 31 + int(env_max * 10000 + 0.5)) & 0xFFFF
+
+
+class CalStore:
+    def __init__(self, nvm, offset=0, slots=8, key=0,
+                 min_interval=600.0, gain_change=0.1, floor_change=0.25,
+                 smoothing=0.02, min_observed=100):
+        if offset + slots * RECORD_SIZE > len(nvm):
+            raise ValueError("calibration slots don't fit in nvm")
+        self.nvm = nvm
+        self.offset = offset
+        self.slots = slots
+        self.key = key
+        self.min_interval = min_interval
+        self.gain_change = gain_change
+        self.floor_change = floor_change
+        self.smoothing = smoothing
+        self.min_observed = min_observed
+        self.gain = 0.0        # running averages of the observed values
+        self.baseline = 0.0
+        self.noise_floor = 0.0
+        self.observed = 0
+        self.saved = None      # (auto_gain, baseline, noise_floor) last loaded or written
+        self.writes = 0
+        self._slot = slots - 1  # newest slot; the next save goes after it
+        self._seq = 0
+        self._last_save = None
+
+    def _read(self, slot):
+        o = self.offset + slot * RECORD_SIZE
+        raw = bytes(self.nvm[o:o + RECORD_SIZE])
+        magic, version, seq, key, gain, baseline, floor, crc = struct.unpack(RECORD, raw)
+        if magic != MAGIC or version != VERSION or crc16(raw[:-2]) != crc:
+            return None
+        return seq, key, gain, baseline, floor
+
+    def load(self):
+        """Newest valid record for this key as (auto_gain, baseline, noise_floor), or None."""
+        best = None
+        for slot in range(self.slots):
+            rec = self._read(slot)
+            if rec is None:
+                continue
+            # Sequence numbers wrap: newer means up to half the range ahead
+            if best is None or (rec[0] - best[1][0]) & 0xFFFF < 0x8000:
+                best = (slot, rec)
+        if best is None:
+            return None
+        slot, (seq, key, gain, baseline, floor) = best
+        self._slot = slot
+        self._seq = seq
+        if key != self.key:
+            return None
+        self.saved = (gain, baseline, floor)
+        return self.saved
+
+    def save(self, auto_gain, baseline, noise_floor):
+        seq = (self._seq + 1) & 0xFFFF
+        body = struct.pack(RECORD[:-1], MAGIC, VERSION, seq, self.key,
+                           auto_gain, baseline, noise_floor)
+        slot = (self._slot + 1) % self.slots
+        o = self.offset + slot * RECORD_SIZE
+        self.nvm[o:o + RECORD_SIZE] = body + struct.pack("<H", crc16(body))
+        self._slot = slot
+        self._seq = seq
+        self.saved = (auto_gain, baseline, noise_floor)
+        self.writes += 1
+
+    def changed(self, auto_gain, baseline, noise_floor):
+        """Whether the values moved enough from the stored ones to be worth a write."""
+        if self.saved is None:
+            return True
+        gain, base, floor = self.saved
+        if abs(auto_gain - gain) > self.gain_change * gain:
+            return True
+        if abs(baseline - base) > self.gain_change * (base if base > 0.05 else 0.05):
+            return True
+        return abs(noise_floor - floor) > self.floor_change * (floor if floor > 1e-5 else 1e-5)
+
+    def observe(self, auto_gain, baseline, noise_floor):
+        if not self.observed:
+            self.gain = auto_gain
+            self.baseline = baseline
+            self.noise_floor = noise_floor
+        else:
+            a = self.smoothing
+            self.gain += (auto_gain - self.gain) * a
+            self.baseline += (baseline - self.baseline) * a
+            self.noise_floor += (noise_floor - self.noise_floor) * a
+        self.observed += 1
+
+    def restart(self):
+        """Audio stopped: start the averages over when it comes back."""
+        self.observed = 0
+
+    def save_if_due(self, now):
+        """
+        Save the averages if min_interval has passed since the last write
+        and they moved from what's stored. True if written.
+        """
+        if self.observed < self.min_observed:
+            return False
+        if self._last_save is not None and now - self._last_save < self.min_interval:
+            return False
+        if not self.changed(self.gain, self.baseline, self.noise_floor):
+            return False
+        self.save(self.gain, self.baseline, self.noise_floor)
+        self._last_save = now
+        return True
@@ -0,0 +1,166 @@
+# Color math and precomputed color tables.
+# hsv_to_rgb / apply_gamma / rainbow_soft_hot are the reference versions
+# (hsv_into is hsv_to_rgb into a scratch buffer, for per-frame use);
+# RainbowTable bakes rainbow_soft_hot into a quantized hue x value table
+# at boot (or loads a prebuilt one from flash) so per-pixel color is a lookup.
+# Tables are linear by default: gamma is the output stage's (output.py).
+#
+# Host: python3 color_tables.py rainbow.bin [hue_steps] [value_steps]
+# writes a prebuilt table to copy onto CIRCUITPY.
+
+TABLE_MAGIC = b"RBT2"  # RBT1 files had gamma 2.0 baked in
+
+
+def gamma_lut(gamma=2.2):
+    lut = bytearray(256)
+    for i in range(256):
+        lut[i] = int(((i / 255.0) ** gamma) * 255.0 + 0.5)
+    return lut
+
+
+def apply_gamma(color, gamma=2.2):
+    r, g, b = color
+    r = int(((r / 255.0) ** gamma) * 255.0 + 0.5)
+    g = int(((g / 255.0) ** gamma) * 255.0 + 0.5)
+    b = int(((b / 255.0) ** gamma) * 255.0 + 0.5)
+    return (r, g, b)
+
+
+def hsv_to_rgb(h, s, v):
+    out = bytearray(3)
+    hsv_into(out, h, s, v)
+    return (out[0], out[1], out[2])
+
+
+def hsv_into(out, h, s, v):
+    """hsv_to_rgb written into out[0:3] (a preallocated bytearray), no allocation."""
+    h = h % 1.0
+    i = int(h * 6.0)
+    f = (h * 6.0) - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - f * s)
+    t = v * (1.0 - (1.0 - f) * s)
+    i = i % 6
+
+    if i == 0:
+        r, g, b = v, t, p
+    elif i == 1:
+        r, g, b = q, v, p
+    elif i == 2:
+        r, g, b = p, v, t
+    elif i == 3:
+        r, g, b = p, q, v
+    elif i == 4:
+        r, g, b = t, p, v
+    else:
+        r, g, b = v, p, q
+
+    out[0] = int(r * 255)
+    out[1] = int(g * 255)
+    out[2] = int(b * 255)
+
+
+def rainbow_soft_hot(h, v, lut=None):
+    """
+    h: 0..1 hue
+    v: 0..1 base brightness
+    Softens reds/oranges so they don't look stark.
+    lut: optional gamma_lut(2.0) to use instead of apply_gamma
+    """
+    h = h % 1.0
+
+    # Base rainbow: slightly less than full saturation already
+    s = 0.90
+
+    d_red = min(abs(h - 0.0), abs(h - 1.0))
+    d_orange = abs(h - 0.08)
+
+    hot = 0.0
+    if d_red < 0.10:
+        hot = max(hot, (0.10 - d_red) / 0.10)
+    if d_orange < 0.08:
+        hot = max(hot, (0.08 - d_orange) / 0.08)
+
+    s = s * (1.0 - 0.45 * hot)
+    v2 = v * (1.0 - 0.25 * hot)
+
+    c = hsv_to_rgb(h, s, v2)
+    if lut is None:
+        return apply_gamma(c, gamma=2.0)
+    return (lut[c[0]], lut[c[1]], lut[c[2]])
+
+
+class RainbowTable:
+    """
+    rainbow_soft_hot sampled on a hue_steps x value_steps grid, 3 bytes per
+    entry. Memory is hue_steps * value_steps * 3 bytes: 64 x 32 = 6 KB is
+    smooth on 10 pixels; drop value_steps first if RAM is tight.
+    """
+
+    def __init__(self, hue_steps=64, value_steps=32, table=None, gamma=1.0):
+        self.hue_steps = hue_steps
+        self.value_steps = value_steps
+        self._vmax = value_steps - 1
+        if table is None:
+            table = bytearray(hue_steps * value_steps * 3)
+            lut = gamma_lut(gamma)
+            o = 0
+            for hi in range(hue_steps):
+                h = hi / hue_steps
+                for vi in range(value_steps):
+                    r, g, b = rainbow_soft_hot(h, vi / self._vmax, lut)
+                    table[o] = r
+                    table[o + 1] = g
+                    table[o + 2] = b
+                    o += 3
+        self.table = table
+
+    def index(self, h, v):
+        """Byte offset of the (h, v) entry; h wraps, v clamps to 0..1."""
+        hi = int(h * self.hue_steps + 0.5) % self.hue_steps
+        vi = int(v * self._vmax + 0.5)
+        if vi < 0:
+            vi = 0
+        elif vi > self._vmax:
+            vi = self._vmax
+        return (hi * self.value_steps + vi) * 3
+
+    def color(self, h, v):
+        o = self.index(h, v)
+        t = self.table
+        return (t[o], t[o + 1], t[o + 2])
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(TABLE_MAGIC)
+            f.write(bytes((self.hue_steps >> 8, self.hue_steps & 0xFF,
+                           self.value_steps >> 8, self.value_steps & 0xFF)))
+            f.write(self.table)
+
+
+def load_rainbow(path, hue_steps=64, value_steps=32):
+    """Prebuilt table from flash if it matches the requested size, else build."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(8)
+            if (head[:4] == TABLE_MAGIC
+                    and (head[4] << 8 | head[5]) == hue_steps
+                    and (head[6] << 8 | head[7]) == value_steps):
+                table = bytearray(hue_steps * value_steps * 3)
+                if f.readinto(table) == len(table):
+                    return RainbowTable(hue_steps, value_steps, table)
+    except OSError:
+        pass
+    return RainbowTable(hue_steps, value_steps)
+
+
+if __name__ == "__main__":
+    import sys
+    args = sys.argv[1:]
+    if not args:
+        print("usage: color_tables.py OUT [hue_steps] [value_steps]")
+        sys.exit(2)
+    hs = int(args[1]) if len(args) > 1 else 64
+    vs = int(args[2]) if len(args) > 2 else 32
+    RainbowTable(hs, vs).save(args[0])
+    print("wrote", args[0], hs, "x", vs, "=", hs * vs * 3, "bytes")
@@ -0,0 +1,344 @@
+# Audio feature chain (RMS -> env -> env_n -> auto_gain -> slow_env -> punch)
+# and the latest-value feature state shared between the DSP and render tasks.
+# FeatureChain is the float reference; FixedFeatureChain does the same in
+# integers for boards without an FPU. make_chain("float" | "fixed", ...).
+
+
+def clamp01(x):
+    if x < 0.0:
+        return 0.0
+    if x > 1.0:
+        return 1.0
+    return x
+
+
+def clamp(x, lo, hi):
+    if x < lo:
+        return lo
+    if x > hi:
+        return hi
+    return x
+
+
+class Features:
+    """
+    Latest audio features. The DSP task publish()es a new target at capture
+    rate; the render task calls blend() every frame, which glides env_n and
+    punch from where they were last drawn to the newest target over one
+    measured update interval, so 60 FPS rendering stays smooth on ~50 Hz audio.
+    """
+
+    def __init__(self):
+        self.rms = 0.0
+        self.env_n = 0.0
+        self.punch = 0.0
+        self.auto_gain = 1.0
+        self.bands = None       # per-band 0..1 envelopes (SpectrumAnalyzer.bands), bass first
+        self.bpm = 0.0          # tracked tempo (BeatTracker), 0 until a beat mode runs
+        self.beat_locked = False
+        self.beat_phase = 0.0   # 0..1 through the current beat, 0 = on it
+        self.beats = 0          # beats seen so far
+        self.beat = False       # True on the first frame of a new beat
+        self.gated = False      # noise gate closed: nothing above the room's noise floor
+        self.seq = 0            # bumps on every publish
+        self.updated = 0.0      # monotonic time of the last publish
+        self.interval = 0.02    # smoothed time between publishes
+        self._env_n_from = 0.0
+        self._env_n_to = 0.0
+        self._punch_from = 0.0
+        self._punch_to = 0.0
+        self._beat_pos = 0.0    # beats + phase at the last publish_beat
+        self._beat_time = 0.0
+
+    def publish(self, rms, env_n, punch, auto_gain, now):
+        if self.seq:
+            self.interval += ((now - self.updated) - self.interval) * 0.2
+        self._env_n_from = self.env_n
+        self._punch_from = self.punch
+        self._env_n_to = env_n
+        self._punch_to = punch
+        self.rms = rms
+        self.auto_gain = auto_gain
+        self.updated = now
+        self.seq += 1
+
+    def publish_beat(self, bpm, beats, phase, locked, now):
+        self.bpm = bpm
+        self.beat_locked = locked
+        self._beat_pos = beats + phase
+        self._beat_time = now
+
+    def blend(self, now):
+        a = clamp01((now - self.updated) / self.interval)
+        self.env_n = self._env_n_from + (self._env_n_to - self._env_n_from) * a
+        self.punch = self._punch_from + (self._punch_to - self._punch_from) * a
+
+        # The beat keeps running between updates at the tracked tempo
+        pos = self._beat_pos + (now - self._beat_time) * self.bpm / 60.0
+        n = int(pos)
+        self.beat = n > self.beats
+        if self.beat:
+            self.beats = n
+        self.beat_phase = pos - n
+
+    def hold(self, env_n, punch):
+        """Jump straight to a value (no glide), e.g. when audio resumes."""
+        self.env_n = self._env_n_from = self._env_n_to = env_n
+        self.punch = self._punch_from = self._punch_to = punch
+
+
+class FeatureChain:
+    """Float envelope follower, auto-gain and slow baseline / punch."""
+
+    def __init__(self, mic_gain=21.0, attack=0.55, release=0.12, env_max=0.15,
+                 auto_gain=True, auto_gain_target=0.48, auto_gain_rise=0.10,
+                 auto_gain_fall=0.04, auto_gain_min=0.08, auto_gain_max=5.0,
+                 slow_env_attack=0.02, slow_env_release=0.003, punch_boost=3.5):
+        self.mic_gain = mic_gain
+        self.attack = attack
+        self.release = release
+        self.env_max = env_max
+        self.auto_gain_on = auto_gain
+        self.target = auto_gain_target
+        self.rise = auto_gain_rise
+        self.fall = auto_gain_fall
+        self.gain_min = auto_gain_min
+        self.gain_max = auto_gain_max
+        self.slow_attack = slow_env_attack
+        self.slow_release = slow_env_release
+        self.punch_boost = punch_boost
+
+        self.rms = 0.0
+        self.env = 0.0
+        self.env_n = 0.0
+        self.slow_env = 0.0
+        self.auto_gain = 1.0
+        self.punch = 0.0
+        self.resuming = True  # seed the envelope from the next update
+
+    def restore(self, auto_gain, baseline):
+        """
+        Start from saved calibration (calstore) instead of from scratch:
+        baseline is slow_env / env_max. The envelope starts on the baseline,
+        so the first update already reads punch against the room.
+        """
+        self.auto_gain = clamp(auto_gain, self.gain_min, self.gain_max)
+        self.slow_env = self.env = baseline * self.env_max
+        self.env_n = clamp01(baseline)
+        self.resuming = False
+
+    def resume(self):
+        """
+        Call while audio is paused. The next update starts the envelope at the
+        current level and the baseline with it, so there's no jump or fake
+        punch; auto_gain keeps what it learned before.
+        """
+        self.resuming = True
+
+    def update(self, level):
+        """level: normalized 0..1 RMS from the level engine."""
+        rms = level * self.mic_gain * self.auto_gain
+        self.rms = rms
+        env = self.env
+        slow_env = self.slow_env
+        if self.resuming:
+            env = rms
+            slow_env = rms
+            self.resuming = False
+
+        # Envelope follower (smooth it)
+        if rms > env:
+            env = env + (rms - env) * self.attack
+        else:
+            env = env + (rms - env) * self.release
+
+        # Normalize envelope to 0..1 for consistent scaling everywhere
+        env_n = clamp01(env / self.env_max)
+
+        # Adaptive gain: keep the normalized envelope hovering near the target
+        if self.auto_gain_on:
+            target = self.target
+            auto_gain = self.auto_gain
+            if env_n < target * 0.7:
+                auto_gain += self.rise * (target - env_n)
+            elif env_n > target * 1.3:
+                auto_gain -= self.fall * (env_n - target)
+            self.auto_gain = clamp(auto_gain, self.gain_min, self.gain_max)
+
+        # Slow baseline + transient punch (beats) that don't care about absolute volume
+        if env > slow_env:
+            slow_env = slow_env + (env - slow_env) * self.slow_attack
+        else:
+            slow_env = slow_env + (env - slow_env) * self.slow_release
+        slow_env_n = clamp01(slow_env / self.env_max)
+
+        self.env = env
+        self.env_n = env_n
+        self.slow_env = slow_env
+        self.punch = clamp01((env_n - slow_env_n) * self.punch_boost)
+
+
+# Fixed point: signals are Q18 in units of env_max (1 << 18 = env_max, so
+# env_n is just env clamped to ONE), coefficients Q16, auto-gain Q18 (Q14
+# where it multiplies the raw RMS). Every intermediate stays below 2**30,
+# MicroPython's small-int limit: long ints would allocate (and don't exist
+# on every build).
+SIG_BITS = 18
+ONE = 1 << SIG_BITS
+SIG_MAX = (1 << 24) - 1   # signals clamp at 64 x env_max
+COEF_BITS = 16
+GAIN_BITS = 14
+RAW_SCALE = 16            # rms_raw() units per sample unit (audio_level.RAW_SCALE)
+
+
+def qmul(a, b, q):
+    """(a * b) >> q for |a| < 2**24, 0 <= b < 2**17, q >= 12, in small ints."""
+    return ((a >> 12) * b >> (q - 12)) + ((a & 0xFFF) * b >> q)
+
+
+class FixedFeatureChain:
+    """
+    FeatureChain in integer math. update() takes the integer RMS from the
+    level engine's rms_raw() (1/16 sample units); the same inputs give the same outputs
+    bit for bit on any port. Float copies of the outputs are refreshed once
+    per update for the readers that want them.
+    """
+
+    def __init__(self, mic_gain=21.0, attack=0.55, release=0.12, env_max=0.15,
+                 auto_gain=True, auto_gain_target=0.48, auto_gain_rise=0.10,
+                 auto_gain_fall=0.04, auto_gain_min=0.08, auto_gain_max=5.0,
+                 slow_env_attack=0.02, slow_env_release=0.003, punch_boost=3.5):
+        def coef(x):
+            return int(x * (1 << COEF_BITS) + 0.5)
+
+        self.env_max = env_max
+        # raw RMS -> Q18 env_max units is (raw * gain >> 14) * scale >> 6
+        self._scale = int(mic_gain * (1 << (SIG_BITS + 6)) / (65535.0 * RAW_SCALE * env_max) + 0.5)
+        self._pre_max = (SIG_MAX << 6) // max(1, self._scale)
+        self._attack = coef(attack)
+        self._release = coef(release)
+        self.auto_gain_on = auto_gain
+        self._target = int(auto_gain_target * ONE)
+        self._low = int(auto_gain_target * 0.7 * ONE)
+        self._high = int(auto_gain_target * 1.3 * ONE)
+        self._rise = coef(auto_gain_rise)
+        self._fall = coef(auto_gain_fall)
+        self._gain_min = int(auto_gain_min * ONE)
+        self._gain_max = int(auto_gain_max * ONE)
+        if self._gain_max >> (SIG_BITS - GAIN_BITS) >= 1 << 17:
+            raise ValueError("auto_gain_max too high for the fixed-point chain")
+        self._slow_attack = coef(slow_env_attack)
+        self._slow_release = coef(slow_env_release)
+        self._boost = int(punch_boost * (1 << GAIN_BITS) + 0.5)
+        if self._boost >= 1 << 17:
+            raise ValueError("punch_boost too high for the fixed-point chain")
+
+        self.rms_q = 0
+        self.env_q = 0
+        self.env_n_q = 0
+        self.slow_env_q = 0
+        self.gain_q = ONE   # auto-gain, Q18 (Q14 where it multiplies)
+        self.punch_q = 0
+        self.rms = 0.0
+        self.env = 0.0
+        self.env_n = 0.0
+        self.slow_env = 0.0
+        self.auto_gain = 1.0
+        self.punch = 0.0
+        self.resuming = True
+
+    def restore(self, auto_gain, baseline):
+        """Same as FeatureChain.restore()."""
+        gain = int(auto_gain * ONE)
+        if gain < self._gain_min:
+            gain = self._gain_min
+        elif gain > self._gain_max:
+            gain = self._gain_max
+        self.gain_q = gain
+        env = int(baseline * ONE)
+        if env > SIG_MAX:
+            env = SIG_MAX
+        self.env_q = self.slow_env_q = env
+        self.env_n_q = env if env < ONE else ONE
+        self.auto_gain = gain / ONE
+        self.env = self.slow_env = env * self.env_max / ONE
+        self.env_n = self.env_n_q / ONE
+        self.resuming = False
+
+    def resume(self):
+        """Same as FeatureChain.resume()."""
+        self.resuming = True
+
+    def update(self, raw):
+        """raw: integer RMS from rms_raw(), 0..32768 * 16."""
+        gain = (self.gain_q + (1 << (SIG_BITS - GAIN_BITS - 1))) >> (SIG_BITS - GAIN_BITS)
+        pre = qmul(raw, gain, GAIN_BITS)
+        if pre >= self._pre_max:
+            rms = SIG_MAX
+        else:
+            rms = pre * self._scale >> 6
+        self.rms_q = rms
+        env = self.env_q
+        slow_env = self.slow_env_q
+        if self.resuming:
+            env = rms
+            slow_env = rms
+            self.resuming = False
+
+        if rms > env:
+            env += qmul(rms - env, self._attack, COEF_BITS)
+        else:
+            env += qmul(rms - env, self._release, COEF_BITS)
+        env_n = env if env < ONE else ONE
+
+        if self.auto_gain_on:
+            gain = self.gain_q
+            if env_n < self._low:
+                gain += qmul(self._target - env_n, self._rise, COEF_BITS)
+            elif env_n > self._high:
+                gain -= qmul(env_n - self._target, self._fall, COEF_BITS)
+            if gain < self._gain_min:
+                gain = self._gain_min
+            elif gain > self._gain_max:
+                gain = self._gain_max
+            self.gain_q = gain
+
+        if env > slow_env:
+            slow_env += qmul(env - slow_env, self._slow_attack, COEF_BITS)
+        else:
+            slow_env += qmul(env - slow_env, self._slow_release, COEF_BITS)
+        slow_env_n = slow_env if slow_env < ONE else ONE
+
+        punch = env_n - slow_env_n
+        if punch <= 0:
+            punch = 0
+        else:
+            punch = qmul(punch, self._boost, GAIN_BITS)
+            if punch > ONE:
+                punch = ONE
+
+        self.env_q = env
+        self.env_n_q = env_n
+        self.slow_env_q = slow_env
+        self.punch_q = punch
+
+        scale = self.env_max / ONE
+        self.rms = rms * scale
+        self.env = env * scale
+        self.slow_env = slow_env * scale
+        self.env_n = env_n / ONE
+        self.auto_gain = self.gain_q / ONE
+        self.punch = punch / ONE
+
+    def state(self):
+        """The integer state, for comparing runs."""
+        return (self.rms_q, self.env_q, self.slow_env_q, self.gain_q, self.punch_q)
+
+
+def make_chain(kind="float", **settings):
+    """kind: "float" (FeatureChain) or "fixed" (FixedFeatureChain, update() takes rms_raw)."""
+    if kind == "float":
+        return FeatureChain(**settings)
+    if kind == "fixed":
+        return FixedFeatureChain(**settings)
+    raise ValueError("feature chain not available: " + str(kind))
@@ -0,0 +1,152 @@
+# Framebuffer over a geometry.Layout.
+# One flat bytearray, strip after strip (RGB, 3 bytes per pixel, in each
+# strip's wiring order), plus a per-logical-pixel table of byte offsets into
+# it, so set(i) is one table lookup whatever the strip or its direction.
+# Writes only mark a strip dirty when its bytes actually change; show()
+# copies each dirty strip's stretch into its NeoPixel buffer with one slice
+# write and skips strips that didn't change. strips=None makes an offscreen
+# buffer of the same shape (transition.py renders modes into those).
+# Colors go through the output stage's per-channel tables (output.py) as
+# they're stored, so the buffer holds final wire bytes. `load` is the sum of
+# those bytes, kept up to date by every write, for the output stage's
+# current limiter: when it scales a frame down, show() pushes the strips
+# through its table from per-strip scratch buffers instead.
+
+import array
+
+IDENTITY = bytearray(range(256))
+
+
+class FrameBuffer:
+    def __init__(self, strips, layout, output=None):
+        self.layout = layout
+        self.output = output
+        self._limiter = output.limiter if output is not None and strips is not None else None
+        if output is None:
+            self._lut_r = self._lut_g = self._lut_b = IDENTITY
+        else:
+            self._lut_r = output.lut_r
+            self._lut_g = output.lut_g
+            self._lut_b = output.lut_b
+        self.total = layout.total
+        self.n_rows = layout.n_rows
+        self._row_start = layout.row_start
+        self._row_pixels = layout.row_pixels
+        self._strips = strips
+        self._strip_of = layout.strip
+
+        bases = []
+        size = 0
+        for n in layout.sizes:
+            bases.append(size)
+            size += n * 3
+        self.buf = bytearray(size)
+        self.offsets = array.array("H" if size <= 0xFFFF else "L",
+                                   [bases[layout.strip[i]] + 3 * layout.offset[i]
+                                    for i in range(self.total)])
+        mv = memoryview(self.buf)
+        # Views and slices made once: building one per show() would allocate
+        self._views = [mv[bases[s]:bases[s] + n * 3] for s, n in enumerate(layout.sizes)]
+        self._slices = [slice(0, n) for n in layout.sizes]
+        self.dirty = bytearray(b"\x01" * len(layout.sizes))
+        self.load = 0           # sum of every byte in buf
+        self._pixels = size // 3
+        self._pushed_scale = 256
+        self._scaled = None
+        if self._limiter is not None:
+            self._scaled = [bytearray(n * 3) for n in layout.sizes]
+        # fill() copies the first pixel over the rest in doubling blocks
+        self._all = slice(None)
+        self._doubling = []
+        k = 3
+        while k < size:
+            m = min(k, size - k)
+            self._doubling.append((mv[k:k + m], mv[0:m]))
+            k += m
+        self._uniform = -1  # 0xRRGGBB while the whole buffer is one fill color
+
+    def set(self, i, r, g, b):
+        """Logical pixel i (0..total-1)."""
+        r = self._lut_r[r]
+        g = self._lut_g[g]
+        b = self._lut_b[b]
+        buf = self.buf
+        o = self.offsets[i]
+        if buf[o] != r or buf[o + 1] != g or buf[o + 2] != b:
+            self.load += r + g + b - buf[o] - buf[o + 1] - buf[o + 2]
+            buf[o] = r
+            buf[o + 1] = g
+            buf[o + 2] = b
+            self.dirty[self._strip_of[i]] = 1
+            self._uniform = -1
+
+    def set_row(self, row, r, g, b):
+        """Every pixel in row `row` (0 = top)."""
+        pixels = self._row_pixels
+        for j in range(self._row_start[row], self._row_start[row + 1]):
+            self.set(pixels[j], r, g, b)
+
+    def fill(self, r, g, b):
+        self.fill_raw(self._lut_r[r], self._lut_g[g], self._lut_b[b])
+
+    def fill_raw(self, r, g, b):
+        """fill() with bytes that have already been through the output stage."""
+        color = r << 16 | g << 8 | b
+        if color == self._uniform:
+            return
+        buf = self.buf
+        if not buf:
+            return
+        buf[0] = r
+        buf[1] = g
+        buf[2] = b
+        whole = self._all
+        for dst, src in self._doubling:
+            dst[whole] = src
+        for s in range(len(self.dirty)):
+            self.dirty[s] = 1
+        self._uniform = color
+        self.load = (r + g + b) * self._pixels
+
+    def copy_from(self, other):
+        """Take another buffer's contents (same layout); every strip is dirty after."""
+        self.buf[self._all] = other.buf
+        for s in range(len(self.dirty)):
+            self.dirty[s] = 1
+        self._uniform = other._uniform
+        self.load = other.load
+
+    def show(self):
+        dirty = self.dirty
+        if self._strips is None:
+            return
+        limiter = self._limiter
+        if limiter is not None:
+            scale = limiter.update(self.load)
+            if scale != self._pushed_scale:
+                # Every strip goes out again at the new scale
+                self._pushed_scale = scale
+                for s in range(len(dirty)):
+                    dirty[s] = 1
+            if scale < 256:
+                self._show_scaled(limiter.table)
+                return
+        for s in range(len(dirty)):
+            if dirty[s]:
+                strip = self._strips[s]
+                strip[self._slices[s]] = self._views[s]
+                strip.show()
+                dirty[s] = 0
+
+    def _show_scaled(self, table):
+        dirty = self.dirty
+        for s in range(len(dirty)):
+            if dirty[s]:
+                src = self._views[s]
+                dst = self._scaled[s]
+                for i in range(len(dst)):
+                    dst[i] = table[src[i]]
+                strip = self._strips[s]
+                strip[self._slices[s]] = dst
+                strip.show()
+                dirty[s] = 0
@@ -0,0 +1,211 @@
+# Compact binary trace of LED output and the audio features behind it.
+#
+#   header:  b"LTRC", version u8, strip count u8, then per strip: pixels u16, bpp u8
+#   records: kind u8, time u32 (microseconds from start), length u16, payload
+#
+# PIXELS payload is the strip index (u8) followed by the bytes that strip
+# pushed on show(), brightness applied. Strips that didn't change in a frame
+# aren't shown by the framebuffer, so they add nothing to the trace.
+#
+# Final.py's FEATURE_TRACE writes, per rendered frame, a FEATURES record
+# (what the renderers read, see FEATURES_HEAD) and, when anything changed,
+# a FRAME record: the whole frame buffer (wire bytes, before the current
+# limiter). FeatureReplay reads them back for FEATURE_REPLAY, which feeds
+# the features straight to the renderers and checks each frame against the
+# recorded one. Values the renderers read are doubles, so a replay sees
+# exactly what the recording did.
+#
+# python3 frametrace.py trace.ltrc [--frames]
+# prints a summary (and optionally every pixel record) of a trace.
+
+import struct
+
+MAGIC = b"LTRC"
+VERSION = 1
+
+PIXELS = 1
+FEATURES = 2
+FRAME = 3
+
+# mode u8, flags u8, dt, env_n, punch, bpm, beat_phase (f64), rms, auto_gain (f32), then bands (f64 each)
+FEATURES_HEAD = "<BBdddddff"
+FEATURES_HEAD_SIZE = struct.calcsize(FEATURES_HEAD)
+FLAG_BEAT_LOCKED = 1
+FLAG_GATED = 2
+FLAG_BEAT = 4
+
+_HEADER = "<4sBB"
+_STRIP = "<HB"
+_RECORD = "<BIH"
+_RECORD_SIZE = struct.calcsize(_RECORD)
+
+
+class TraceWriter:
+    def __init__(self, f, strips):
+        """f: binary file; strips: (pixel count, bytes per pixel) per strip."""
+        self.f = f
+        self.strips = list(strips)
+        f.write(struct.pack(_HEADER, MAGIC, VERSION, len(self.strips)))
+        for n, bpp in self.strips:
+            f.write(struct.pack(_STRIP, n, bpp))
+        self.records = 0
+
+    def record(self, kind, t, payload):
+        us = int(t * 1000000) & 0xFFFFFFFF
+        self.f.write(struct.pack(_RECORD, kind, us, len(payload)))
+        self.f.write(payload)
+        self.records += 1
+
+    def pixels(self, t, strip, data):
+        self.record(PIXELS, t, bytes((strip,)) + bytes(data))
+
+    def close(self):
+        self.f.close()
+
+
+class TraceReader:
+    def __init__(self, f):
+        self.f = f
+        magic, version, n = struct.unpack(_HEADER, f.read(struct.calcsize(_HEADER)))
+        if magic != MAGIC:
+            raise ValueError("not a frame trace")
+        if version > VERSION:
+            raise ValueError("trace version %d is newer than this reader" % version)
+        self.version = version
+        self.strips = [struct.unpack(_STRIP, f.read(struct.calcsize(_STRIP))) for _ in range(n)]
+
+    def __iter__(self):
+        """Yields (kind, seconds, payload); unknown kinds are passed through."""
+        f = self.f
+        while True:
+            head = f.read(_RECORD_SIZE)
+            if len(head) < _RECORD_SIZE:
+                return
+            kind, us, length = struct.unpack(_RECORD, head)
+            yield kind, us / 1000000.0, f.read(length)
+
+    def frames(self):
+        """Yields (seconds, [bytes per strip]): the full output after each pixel record."""
+        state = [bytes(n * bpp) for n, bpp in self.strips]
+        for kind, t, payload in self:
+            if kind == PIXELS:
+                state[payload[0]] = payload[1:]
+                yield t, state
+
+
+class FeatureRecorder:
+    """Writes FEATURES / FRAME records; strips as for TraceWriter."""
+
+    def __init__(self, path, strips):
+        self.writer = TraceWriter(open(path, "wb"), strips)
+        self.frames = 0
+
+    def features(self, t, mode, dt, f):
+        flags = ((FLAG_BEAT_LOCKED if f.beat_locked else 0) | (FLAG_GATED if f.gated else 0)
+                 | (FLAG_BEAT if f.beat else 0))
+        payload = struct.pack(FEATURES_HEAD, mode, flags, dt, f.env_n, f.punch, f.bpm,
+                              f.beat_phase, f.rms, f.auto_gain)
+        if f.bands is not None:
+            payload += struct.pack("<%dd" % len(f.bands), *f.bands)
+        self.writer.record(FEATURES, t, payload)
+        self.frames += 1
+
+    def frame(self, t, buf):
+        self.writer.record(FRAME, t, buf)
+
+    def close(self):
+        self.writer.close()
+
+
+class FeatureReplay:
+    """
+    Reads a FeatureRecorder trace back a frame at a time: next() loads the
+    next frame's features into a Features object and returns its mode (None
+    at the end); check(buf) compares a rendered frame buffer with the
+    recorded one.
+    """
+
+    def __init__(self, path):
+        self.reader = read(path)
+        self._records = iter(self.reader)
+        self._pending = None
+        self.golden = None      # recorded frame buffer as of the current frame
+        self.dt = 0.0
+        self.frames = 0
+        self.mismatches = 0
+        self.first_mismatch = None  # frame number
+        self.done = False
+        self._advance()
+
+    def _advance(self):
+        # Collect the FRAME records after the current FEATURES, stop at the next FEATURES
+        self._pending = None
+        for kind, t, payload in self._records:
+            if kind == FRAME:
+                self.golden = payload
+            elif kind == FEATURES:
+                self._pending = payload
+                return
+
+    def next(self, features):
+        payload = self._pending
+        if payload is None:
+            self.done = True
+            return None
+        (mode, flags, self.dt, features.env_n, features.punch, features.bpm,
+         features.beat_phase, features.rms, features.auto_gain) = struct.unpack_from(FEATURES_HEAD, payload)
+        features.beat_locked = bool(flags & FLAG_BEAT_LOCKED)
+        features.gated = bool(flags & FLAG_GATED)
+        features.beat = bool(flags & FLAG_BEAT)
+        bands = features.bands
+        if bands is not None:
+            n = (len(payload) - FEATURES_HEAD_SIZE) // 8
+            for i, v in enumerate(struct.unpack_from("<%dd" % n, payload, FEATURES_HEAD_SIZE)):
+                bands[i] = v
+        self._advance()
+        return mode
+
+    def check(self, buf):
+        """Compare a rendered frame buffer with the recorded frame; True if identical."""
+        self.frames += 1
+        if self.golden is not None and bytes(buf) == self.golden:
+            return True
+        self.mismatches += 1
+        if self.first_mismatch is None:
+            self.first_mismatch = self.frames - 1
+        return False
+
+
+def read(path):
+    return TraceReader(open(path, "rb"))
+
+
+def main(argv):
+    path = argv[1]
+    show_frames = "--frames" in argv
+    trace = read(path)
+    count = 0
+    first = last = None
+    kinds = {}
+    for kind, t, payload in read(path):
+        kinds[kind] = kinds.get(kind, 0) + 1
+    for t, state in trace.frames():
+        if first is None:
+            first = t
+        last = t
+        count += 1
+        if show_frames:
+            print("%10.4f  %s" % (t, " | ".join(s.hex() for s in state)))
+    print("%s: v%d, %d strips %s" % (path, trace.version, len(trace.strips), trace.strips))
+    if count:
+        span = last - first
+        print("%d pixel records over %.2f s (%.1f per second)" % (
+            count, span, count / span if span > 0 else 0.0))
+    if kinds.get(FEATURES):
+        print("%d feature frames, %d frame buffer records" % (kinds[FEATURES], kinds.get(FRAME, 0)))
+    trace.f.close()
+
+
+if __name__ == "__main__":
+    import sys
+    main(sys.argv)
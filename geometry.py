@@ -0,0 +1,222 @@
+# LED geometry: which strip and pixel every logical pixel is, and where it sits.
+# Modes draw in logical order (an index along the installation's path) or by
+# row (same height); Layout turns those into (strip, offset) through array
+# tables built once at boot, so the render loop never does the mapping math.
+#
+# Layout file (text, one directive per line, # comments):
+#
+#   strip <pin> <pixels>
+#       Next strip (strip numbers count up from 0 in file order).
+#   run <strip> <first> <count> <step> <x> <y> <dx> <dy>
+#       Appends `count` logical pixels: strip pixels first, first+step, ...
+#       at positions (x, y), (x+dx, y+dy), ...   (integers, y grows upward)
+#   Strip pixels no run covers only change with FrameBuffer.fill().
+#
+# The upside-down U (5 per side on D5/D6, both strips starting at the top):
+#
+#   strip D5 5
+#   strip D6 5
+#   run 0 0 5 1 0 4 0 -1      # left side, top to bottom
+#   run 1 4 5 -1 1 0 0 1      # right side, bottom to top
+#
+# Host: python3 geometry.py u OUT D5,D6 150        U with 150 per side
+#       python3 geometry.py grid OUT D5,D6 32 16    serpentine 32 x 16 matrix
+#       python3 geometry.py show layout.txt
+
+import array
+
+
+class Layout:
+    def __init__(self):
+        self.pins = []               # per strip: board pin name
+        self.sizes = array.array("H")  # per strip: pixel count
+        self.strip = array.array("B")  # per logical pixel: strip number
+        self.offset = array.array("H")  # ... pixel on that strip
+        self.x = array.array("h")
+        self.y = array.array("h")
+        # Rows (distinct y, top first): pixels of row r are
+        # row_pixels[row_start[r]:row_start[r + 1]]
+        self.n_rows = 0
+        self.row_start = array.array("H")
+        self.row_pixels = array.array("H")
+
+    @property
+    def total(self):
+        return len(self.strip)
+
+    def add_strip(self, pin, pixels):
+        self.pins.append(pin)
+        self.sizes.append(pixels)
+        return len(self.pins) - 1
+
+    def add_run(self, strip, first, count, step=1, x=0, y=0, dx=0, dy=0):
+        if not 0 <= strip < len(self.sizes):
+            raise ValueError("run on undeclared strip %d" % strip)
+        for k in range(count):
+            p = first + k * step
+            if not 0 <= p < self.sizes[strip]:
+                raise ValueError("strip %d has no pixel %d" % (strip, p))
+            self.strip.append(strip)
+            self.offset.append(p)
+            self.x.append(x + k * dx)
+            self.y.append(y + k * dy)
+
+    def finish(self):
+        """Check every strip pixel is used at most once and build the row tables."""
+        used = [bytearray(n) for n in self.sizes]
+        for i in range(self.total):
+            s = self.strip[i]
+            p = self.offset[i]
+            if used[s][p]:
+                raise ValueError("strip %d pixel %d mapped twice" % (s, p))
+            used[s][p] = 1
+        heights = sorted(set(self.y), reverse=True)
+        self.n_rows = len(heights)
+        row_of = {}
+        for r, h in enumerate(heights):
+            row_of[h] = r
+        counts = [0] * (self.n_rows + 1)
+        for h in self.y:
+            counts[row_of[h] + 1] += 1
+        for r in range(self.n_rows):
+            counts[r + 1] += counts[r]
+        self.row_start = array.array("H", counts)
+        fill = counts[:-1]
+        pixels = [0] * self.total
+        for i in range(self.total):
+            r = row_of[self.y[i]]
+            pixels[fill[r]] = i
+            fill[r] += 1
+        self.row_pixels = array.array("H", pixels)
+        return self
+
+    def locate(self, i):
+        """(strip, offset) of logical pixel i."""
+        return self.strip[i], self.offset[i]
+
+    def find(self, x, y):
+        """Logical index of the pixel at (x, y), or -1. Linear scan: setup use only."""
+        for i in range(self.total):
+            if self.x[i] == x and self.y[i] == y:
+                return i
+        return -1
+
+    def lines(self):
+        """The layout as layout-file lines, one run per straight stretch."""
+        out = ["strip %s %d" % (pin, n) for pin, n in zip(self.pins, self.sizes)]
+        i = 0
+        n = self.total
+        while i < n:
+            s = self.strip[i]
+            j = i + 1
+            if j < n and self.strip[j] == s:
+                step = self.offset[j] - self.offset[i]
+                dx = self.x[j] - self.x[i]
+                dy = self.y[j] - self.y[i]
+                while (j < n and self.strip[j] == s
+                       and self.offset[j] - self.offset[j - 1] == step
+                       and self.x[j] - self.x[j - 1] == dx
+                       and self.y[j] - self.y[j - 1] == dy):
+                    j += 1
+            else:
+                step, dx, dy = 1, 0, 0
+            out.append("run %d %d %d %d %d %d %d %d" % (
+                s, self.offset[i], j - i, step, self.x[i], self.y[i], dx, dy))
+            i = j
+        return out
+
+    def save(self, path):
+        with open(path, "w") as f:
+            for line in self.lines():
+                f.write(line + "\n")
+
+
+def parse(lines):
+    layout = Layout()
+    for n, line in enumerate(lines, 1):
+        f = line.split("#", 1)[0].split()
+        if not f:
+            continue
+        try:
+            if f[0] == "strip" and len(f) == 3:
+                layout.add_strip(f[1], int(f[2]))
+            elif f[0] == "run" and len(f) == 9:
+                layout.add_run(*[int(v) for v in f[1:]])
+            else:
+                raise ValueError("unknown directive")
+        except ValueError as e:
+            raise ValueError("layout line %d: %s" % (n, e))
+    return layout.finish()
+
+
+def load_layout(path, default=None):
+    """Layout from a layout file on flash, or `default` if there isn't one."""
+    try:
+        with open(path) as f:
+            return parse(f)
+    except OSError:
+        return default
+
+
+def u_layout(pins=("D5", "D6"), n_per_side=5):
+    """The upside-down U: first strip down the left, second up the right, both wired from the top."""
+    layout = Layout()
+    left = layout.add_strip(pins[0], n_per_side)
+    right = layout.add_strip(pins[1], n_per_side)
+    top = n_per_side - 1
+    layout.add_run(left, 0, n_per_side, 1, 0, top, 0, -1)
+    layout.add_run(right, top, n_per_side, -1, 1, 0, 0, 1)
+    return layout.finish()
+
+
+def grid_layout(pins, width, height):
+    """Serpentine matrix, rows split evenly across the strips, wired from the top left."""
+    layout = Layout()
+    per = -(-height // len(pins))
+    for s, pin in enumerate(pins):
+        rows = min(per, height - s * per)
+        if rows <= 0:
+            break
+        layout.add_strip(pin, rows * width)
+        for r in range(rows):
+            y = height - 1 - (s * per + r)
+            if r % 2:
+                layout.add_run(s, r * width, width, 1, width - 1, y, -1, 0)
+            else:
+                layout.add_run(s, r * width, width, 1, 0, y, 1, 0)
+    return layout.finish()
+
+
+def show(layout):
+    print("%d pixels, %d strips, %d rows" % (layout.total, len(layout.pins), layout.n_rows))
+    for s, pin in enumerate(layout.pins):
+        print("  strip %d on %s: %d pixels" % (s, pin, layout.sizes[s]))
+    if layout.total > 2000:
+        return
+    xs = layout.x
+    ys = layout.y
+    x0 = min(xs)
+    y1 = max(ys)
+    width = max(xs) - x0 + 1
+    grid = [["  ."] * width for _ in range(y1 - min(ys) + 1)]
+    for i in range(layout.total):
+        grid[y1 - ys[i]][xs[i] - x0] = "%3d" % (i % 1000)
+    for row in grid:
+        print("".join(row))
+
+
+if __name__ == "__main__":
+    import sys
+    args = sys.argv[1:]
+    if len(args) == 4 and args[0] == "u":
+        u_layout(args[2].split(","), int(args[3])).save(args[1])
+        print("wrote", args[1])
+    elif len(args) == 5 and args[0] == "grid":
+        grid_layout(args[2].split(","), int(args[3]), int(args[4])).save(args[1])
+        print("wrote", args[1])
+    elif len(args) == 2 and args[0] == "show":
+        with open(args[1]) as f:
+            show(parse(f))
+    else:
+        print("usage: geometry.py u OUT PINS N_PER_SIDE | grid OUT PINS WIDTH HEIGHT | show LAYOUT")
+        sys.exit(2)
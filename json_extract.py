@@ -0,0 +1,289 @@
+# Pulls a handful of values out of a JSON document as it streams in,
+# without building the document. For the weather displays: the
+# OpenWeatherMap response is read from the socket in small chunks
+# (Response.iter_content) and only the wanted paths are kept, so memory
+# stays at one chunk plus a few small fixed buffers however big the
+# response is (a 5-day forecast is ~16 KB of JSON and several times that
+# as dicts).
+#
+#   found = extract(r.iter_content(64), ("name", "main.temp", "weather.0.id"))
+#   found.get("main.temp")
+#
+# Paths are dotted keys; all-digit segments index arrays. Values at the
+# paths must be scalars (string, number, true / false / null): containers
+# there are skipped. Parts of the document no path goes into are scanned
+# for brackets and string ends only. Reading stops as soon as every path
+# has been found. Strings longer than max_value bytes are cut short.
+
+MAX_DEPTH = 24
+MAX_KEY = 32
+
+OBJECT = 1
+ARRAY = 2
+
+# Parser states
+VALUE = 0       # a value is next
+KEY_START = 1   # in an object: a key or "}" is next
+KEY = 2         # in a key string
+COLON = 3
+STRING = 4      # in a string value
+SCALAR = 5      # in a number or true / false / null
+AFTER = 6       # after a value: "," or a closing bracket is next
+END = 7
+
+_SPACE = b" \t\r\n"
+_ESCAPES = {ord("n"): 10, ord("t"): 9, ord("r"): 13, ord("b"): 8, ord("f"): 12}
+
+
+def compile_paths(paths):
+    """Nested dicts keyed by segment (bytes keys, int indexes); leaves are the path strings."""
+    trie = {}
+    for path in paths:
+        node = trie
+        parts = path.split(".")
+        for k, part in enumerate(parts):
+            key = int(part) if part.isdigit() else part.encode()
+            if k == len(parts) - 1:
+                if isinstance(node.get(key), dict):
+                    raise ValueError("%s has other paths inside it" % path)
+                node[key] = path
+            else:
+                node = node.setdefault(key, {})
+                if not isinstance(node, dict):
+                    raise ValueError("%s goes inside another path" % path)
+    return trie
+
+
+def lookup(data, path, default=None):
+    """The same paths on an already parsed document."""
+    for part in path.split("."):
+        if part.isdigit():
+            if not isinstance(data, list) or int(part) >= len(data):
+                return default
+            data = data[int(part)]
+        else:
+            if not isinstance(data, dict) or part not in data:
+                return default
+            data = data[part]
+    return data
+
+
+class Extractor:
+    def __init__(self, paths, max_value=96, max_depth=MAX_DEPTH):
+        self.trie = compile_paths(paths)
+        self.wanted = len(paths)
+        self.found = {}
+        self.done = False
+        self.consumed = 0                 # bytes fed
+        self._kinds = bytearray(max_depth)
+        self._nodes = [None] * max_depth  # path trie node per level, None = nothing wanted below
+        self._index = [0] * max_depth     # array index per level
+        self._depth = 0
+        self._state = VALUE
+        self._pending = self.trie         # trie entry for the value about to start
+        self._target = None               # path of the value being read, None = skip it
+        self._key = bytearray(MAX_KEY)
+        self._key_len = 0
+        self._val = bytearray(max_value)
+        self._val_len = 0
+        self._cut = False
+        self._escape = False
+        self._hex = 0                     # \uXXXX digits still to come
+        self._code = 0
+
+    def _fail(self, i):
+        raise ValueError("bad JSON at byte %d" % (self.consumed + i))
+
+    def _push(self, kind, node, i):
+        d = self._depth
+        if d >= len(self._kinds):
+            raise ValueError("JSON nested deeper than %d at byte %d" % (len(self._kinds), self.consumed + i))
+        self._kinds[d] = kind
+        self._nodes[d] = node
+        self._index[d] = 0
+        self._depth = d + 1
+
+    def _child(self, key):
+        node = self._nodes[self._depth - 1]
+        if node is None:
+            return None
+        return node.get(key)
+
+    def _ended_value(self):
+        self._state = AFTER if self._depth else END
+        if not self._depth:
+            self.done = True
+
+    def _keep(self, value):
+        self.found[self._target] = value
+        self._target = None
+        if len(self.found) >= self.wanted:
+            self.done = True
+
+    def _put(self, c):
+        if self._val_len < len(self._val):
+            self._val[self._val_len] = c
+            self._val_len += 1
+        else:
+            self._cut = True
+
+    def _string_value(self):
+        n = self._val_len
+        if self._cut:
+            # Don't leave half a UTF-8 character at the cut
+            while n and self._val[n - 1] & 0xC0 == 0x80:
+                n -= 1
+            if n and self._val[n - 1] & 0xC0 == 0xC0:
+                n -= 1
+        return bytes(self._val[:n]).decode("utf-8")
+
+    def _scalar_value(self, i):
+        text = bytes(self._val[:self._val_len]).decode()
+        if text == "true":
+            return True
+        if text == "false":
+            return False
+        if text == "null":
+            return None
+        try:
+            if "." in text or "e" in text or "E" in text:
+                return float(text)
+            return int(text)
+        except ValueError:
+            self._fail(i)
+
+    def feed(self, chunk):
+        """Parse the next bytes of the document; sets .done once nothing more is needed."""
+        i = 0
+        n = len(chunk)
+        while i < n and not self.done:
+            c = chunk[i]
+            state = self._state
+            if state == STRING:
+                if self._hex:
+                    self._code = self._code * 16 + int(chr(c), 16)
+                    self._hex -= 1
+                    if not self._hex and self._target is not None:
+                        code = self._code
+                        for b in (chr(code) if code < 0xD800 or code > 0xDFFF else "?").encode():
+                            self._put(b)
+                elif self._escape:
+                    self._escape = False
+                    if c == 117:  # u
+                        self._hex = 4
+                        self._code = 0
+                    elif self._target is not None:
+                        self._put(_ESCAPES.get(c, c))
+                elif c == 34:  # "
+                    if self._target is not None:
+                        self._keep(self._string_value())
+                    self._ended_value()
+                elif c == 92:  # backslash
+                    self._escape = True
+                elif self._target is not None:
+                    self._put(c)
+                else:
+                    # Skipped string: jump to the next quote or backslash
+                    j = chunk.find(b'"', i)
+                    k = chunk.find(b"\\", i, j if j >= 0 else n)
+                    if k >= 0:
+                        i = k
+                    elif j >= 0:
+                        i = j
+                    else:
+                        i = n
+                    continue
+            elif state == KEY:
+                if self._escape:
+                    self._escape = False
+                    self._key_len = MAX_KEY + 1  # escaped keys never match
+                elif c == 34:
+                    self._state = COLON
+                elif c == 92:
+                    self._escape = True
+                elif self._nodes[self._depth - 1] is not None:
+                    if self._key_len < MAX_KEY:
+                        self._key[self._key_len] = c
+                    self._key_len += 1
+            elif c in _SPACE:
+                if state == SCALAR:
+                    self._end_scalar(i)
+            elif state == VALUE:
+                pending = self._pending
+                if c == 123:  # {
+                    self._push(OBJECT, pending if isinstance(pending, dict) else None, i)
+                    self._state = KEY_START
+                elif c == 91:  # [
+                    node = pending if isinstance(pending, dict) else None
+                    self._push(ARRAY, node, i)
+                    self._pending = node.get(0) if node is not None else None
+                elif c == 93 and self._depth and self._kinds[self._depth - 1] == ARRAY:  # [] empty
+                    self._depth -= 1
+                    self._ended_value()
+                elif c == 34:
+                    self._target = pending if isinstance(pending, str) else None
+                    self._val_len = 0
+                    self._cut = False
+                    self._state = STRING
+                else:
+                    self._target = pending if isinstance(pending, str) else None
+                    self._val_len = 0
+                    self._put(c)
+                    self._state = SCALAR
+            elif state == SCALAR:
+                if c == 44 or c == 125 or c == 93:  # , } ]
+                    self._end_scalar(i)
+                    continue  # the same byte again, after the value
+                self._put(c)
+            elif state == AFTER:
+                d = self._depth - 1
+                if c == 44:  # ,
+                    if self._kinds[d] == OBJECT:
+                        self._state = KEY_START
+                    else:
+                        self._index[d] += 1
+                        self._pending = self._child(self._index[d])
+                        self._state = VALUE
+                elif (c == 125 and self._kinds[d] == OBJECT) or (c == 93 and self._kinds[d] == ARRAY):
+                    self._depth = d
+                    self._ended_value()
+                else:
+                    self._fail(i)
+            elif state == KEY_START:
+                if c == 34:
+                    self._key_len = 0
+                    self._state = KEY
+                elif c == 125:  # {} empty
+                    self._depth -= 1
+                    self._ended_value()
+                else:
+                    self._fail(i)
+            elif state == COLON:
+                if c != 58:  # :
+                    self._fail(i)
+                if self._key_len > MAX_KEY or self._nodes[self._depth - 1] is None:
+                    self._pending = None
+                else:
+                    self._pending = self._child(bytes(self._key[:self._key_len]))
+                self._state = VALUE
+            else:
+                self._fail(i)
+            i += 1
+        self.consumed += i
+        if self.done:
+            self._state = END
+
+    def _end_scalar(self, i):
+        if self._target is not None:
+            self._keep(self._scalar_value(i))
+        self._ended_value()
+
+
+def extract(chunks, paths, max_value=96):
+    """{path: value} for the paths found in a document arriving as byte chunks."""
+    ex = Extractor(paths, max_value)
+    for chunk in chunks:
+        ex.feed(chunk)
+        if ex.done:
+            break
+    return ex.found
@@ -0,0 +1,396 @@
+# Light modes for Final.py. Each mode is a small __slots__ class:
+#   enter()              first frame of the mode: build its tables and scratch buffers
+#   render(features, dt) draw one frame into the frame buffer (the caller shows it)
+#   redraw()             the output tables changed (brightness): draw again what
+#                        only enter() draws; modes that render every frame ignore it
+#   exit()               leaving the mode: drop what enter() built
+# so only the active mode's buffers take RAM. Class attributes say what a
+# mode reads (needs, NEEDS_* flags) and its capture window in samples
+# (window, None = the full capture buffer). Final.py lists one instance per
+# mode in button order and dispatches on the index: adding a mode is a class
+# here and a line there.
+
+import math
+import array
+import random
+
+from color_tables import hsv_into
+from features import clamp01
+
+# Inputs a mode reads. Modes without NEEDS_AUDIO skip mic capture and DSP;
+# only modes with NEEDS_SPECTRUM pay for the FFT, NEEDS_BEAT for tempo tracking.
+NEEDS_AUDIO = 1
+NEEDS_SPECTRUM = 2
+NEEDS_BEAT = 4
+
+
+def lerp(a, b, t):
+    return a + (b - a) * t
+
+
+def lerp_into(out, c1, c2, t):
+    # Per-frame color math writes into preallocated buffers: a new tuple per
+    # pixel per frame is garbage the GC has to stop and collect
+    out[0] = int(lerp(c1[0], c2[0], t))
+    out[1] = int(lerp(c1[1], c2[1], t))
+    out[2] = int(lerp(c1[2], c2[2], t))
+
+
+class Mode:
+    """Draws nothing and holds nothing; the hooks every mode has."""
+    __slots__ = ("fb",)
+    name = "MODE"
+    needs = 0
+    window = None
+
+    def __init__(self, fb):
+        self.fb = fb
+
+    def enter(self):
+        pass
+
+    def render(self, features, dt):
+        pass
+
+    def redraw(self):
+        pass
+
+    def exit(self):
+        pass
+
+
+class Off(Mode):
+    __slots__ = ()
+    name = "OFF"
+
+    def enter(self):
+        self.redraw()
+
+    def redraw(self):
+        self.fb.fill(0, 0, 0)
+
+
+class Static(Mode):
+    """One color, drawn on entry; costs nothing after that."""
+    __slots__ = ("color",)
+    name = "STATIC"
+
+    def __init__(self, fb, color):
+        Mode.__init__(self, fb)
+        self.color = color
+
+    def enter(self):
+        self.redraw()
+
+    def redraw(self):
+        c = self.color
+        self.fb.fill(c[0], c[1], c[2])
+
+
+class RainbowBreathe(Mode):
+    """Breathing brightness + traveling rainbow across the strips."""
+    __slots__ = ("load_table", "rainbow", "hue_base", "t")
+    name = "RAINBOW_BREATHE"
+
+    def __init__(self, fb, load_table):
+        Mode.__init__(self, fb)
+        self.load_table = load_table  # () -> RainbowTable, called on entry
+        self.rainbow = None
+        self.hue_base = 0.0
+        self.t = 0.0
+
+    def enter(self):
+        self.rainbow = self.load_table()
+
+    def exit(self):
+        self.rainbow = None
+
+    def render(self, features, dt):
+        self.hue_base = (self.hue_base + dt * 0.08) % 1.0  # slow drift
+        self.t += dt
+        breathe = 0.30 + 0.70 * (0.5 + 0.5 * math.sin(self.t * 2.0))  # 0.30..1.0
+
+        fb = self.fb
+        rainbow = self.rainbow
+        table = rainbow.table
+        hue_base = self.hue_base
+        total = fb.total
+        for i in range(total):
+            h = hue_base + (i / total) * 0.65
+            k = rainbow.index(h, breathe)
+            fb.set(i, table[k], table[k + 1], table[k + 2])
+
+
+class RainbowFlow(Mode):
+    """Rainbow that travels with the music: a step per beat when the tempo is locked."""
+    __slots__ = ("load_table", "rainbow", "flow_per_beat", "phase")
+    name = "RAINBOW_FLOW"
+    needs = NEEDS_AUDIO | NEEDS_BEAT
+
+    def __init__(self, fb, load_table, flow_per_beat=0.125):
+        Mode.__init__(self, fb)
+        self.load_table = load_table
+        self.rainbow = None
+        self.flow_per_beat = flow_per_beat
+        self.phase = 0.0
+
+    def enter(self):
+        self.rainbow = self.load_table()
+
+    def exit(self):
+        self.rainbow = None
+
+    def render(self, features, dt):
+        env_n = features.env_n
+        punch = features.punch
+        if features.beat_locked:
+            # Step flow_per_beat around the strips each beat, most of it right on the beat
+            after = 1.0 - features.beat_phase
+            flow_speed = self.flow_per_beat * features.bpm / 60.0 * 3.0 * after * after
+            v = clamp01(0.18 + 0.45 * env_n + 0.35 * after * after * after * after)
+        else:
+            flow_speed = 0.18 + 0.55 * env_n + 0.75 * punch
+            # Brightness leans on the adaptive loudness
+            v = clamp01(0.18 + 0.55 * env_n + 0.35 * punch)
+        phase = (self.phase + dt * flow_speed) % 1.0
+        self.phase = phase
+
+        fb = self.fb
+        rainbow = self.rainbow
+        table = rainbow.table
+        total = fb.total
+        # Each pixel has a hue offset; phase pushes the pattern forward along the strips
+        for i in range(total):
+            h = (phase + (i / total)) % 1.0
+            k = rainbow.index(h, v)
+            fb.set(i, table[k], table[k + 1], table[k + 2])
+
+
+class SoundBar(Mode):
+    """Level meter up the rows, with a falling peak marker."""
+    __slots__ = ("cool", "warm", "peak_fall", "peak", "color", "row_warm")
+    name = "SOUND_BAR"
+    needs = NEEDS_AUDIO
+
+    def __init__(self, fb, cool, warm, peak_fall=0.015):
+        Mode.__init__(self, fb)
+        self.cool = cool
+        self.warm = warm
+        self.peak_fall = peak_fall
+        self.peak = 0.0
+        self.color = None
+        self.row_warm = None
+
+    def enter(self):
+        rows = self.fb.n_rows
+        self.color = bytearray(3)
+        # Warm up toward the bottom: each row's share of it, before punch
+        self.row_warm = array.array("f", [i / float(rows - 1 if rows > 1 else 1) * 0.75
+                                          for i in range(rows)])
+
+    def exit(self):
+        self.color = None
+        self.row_warm = None
+
+    def render(self, features, dt):
+        env_n = features.env_n
+        punch = features.punch
+        fb = self.fb
+        rows = fb.n_rows
+        level = int(env_n * rows + 0.5)
+        if level > rows:
+            level = rows
+
+        # Peak marker (slowly falls so you can see the last hit)
+        if env_n > self.peak:
+            self.peak = env_n
+        else:
+            self.peak = max(0.0, self.peak - self.peak_fall)
+
+        brightness = 0.35 + 0.65 * env_n
+        c = self.color
+        row_warm = self.row_warm
+        for i in range(rows):
+            if i < level:
+                lerp_into(c, self.cool, self.warm, clamp01(row_warm[i] + punch * 0.5))
+                fb.set_row(i, int(c[0] * brightness),
+                           int(c[1] * brightness),
+                           int(c[2] * brightness))
+            else:
+                fb.set_row(i, 0, 0, 0)
+
+        peak_idx = int(self.peak * rows + 0.2)
+        if peak_idx >= rows:
+            peak_idx = rows - 1
+        if peak_idx >= 0:
+            peak = 255 if self.peak > 0.05 else 0
+            fb.set_row(peak_idx, peak, peak, peak)
+
+
+class SoundColor(Mode):
+    """Whole-strip color from purple (quiet) to red (loud), flashing white on hits."""
+    __slots__ = ("flash", "color")
+    name = "SOUND_COLOR"
+    needs = NEEDS_AUDIO
+    window = 160  # 10 ms at 16 kHz: lower latency, noisier level
+
+    def __init__(self, fb, flash=(255, 255, 255)):
+        Mode.__init__(self, fb)
+        self.flash = flash
+        self.color = None
+
+    def enter(self):
+        self.color = bytearray(3)
+
+    def exit(self):
+        self.color = None
+
+    def render(self, features, dt):
+        loud = features.env_n
+        punch = features.punch
+        c = self.color
+        hsv_into(c, lerp(0.70, 0.02, loud), 1.0, 0.25 + 0.75 * loud)
+
+        # Add a soft white flash on hits so it pops without being blinding
+        if punch > 0.05:
+            lerp_into(c, c, self.flash, clamp01(punch * 0.9))
+
+        self.fb.fill(c[0], c[1], c[2])
+
+
+class SoundSparkle(Mode):
+    """Dim blue base with sparks; a burst on each beat once the tempo is locked."""
+    __slots__ = ("beat_sparks", "base", "sparkle")
+    name = "SOUND_SPARKLE"
+    needs = NEEDS_AUDIO | NEEDS_BEAT
+
+    def __init__(self, fb, beat_sparks=8):
+        Mode.__init__(self, fb)
+        self.beat_sparks = beat_sparks
+        self.base = None
+        self.sparkle = None
+
+    def enter(self):
+        self.base = bytearray(3)
+        self.sparkle = bytearray(3)
+
+    def exit(self):
+        self.base = None
+        self.sparkle = None
+
+    def render(self, features, dt):
+        loud = features.env_n
+        punch = features.punch
+        base = self.base
+        sparkle = self.sparkle
+        hsv_into(base, 0.58, 0.9, 0.18 + 0.30 * loud + 0.25 * punch)
+        hsv_into(sparkle, 0.10 + 0.12 * punch, 0.4, 1.0)
+
+        fb = self.fb
+        fb.fill(base[0], base[1], base[2])
+
+        if features.beat_locked:
+            # A burst on the beat that thins out until the next one
+            after = 1.0 - features.beat_phase
+            sparks = int(loud * 4.0 + self.beat_sparks * after * after * after + 0.4)
+        else:
+            sparks = int(loud * 6.0 + punch * 8.0 + 0.4)
+        total = fb.total
+        for _ in range(sparks):
+            idx = random.randrange(total)
+            fb.set(idx, sparkle[0], sparkle[1], sparkle[2])
+
+
+class SoundPulse(Mode):
+    """Uniform pulse for reflections; rides on adaptive loudness + hits."""
+    __slots__ = ("color",)
+    name = "SOUND_PULSE"
+    needs = NEEDS_AUDIO
+    window = 160
+
+    def __init__(self, fb, color=(255, 220, 180)):
+        Mode.__init__(self, fb)
+        self.color = color
+
+    def render(self, features, dt):
+        brightness = clamp01(0.05 + 0.80 * features.env_n + 0.45 * features.punch)
+        c = self.color
+        self.fb.fill(int(c[0] * brightness),
+                     int(c[1] * brightness),
+                     int(c[2] * brightness))
+
+
+class SoundBands(Mode):
+    """Bass at the bottom, treble at the top; each row shows its band."""
+    __slots__ = ("load_table", "rainbow", "n_bands", "hue_low", "hue_high",
+                 "row_band", "row_hue")
+    name = "SOUND_BANDS"
+    needs = NEEDS_AUDIO | NEEDS_SPECTRUM
+
+    def __init__(self, fb, load_table, n_bands, hue_low=0.0, hue_high=0.66):
+        Mode.__init__(self, fb)
+        self.load_table = load_table
+        self.rainbow = None
+        self.n_bands = n_bands
+        self.hue_low = hue_low
+        self.hue_high = hue_high
+        self.row_band = None
+        self.row_hue = None
+
+    def enter(self):
+        self.rainbow = self.load_table()
+        rows = self.fb.n_rows
+        nb = self.n_bands
+        self.row_band = bytearray((rows - 1 - i) * nb // rows for i in range(rows))
+        self.row_hue = array.array("f", [
+            self.hue_low + (self.hue_high - self.hue_low) * b / (nb - 1 if nb > 1 else 1)
+            for b in self.row_band])
+
+    def exit(self):
+        self.rainbow = None
+        self.row_band = None
+        self.row_hue = None
+
+    def render(self, features, dt):
+        bands = features.bands
+        fb = self.fb
+        rainbow = self.rainbow
+        table = rainbow.table
+        row_band = self.row_band
+        row_hue = self.row_hue
+        for i in range(fb.n_rows):
+            k = rainbow.index(row_hue[i], bands[row_band[i]])
+            fb.set_row(i, table[k], table[k + 1], table[k + 2])
+
+
+class SoundKick(Mode):
+    """Low bands flood the strips warm on kicks; the top band adds white at the top."""
+    __slots__ = ("row_top",)
+    name = "SOUND_KICK"
+    needs = NEEDS_AUDIO | NEEDS_SPECTRUM
+
+    def __init__(self, fb):
+        Mode.__init__(self, fb)
+        self.row_top = None
+
+    def enter(self):
+        rows = self.fb.n_rows
+        top = [(rows - 1 - i) / (rows - 1 if rows > 1 else 1) for i in range(rows)]
+        self.row_top = array.array("f", [200.0 * t * t for t in top])
+
+    def exit(self):
+        self.row_top = None
+
+    def render(self, features, dt):
+        bands = features.bands
+        bass = bands[0]
+        if len(bands) > 1 and bands[1] > bass:   # N_BANDS = 1: the one band is all of it
+            bass = bands[1]
+        treble = bands[len(bands) - 1]
+        fb = self.fb
+        row_top = self.row_top
+        for i in range(fb.n_rows):
+            w = treble * row_top[i]
+            fb.set_row(i, min(255, int(255 * bass + w)),
+                       min(255, int(70 * bass + w)),
+                       min(255, int(15 * bass + w)))
@@ -0,0 +1,112 @@
+# Output stage: global brightness x gamma x per-channel color correction,
+# folded into one 256-byte table per channel. FrameBuffer runs every byte
+# it stores through these, so what it holds is what goes on the wire: the
+# strips run at brightness 1.0 and don't rescale every byte on show(), and
+# modes work in plain linear 0..255 without their own gamma.
+# set_brightness() only rebuilds the tables (from a 16-bit gamma curve made
+# once, no pow() per change); the caller redraws.
+# CurrentLimiter is the last step: it estimates each frame's supply current
+# from the frame buffer's byte sum and scales the pushed bytes down when
+# the frame would go over budget.
+
+import array
+
+
+class OutputStage:
+    def __init__(self, brightness=1.0, gamma=2.0, correction=(255, 255, 255), limiter=None):
+        """correction: per-channel maximum (r, g, b), e.g. (255, 176, 240) to tame green and blue."""
+        self.limiter = limiter
+        self.gamma = gamma
+        self.correction = correction
+        self.lut_r = bytearray(256)
+        self.lut_g = bytearray(256)
+        self.lut_b = bytearray(256)
+        # (i / 255) ** gamma in 1/65535 units
+        self._curve = array.array("H", [int(((i / 255.0) ** gamma) * 65535.0 + 0.5)
+                                        for i in range(256)])
+        self.brightness = -1.0
+        self.set_brightness(brightness)
+
+    def set_brightness(self, brightness):
+        if brightness < 0.0:
+            brightness = 0.0
+        elif brightness > 1.0:
+            brightness = 1.0
+        if brightness == self.brightness:
+            return
+        self.brightness = brightness
+        curve = self._curve
+        for lut, c in ((self.lut_r, self.correction[0]),
+                       (self.lut_g, self.correction[1]),
+                       (self.lut_b, self.correction[2])):
+            # 0..65535 curve x scale (Q8, <= 256) stays well inside small ints
+            scale = int(brightness * c * 256 / 255 + 0.5)
+            for i in range(256):
+                v = (curve[i] * scale + 32768) >> 16
+                lut[i] = v if v < 256 else 255
+
+
+class CurrentLimiter:
+    """
+    Supply current of a frame, estimated from the sum of its wire bytes
+    (FrameBuffer.load, kept up to date as pixels change, never rescanned):
+    idle_ma per pixel plus ma_per_channel per channel at 255, linear in
+    between. update() is called with each frame about to be pushed; over
+    budget_ma it returns a Q8 scale below 256 (rounded down, so the scaled
+    frame stays within budget) and `table` maps wire bytes through it; the
+    table is only rebuilt when the scale changes.
+    """
+
+    def __init__(self, pixels, budget_ma, ma_per_channel=20.0, idle_ma=1.0):
+        self.pixels = pixels
+        self.budget_ma = budget_ma
+        self.ma_per_channel = ma_per_channel
+        self.idle_ma = pixels * idle_ma
+        # Largest byte sum that stays within budget
+        self.max_load = max(0, int((budget_ma - self.idle_ma) * 255 / ma_per_channel))
+        self.table = bytearray(range(256))
+        self.scale = 256
+        self.load = 0          # byte sum of the last frame as pushed (after scaling)
+        self.peak_load = 0     # ... the highest since reset()
+        self.frames = 0
+        self.limited = 0       # frames that had to be scaled down
+
+    def estimate_ma(self, load):
+        return self.idle_ma + load * self.ma_per_channel / 255.0
+
+    @property
+    def ma(self):
+        return self.estimate_ma(self.load)
+
+    @property
+    def peak_ma(self):
+        return self.estimate_ma(self.peak_load)
+
+    @property
+    def headroom_ma(self):
+        """Budget left over by the last frame."""
+        return self.budget_ma - self.ma
+
+    def update(self, load):
+        """Scale (Q8, 256 = as is) for a frame whose wire bytes sum to `load`."""
+        self.frames += 1
+        if load > self.max_load:
+            scale = self.max_load * 256 // load
+            self.limited += 1
+        else:
+            scale = 256
+        if scale != self.scale:
+            self.scale = scale
+            table = self.table
+            for i in range(256):
+                table[i] = i * scale >> 8
+        pushed = load if scale == 256 else load * scale >> 8
+        self.load = pushed
+        if pushed > self.peak_load:
+            self.peak_load = pushed
+        return scale
+
+    def reset(self):
+        self.peak_load = 0
+        self.frames = 0
+        self.limited = 0
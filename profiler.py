@@ -0,0 +1,118 @@
+# Per-stage frame profiler.
+# Each stage keeps a preallocated ring of durations in microseconds, stamped
+# with time.monotonic_ns, so profiling costs two clock reads per stage and no
+# printing. Reports are single compact lines, only at an interval or when
+# asked for over the USB serial console:
+#
+#   @P <uptime ms> <overruns> <stage>=<min>,<mean>,<p95>,<max> ...   (microseconds)
+#   @R <stage> <count> <hex of the ring, uint32 little-endian, oldest first>
+#
+# Serial commands (one character): p = report now, d = dump raw rings,
+# r = reset. Testing/ProfileDecode.py turns a captured log into histograms.
+
+import sys
+import time
+import array
+
+try:
+    import supervisor
+except ImportError:
+    supervisor = None
+
+STAGES = ("input", "capture", "dsp", "render", "show", "sleep")
+STAGE_INPUT = 0
+STAGE_CAPTURE = 1
+STAGE_DSP = 2
+STAGE_RENDER = 3
+STAGE_SHOW = 4
+STAGE_SLEEP = 5
+
+
+def read_command():
+    """One pending character from the serial console, or None. Never blocks."""
+    if supervisor is None or not supervisor.runtime.serial_bytes_available:
+        return None
+    return sys.stdin.read(1)
+
+
+class Profiler:
+    def __init__(self, stages=STAGES, history=128):
+        self.stages = tuple(stages)
+        self.history = history
+        self.rings = [array.array("L", [0] * history) for _ in self.stages]
+        self.counts = array.array("L", [0] * len(self.stages))
+        self.started = time.monotonic_ns()
+
+    def stamp(self):
+        return time.monotonic_ns()
+
+    def record(self, stage, start_ns):
+        """Log the time since stamp() returned start_ns against stage."""
+        self.add(stage, (time.monotonic_ns() - start_ns) // 1000)
+
+    def add(self, stage, us):
+        n = self.counts[stage]
+        self.rings[stage][n % self.history] = us
+        self.counts[stage] = n + 1
+
+    def reset(self):
+        for s in range(len(self.stages)):
+            self.counts[s] = 0
+
+    def samples(self, stage):
+        """Durations currently in the stage's ring, oldest first (allocates)."""
+        ring = self.rings[stage]
+        n = self.counts[stage]
+        if n <= self.history:
+            return list(ring[:n])
+        k = n % self.history
+        return list(ring[k:]) + list(ring[:k])
+
+    def summary(self, stage):
+        """(min, mean, p95, max) in microseconds, or None before any samples."""
+        xs = self.samples(stage)
+        if not xs:
+            return None
+        xs.sort()
+        return xs[0], sum(xs) // len(xs), xs[min(len(xs) - 1, len(xs) * 95 // 100)], xs[-1]
+
+    def report(self, overruns=0):
+        parts = ["@P", str((time.monotonic_ns() - self.started) // 1000000), str(overruns)]
+        for s, name in enumerate(self.stages):
+            st = self.summary(s)
+            if st is not None:
+                parts.append("%s=%d,%d,%d,%d" % ((name,) + st))
+        return " ".join(parts)
+
+    def dump(self):
+        """Raw rings as @R lines, for histograms on the host."""
+        lines = []
+        for s, name in enumerate(self.stages):
+            xs = array.array("L", self.samples(s))
+            if sys.byteorder != "little":
+                xs.byteswap()
+            lines.append("@R %s %d %s" % (name, self.counts[s], bytes(xs).hex()))
+        return lines
+
+
+class NullProfiler:
+    """Same calls as Profiler, doing nothing (profiling switched off)."""
+    stages = ()
+
+    def stamp(self):
+        return 0
+
+    def record(self, stage, start_ns):
+        pass
+
+    def add(self, stage, us):
+        pass
+
+    def reset(self):
+        pass
+
+    def report(self, overruns=0):
+        return "@P off"
+
+    def dump(self):
+        return []
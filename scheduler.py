@@ -0,0 +1,63 @@
+# Fixed-rate pacing for asyncio tasks.
+# Both hand back asyncio.sleep()'s awaitable instead of being coroutines
+# themselves: asyncio.sleep doesn't allocate on CircuitPython, a new
+# coroutine object per call would.
+
+import time
+import array
+
+import asyncio
+
+
+def pause():
+    """
+    await pause() to yield to other tasks. A tiny timed sleep instead of
+    sleep(0) so tasks whose deadline already passed run first on CPython's
+    FIFO loop too, the way CircuitPython's time-ordered queue handles sleep(0).
+    """
+    return asyncio.sleep(0.000001)
+
+
+class Ticker:
+    """
+    await ticker.wait() once per iteration to run a task at `hz`, and call
+    ticker.woke(now) first thing after waking.
+    Deadlines advance by whole periods (no drift); after an overrun the
+    schedule restarts from now instead of bursting to catch up.
+    Lateness of each wakeup (seconds past the deadline) goes into a small
+    ring so frame jitter can be read back on the host.
+    """
+
+    def __init__(self, hz, history=256):
+        self.period = 1.0 / hz
+        self.ticks = 0
+        self.overruns = 0
+        self.late = array.array("f", [0.0] * history)
+        self._next = None
+
+    def wait(self):
+        now = time.monotonic()
+        if self._next is None:
+            self._next = now
+        self._next += self.period
+        delay = self._next - now
+        if delay < 0:
+            self.overruns += 1
+            self._next = now
+            delay = 0
+        return asyncio.sleep(delay)
+
+    def woke(self, now):
+        """Log how late this wakeup was (no-op before the first wait)."""
+        if self._next is None:
+            return
+        self.late[self.ticks % len(self.late)] = now - self._next
+        self.ticks += 1
+
+    def recent(self):
+        """Lateness samples currently in the ring, oldest first."""
+        n = len(self.late)
+        if self.ticks <= n:
+            return list(self.late[:self.ticks])
+        k = self.ticks % n
+        return list(self.late[k:]) + list(self.late[:k])
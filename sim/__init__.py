@@ -0,0 +1,318 @@
+# Host simulator for Final.py.
+# sim/hw holds stand-ins for the CircuitPython modules the board scripts
+# import (board, neopixel, audiobusio, digitalio, adafruit_debouncer,
+# keypad, microcontroller; displayio, terminalio, adafruit_display_text,
+# wifi, socketpool, adafruit_requests and secrets for the weather displays).
+# run() puts them first on sys.path, then the script's own directory, and
+# execs a script against them until the time limit, then hands back the
+# script's globals for inspection.
+#
+#   import sim
+#   g = sim.run("Final.py", seconds=5, presses=[(1.0, 0.1)])
+#   g["frame_ticker"].recent()
+#
+# realtime=False runs on a virtual clock instead: every sleep (asyncio or
+# blocking, e.g. wire time in show()) just moves the clock forward, so runs
+# finish as fast as the host can compute them and repeat exactly with the
+# same seed. Compute time isn't charged, so use real time for jitter work.
+# python3 -m sim --help for the command line.
+
+import os
+import re
+import sys
+import time
+import math
+import array
+import random
+import types
+import asyncio
+import selectors
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HW_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hw")
+
+
+class SimulationDone(BaseException):
+    """
+    Raised from inside a stand-in once the run limit is reached. Not an
+    Exception, so a script's `except Exception` retry loop doesn't catch it.
+    """
+
+
+class RealClock:
+    def __init__(self):
+        self.start = time.monotonic()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Starts at EPOCH, the same every run (and not zero, which nothing on a
+    board ever sees), and only moves on sleep(): float rounding in anything
+    computed from the clock repeats exactly, whatever the host's uptime.
+    """
+
+    EPOCH = 1000.0
+
+    def __init__(self):
+        self.now = self.EPOCH
+        self.start = self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+
+class _State:
+    def __init__(self):
+        self.clock = RealClock()
+        self.seconds = None     # run limit, None = forever
+        self.presses = ()       # button timeline: (t_down, hold_seconds), from start
+        self.audio = None       # source the PDMIn stand-in reads from
+        self.strips = []        # every NeoPixel created this run
+        self.trace = None       # frametrace.TraceWriter, opened on the first show()
+        self.trace_file = None
+        self.nvm_file = None    # file behind microcontroller.nvm, None = memory only
+
+
+state = _State()
+
+
+def install():
+    for p in (ROOT, HW_DIR):
+        if p not in sys.path:
+            sys.path.insert(0, p)
+
+
+def elapsed():
+    return state.clock.monotonic() - state.clock.start
+
+
+def check():
+    """Stand-ins call this on every hardware access; ends the run on time."""
+    if state.seconds is not None and elapsed() >= state.seconds:
+        raise SimulationDone()
+
+
+def button_down(t=None):
+    """Whether the scripted button is held at `t` seconds from start (default now)."""
+    if t is None:
+        t = elapsed()
+    for start, hold in state.presses:
+        if start <= t < start + hold:
+            return True
+    return False
+
+
+def traced_show(strip):
+    """NeoPixel stand-in hook: append the strip's output to the trace, if any."""
+    if state.trace_file is None:
+        return
+    if state.trace is None:
+        import frametrace
+        state.trace = frametrace.TraceWriter(open(state.trace_file, "wb"),
+                                             [(s.n, s.bpp) for s in state.strips])
+    state.trace.pixels(elapsed(), state.strips.index(strip), strip.output())
+
+
+class SyntheticAudio:
+    """
+    Noise floor plus decaying tone bursts at a fixed tempo, around mid-scale.
+    Positioned by simulated time like a real mic, so the gaps between
+    captures drop audio instead of slowing the tempo down.
+    """
+
+    def __init__(self, bpm=120, noise=40, burst=6000, seed=1):
+        self.beat = int(60.0 / bpm * 16000)
+        self.noise = noise
+        self.burst = burst
+        self.pos = 0
+        self.rng = random.Random(seed)
+
+    def fill(self, buf, n, sample_rate=16000):
+        rng = self.rng
+        self.pos = int(elapsed() * sample_rate)
+        for i in range(n):
+            k = (self.pos + i) % self.beat
+            amp = self.burst * math.exp(-k / (0.04 * sample_rate))
+            v = 32768 + amp * math.sin(k * 0.07) + rng.randint(-self.noise, self.noise)
+            buf[i] = max(0, min(65535, int(v)))
+        self.pos += n
+
+
+class WavAudio:
+    """
+    16-bit PCM WAV file as mic input (first channel), resampled linearly to
+    the capture rate and positioned by simulated time. Past the end it loops
+    or goes quiet; duration (seconds) is what run() uses as its default limit.
+    """
+
+    def __init__(self, path, sample_rate=16000, loop=False, gain=1.0):
+        import wave
+        with wave.open(path, "rb") as w:
+            if w.getsampwidth() != 2:
+                raise ValueError(path + ": need 16-bit PCM")
+            channels = w.getnchannels()
+            rate = w.getframerate()
+            pcm = array.array("h", w.readframes(w.getnframes()))[::channels]
+        if sys.byteorder == "big":
+            pcm.byteswap()
+        self.sample_rate = sample_rate
+        self.loop = loop
+        n = int(len(pcm) * sample_rate / rate)
+        self.samples = array.array("H", bytes(2 * n))
+        step = rate / sample_rate
+        last = len(pcm) - 1
+        for i in range(n):
+            x = i * step
+            j = int(x)
+            f = x - j
+            v = pcm[j] if j >= last else pcm[j] + (pcm[j + 1] - pcm[j]) * f
+            self.samples[i] = max(0, min(65535, int(32768 + v * gain)))
+        self.duration = n / sample_rate
+
+    def fill(self, buf, n, sample_rate=16000):
+        src = self.samples
+        total = len(src)
+        pos = int(elapsed() * sample_rate)
+        for i in range(n):
+            k = pos + i
+            if k >= total:
+                if not self.loop or not total:
+                    buf[i] = 32768
+                    continue
+                k %= total
+            buf[i] = src[k]
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Polls real fds without blocking and turns the wait into a clock jump."""
+
+    def __init__(self, clock):
+        super().__init__()
+        self._clock = clock
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if not events:
+            if timeout is None:
+                raise RuntimeError("simulation stalled: nothing scheduled")
+            self._clock.sleep(timeout)
+        return events
+
+
+class _VirtualLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock):
+        super().__init__(_VirtualSelector(clock))
+        self._clock = clock
+
+    def time(self):
+        return self._clock.monotonic()
+
+
+class _VirtualPolicy(asyncio.DefaultEventLoopPolicy):
+    def __init__(self, clock):
+        super().__init__()
+        self._clock = clock
+
+    def new_event_loop(self):
+        return _VirtualLoop(self._clock)
+
+
+def _time_module(clock):
+    """A `time` module whose clock and sleep are the virtual ones."""
+    m = types.ModuleType("time")
+    m.__dict__.update(time.__dict__)
+    m.monotonic = clock.monotonic
+    m.monotonic_ns = lambda: int(clock.monotonic() * 1000000000)
+    m.perf_counter = clock.monotonic
+    m.sleep = clock.sleep
+    return m
+
+
+def _forget_board_modules(dirs):
+    # Reimport the script's modules every run: fresh state, and they bind
+    # whichever `time` this run uses
+    for name, mod in list(sys.modules.items()):
+        path = getattr(mod, "__file__", None)
+        if path and os.path.dirname(os.path.abspath(path)) in dirs:
+            del sys.modules[name]
+
+
+def configure(source, config):
+    """Replace top-level `NAME = ...` assignments in a script's source."""
+    for name, value in config.items():
+        pattern = re.compile(r"^" + re.escape(name) + r"\s*=.*$", re.M)
+        source, n = pattern.subn(lambda m: "%s = %r" % (name, value), source, count=1)
+        if not n:
+            raise KeyError("no top-level %s in the script" % name)
+    return source
+
+
+def run(script="Final.py", seconds=5.0, presses=(), audio=None, quiet=True,
+        realtime=True, trace=None, seed=None, config=None, nvm=None):
+    """
+    seconds: simulated run length; None runs to the end of a WavAudio source.
+    trace: path for a frametrace file of every pixel push.
+    seed: seeds `random` first so sparkle-style modes repeat exactly.
+    config: {NAME: value} overriding the script's top-level constants.
+    nvm: file standing in for microcontroller.nvm, kept between runs.
+    """
+    install()
+    path = script if os.path.isabs(script) else os.path.join(ROOT, script)
+    state.__init__()
+    clock = RealClock() if realtime else VirtualClock()
+    state.audio = audio or SyntheticAudio()
+    if seconds is None:
+        seconds = getattr(state.audio, "duration", None)
+    state.seconds = seconds
+    state.presses = tuple(presses)
+    state.trace_file = trace
+    state.nvm_file = nvm
+    if seed is not None:
+        random.seed(seed)
+
+    # Modules next to the script (e.g. IconWeather's icons.py), after the stand-ins
+    script_dir = os.path.dirname(path)
+    if script_dir not in sys.path:
+        sys.path.insert(sys.path.index(ROOT) + 1, script_dir)
+    hw_dirs = (HW_DIR, os.path.join(HW_DIR, "adafruit_display_text"))
+    _forget_board_modules((ROOT, script_dir) + hw_dirs)
+    saved_time = sys.modules["time"]
+    saved_policy = asyncio.get_event_loop_policy()
+    if not realtime:
+        sys.modules["time"] = _time_module(clock)
+        asyncio.set_event_loop_policy(_VirtualPolicy(clock))
+
+    g = {"__name__": "__main__", "__file__": path}
+    with open(path) as f:
+        source = f.read()
+    if config:
+        source = configure(source, config)
+    code = compile(source, path, "exec")
+    out = sys.stdout
+    if quiet:
+        sys.stdout = open(os.devnull, "w")
+    clock.start = clock.monotonic()
+    state.clock = clock
+    try:
+        exec(code, g)
+    except SimulationDone:
+        pass
+    finally:
+        if quiet:
+            sys.stdout.close()
+            sys.stdout = out
+        sys.modules["time"] = saved_time
+        asyncio.set_event_loop_policy(saved_policy)
+        if state.trace is not None:
+            state.trace.close()
+    return g
@@ -0,0 +1,76 @@
+# python3 -m sim [options]: run Final.py (or another board script) headless.
+#
+#   python3 -m sim --wav song.wav --trace song.ltrc          # whole song, fast
+#   python3 -m sim --seconds 10 --bpm 128 --press 2 --press 4 --realtime
+#   python3 -m sim --wav song.wav --set ATTACK=0.4 --set PUNCH_BOOST=5.0
+#
+# Prints how much simulated time ran, how long it took and what was shown.
+
+import ast
+import sys
+import time
+import argparse
+
+import sim
+
+
+def press(text):
+    t, _, hold = text.partition(":")
+    return float(t), float(hold) if hold else 0.05
+
+
+def setting(text):
+    name, _, value = text.partition("=")
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        pass  # bare words stay strings
+    return name.strip(), value
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python3 -m sim", description="Headless simulator for the LED scripts.")
+    p.add_argument("--script", default="Final.py", help="board script to run (default Final.py)")
+    p.add_argument("--seconds", type=float, help="simulated run length (default: the WAV's length, else 5)")
+    p.add_argument("--wav", help="16-bit PCM WAV to feed the mic")
+    p.add_argument("--loop", action="store_true", help="loop the WAV instead of going quiet at the end")
+    p.add_argument("--gain", type=float, default=1.0, help="scale WAV samples before they reach the mic")
+    p.add_argument("--bpm", type=float, default=120.0, help="tempo of the synthetic input when there's no WAV")
+    p.add_argument("--press", type=press, action="append", default=[], metavar="T[:HOLD]",
+                   help="button press at T seconds, held HOLD seconds (repeatable)")
+    p.add_argument("--realtime", action="store_true", help="run on the wall clock instead of as fast as possible")
+    p.add_argument("--trace", help="write every pixel push to this frametrace file")
+    p.add_argument("--nvm", help="file standing in for microcontroller.nvm (calibration persists in it between runs)")
+    p.add_argument("--set", type=setting, action="append", default=[], metavar="NAME=VALUE",
+                   help="override a top-level constant in the script, e.g. --set ATTACK=0.4 (repeatable)")
+    p.add_argument("--seed", type=int, default=1, help="random seed (default 1)")
+    p.add_argument("--verbose", action="store_true", help="let the script's prints through")
+    args = p.parse_args(argv)
+
+    if args.wav:
+        audio = sim.WavAudio(args.wav, loop=args.loop, gain=args.gain)
+        seconds = args.seconds if args.seconds is not None else (None if not args.loop else 5.0)
+    else:
+        audio = sim.SyntheticAudio(bpm=args.bpm)
+        seconds = args.seconds if args.seconds is not None else 5.0
+
+    wall = time.monotonic()
+    g = sim.run(args.script, seconds=seconds, presses=args.press, audio=audio,
+                quiet=not args.verbose, realtime=args.realtime, trace=args.trace, seed=args.seed,
+                config=dict(args.set), nvm=args.nvm)
+    wall = time.monotonic() - wall
+
+    ran = sim.elapsed()
+    shows = sum(s.shows for s in sim.state.strips)
+    print("%.2f s simulated in %.2f s wall (%.1fx)" % (ran, wall, ran / wall if wall > 0 else 0.0))
+    print("%d strip pushes across %d strips" % (shows, len(sim.state.strips)))
+    names = g.get("MODE_NAMES")
+    if names is not None and "mode" in g:
+        print("final mode:", names[g["mode"]])
+    if sim.state.trace is not None:
+        print("trace: %s (%d records)" % (args.trace, sim.state.trace.records))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
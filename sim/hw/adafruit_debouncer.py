@@ -0,0 +1,38 @@
+# Stand-in for adafruit_debouncer.Debouncer (same update/value/fell/rose API).
+
+import time
+
+
+class Debouncer:
+    def __init__(self, io_or_predicate, interval=0.010):
+        if callable(io_or_predicate):
+            self._read = io_or_predicate
+        else:
+            self._read = lambda: io_or_predicate.value
+        self.interval = interval
+        self._state = bool(self._read())
+        self._prev = self._state
+        self._raw = self._state
+        self._since = time.monotonic()
+
+    def update(self):
+        self._prev = self._state
+        raw = bool(self._read())
+        now = time.monotonic()
+        if raw != self._raw:
+            self._raw = raw
+            self._since = now
+        elif raw != self._state and now - self._since >= self.interval:
+            self._state = raw
+
+    @property
+    def value(self):
+        return self._state
+
+    @property
+    def rose(self):
+        return self._state and not self._prev
+
+    @property
+    def fell(self):
+        return self._prev and not self._state
@@ -0,0 +1 @@
+# Stand-in for the adafruit_display_text library: bitmap_label.Label.
@@ -0,0 +1,113 @@
+# Stand-in for adafruit_display_text.bitmap_label.Label: a displayio Group
+# the size of its text, that counts renders. As in the library, setting
+# `text` or `scale` renders the whole label bitmap again, even when the
+# value is the same; color and position changes only mark it dirty.
+# Glyph advances come from the font, so sizes match what the board
+# computes.
+
+import displayio
+
+
+class Label(displayio.Group):
+    def __init__(self, font, *, text="", color=0xFFFFFF, background_color=None, scale=1,
+                 anchor_point=None, anchored_position=None, x=0, y=0, **kwargs):
+        super().__init__(scale=scale, x=x, y=y)
+        self.font = font
+        self.background_color = background_color
+        self._color = color
+        self._anchor_point = anchor_point
+        self._anchored_position = anchored_position
+        self._text = ""
+        self._w = 0
+        self._h = 0
+        self.renders = 0            # label bitmaps rendered
+        self.rendered_pixels = 0    # ... their pixels, unscaled
+        self._render(str(text), scale)
+
+    def _size(self, text):
+        if not text:
+            return 0, 0
+        lines = text.split("\n")
+        w = 0
+        for line in lines:
+            lw = 0
+            for c in line:
+                g = self.font.get_glyph(ord(c))
+                if g is not None:
+                    lw += g.shift_x
+            w = max(w, lw)
+        return w, len(lines) * self.font.get_bounding_box()[1]
+
+    def _local(self):
+        if self.hidden or not self._w:
+            return None
+        s = self._scale
+        return self._x, self._y, self._w * s, self._h * s
+
+    def _place(self):
+        if self._anchor_point is not None and self._anchored_position is not None:
+            s = self._scale
+            self._x = int(round(self._anchored_position[0] - self._anchor_point[0] * self._w * s))
+            self._y = int(round(self._anchored_position[1] - self._anchor_point[1] * self._h * s))
+
+    def _render(self, text, scale):
+        before = self._changing()
+        self._text = text
+        self._scale = scale
+        self._w, self._h = self._size(text)
+        self.renders += 1
+        self.rendered_pixels += self._w * self._h
+        self._place()
+        self._changed(before)
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, new_text):
+        self._render(str(new_text), self._scale)
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @scale.setter
+    def scale(self, new_scale):
+        self._render(self._text, new_scale)
+
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, new_color):
+        before = self._changing()
+        self._color = new_color
+        self._changed(before)
+
+    @property
+    def anchor_point(self):
+        return self._anchor_point
+
+    @anchor_point.setter
+    def anchor_point(self, new_anchor_point):
+        before = self._changing()
+        self._anchor_point = new_anchor_point
+        self._place()
+        self._changed(before)
+
+    @property
+    def anchored_position(self):
+        return self._anchored_position
+
+    @anchored_position.setter
+    def anchored_position(self, new_position):
+        before = self._changing()
+        self._anchored_position = new_position
+        self._place()
+        self._changed(before)
+
+    @property
+    def bounding_box(self):
+        return 0, 0, self._w, self._h
@@ -0,0 +1,70 @@
+# Stand-in for adafruit_requests over the host's http.client, for running
+# the weather code against a local server. Same Session / Response surface
+# the board scripts use: get(url, headers=, timeout=), status_code, headers
+# (names lower-cased, as adafruit_requests has them), content, text, json(),
+# iter_content(), close(). The socket pool and SSL context are ignored.
+
+import json as _json
+import http.client
+from urllib.parse import urlsplit
+
+import sim
+
+
+class Response:
+    def __init__(self, conn, resp):
+        self._conn = conn
+        self._resp = resp
+        self.status_code = resp.status
+        self.reason = resp.reason.encode()
+        self.headers = {k.lower(): v for k, v in resp.getheaders()}
+        self._content = None
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = self._resp.read()
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return _json.loads(self.content)
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        while True:
+            chunk = self._resp.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        self._conn.close()
+
+
+class Session:
+    def __init__(self, socket_pool=None, ssl_context=None):
+        self.requests = 0
+
+    def request(self, method, url, data=None, json=None, headers=None, timeout=60):
+        sim.check()
+        parts = urlsplit(url)
+        cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        conn = cls(parts.hostname, parts.port, timeout=timeout)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        if json is not None:
+            data = _json.dumps(json)
+            headers = dict(headers or {}, **{"Content-Type": "application/json"})
+        conn.request(method, path, body=data, headers=headers or {})
+        self.requests += 1
+        return Response(conn, conn.getresponse())
+
+    def get(self, url, **kw):
+        return self.request("GET", url, **kw)
+
+    def post(self, url, **kw):
+        return self.request("POST", url, **kw)
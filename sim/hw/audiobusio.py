@@ -0,0 +1,22 @@
+# Stand-in for audiobusio.PDMIn: reads from sim.state.audio and blocks for
+# as long as the real capture would take.
+
+import time
+
+import sim
+
+
+class PDMIn:
+    def __init__(self, clock_pin, data_pin, *, sample_rate=16000, bit_depth=8,
+                 mono=True, oversample=64, startup_delay=0.11):
+        self.sample_rate = sample_rate
+        self.bit_depth = bit_depth
+
+    def record(self, destination, destination_length):
+        sim.check()
+        sim.state.audio.fill(destination, destination_length, self.sample_rate)
+        time.sleep(destination_length / self.sample_rate)
+        return destination_length
+
+    def deinit(self):
+        pass
@@ -0,0 +1,22 @@
+# Stand-in for the CircuitPython board module: any pin name is a Pin, and
+# DISPLAY is a displayio.Display the size of the Feather ESP32-S3 TFT's.
+
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return "board." + self.name
+
+
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    if name == "DISPLAY":
+        import displayio
+        globals()[name] = displayio.Display(240, 135)
+        return globals()[name]
+    pin = Pin(name)
+    globals()[name] = pin
+    return pin
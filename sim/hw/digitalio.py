@@ -0,0 +1,49 @@
+# Stand-in for digitalio. Inputs follow the scripted button timeline in
+# sim.state.presses (pressed = pulled low).
+
+import sim
+
+
+class Direction:
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+
+class Pull:
+    UP = "UP"
+    DOWN = "DOWN"
+
+
+class DriveMode:
+    PUSH_PULL = "PUSH_PULL"
+    OPEN_DRAIN = "OPEN_DRAIN"
+
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self.pull = None
+        self._out = False
+
+    @property
+    def value(self):
+        sim.check()
+        if self.direction == Direction.OUTPUT:
+            return self._out
+        return not sim.button_down()
+
+    @value.setter
+    def value(self, v):
+        self._out = bool(v)
+
+    def switch_to_input(self, pull=None):
+        self.direction = Direction.INPUT
+        self.pull = pull
+
+    def switch_to_output(self, value=False, drive_mode=DriveMode.PUSH_PULL):
+        self.direction = Direction.OUTPUT
+        self._out = value
+
+    def deinit(self):
+        pass
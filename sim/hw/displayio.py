@@ -0,0 +1,339 @@
+# Stand-in for displayio: Group, Bitmap, Palette, ColorConverter,
+# TileGrid, OnDiskBitmap and the board's Display, keeping count of what
+# the panel would be sent instead of drawing anything.
+#
+# A change to something on the display (a TileGrid's tile or position, a
+# child added to or removed from a Group, a label's text) marks the area it
+# covered before and after dirty, per object, as displayio does. refresh()
+# "sends" the dirty areas, clipped to the screen, at 2 bytes a pixel
+# (RGB565), and clears them. With auto_refresh on the display refreshes
+# after every change: the most a real one would, since it refreshes in the
+# background up to 60 times a second and changes close together can share
+# a refresh.
+
+import struct
+
+import sim
+
+
+def _union(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return x0, y0, x1 - x0, y1 - y0
+
+
+class _Node:
+    """Something that can sit in a Group: knows its parent and its area."""
+
+    __slots__ = ()
+    _parent = None
+
+    def _local(self):
+        """(x, y, w, h) in the parent's coordinates, None if it covers nothing."""
+        return None
+
+    def _screen(self):
+        rect = self._local()
+        p = self._parent
+        while p is not None and rect is not None:
+            if p.hidden:
+                return None
+            s = p.scale
+            rect = (p.x + rect[0] * s, p.y + rect[1] * s, rect[2] * s, rect[3] * s)
+            p = p._parent
+        return rect
+
+    def _display(self):
+        node = self
+        while node._parent is not None:
+            node = node._parent
+        return getattr(node, "_shown_on", None)
+
+    def _changing(self):
+        """Call before a change: returns a token for _changed()."""
+        return self._screen()
+
+    def _changed(self, before):
+        display = self._display()
+        if display is not None:
+            display._dirty(self, _union(before, self._screen()))
+
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self._pixels = bytearray(width * height)
+
+    def __getitem__(self, xy):
+        if isinstance(xy, tuple):
+            xy = xy[1] * self.width + xy[0]
+        return self._pixels[xy]
+
+    def __setitem__(self, xy, value):
+        if isinstance(xy, tuple):
+            xy = xy[1] * self.width + xy[0]
+        self._pixels[xy] = value
+
+    def fill(self, value):
+        for i in range(len(self._pixels)):
+            self._pixels[i] = value
+
+
+class Palette:
+    def __init__(self, color_count):
+        self._colors = [0] * color_count
+        self._transparent = set()
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, color):
+        self._colors[index] = color
+
+    def make_transparent(self, index):
+        self._transparent.add(index)
+
+    def make_opaque(self, index):
+        self._transparent.discard(index)
+
+
+class ColorConverter:
+    def __init__(self, *, input_colorspace=None, dither=False):
+        self.dither = dither
+
+
+class OnDiskBitmap:
+    """Reads just the BMP header: size, and a Palette for indexed files."""
+
+    def __init__(self, file):
+        if isinstance(file, str):
+            with open(file, "rb") as f:
+                data = f.read(1078)
+        else:
+            data = file.read(1078)
+        if data[:2] != b"BM":
+            raise ValueError("Invalid BMP file")
+        header = struct.unpack_from("<I", data, 14)[0]
+        width, height, planes, bits = struct.unpack_from("<iiHH", data, 18)
+        self.width = width
+        self.height = abs(height)
+        if bits <= 8:
+            colors = struct.unpack_from("<I", data, 46)[0] or (1 << bits)
+            self.pixel_shader = Palette(colors)
+            for i in range(colors):
+                b, g, r = data[14 + header + 4 * i:14 + header + 4 * i + 3]
+                self.pixel_shader[i] = (r << 16) | (g << 8) | b
+        else:
+            self.pixel_shader = ColorConverter()
+
+
+class TileGrid(_Node):
+    __slots__ = ("bitmap", "pixel_shader", "width", "height", "tile_width", "tile_height",
+                 "_x", "_y", "_tiles", "hidden", "_parent")
+
+    def __init__(self, bitmap, *, pixel_shader, width=1, height=1, tile_width=None,
+                 tile_height=None, default_tile=0, x=0, y=0):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width or bitmap.width
+        self.tile_height = tile_height or bitmap.height
+        self._x = x
+        self._y = y
+        self._tiles = [default_tile] * (width * height)
+        self.hidden = False
+        self._parent = None
+
+    def _local(self):
+        if self.hidden:
+            return None
+        return self._x, self._y, self.width * self.tile_width, self.height * self.tile_height
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        before = self._changing()
+        self._x = value
+        self._changed(before)
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        before = self._changing()
+        self._y = value
+        self._changed(before)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            index = index[1] * self.width + index[0]
+        return self._tiles[index]
+
+    def __setitem__(self, index, tile):
+        if isinstance(index, tuple):
+            index = index[1] * self.width + index[0]
+        if self._tiles[index] != tile:
+            before = self._changing()
+            self._tiles[index] = tile
+            self._changed(before)
+
+
+class Group(_Node):
+    def __init__(self, *, scale=1, x=0, y=0):
+        self._children = []
+        self._scale = scale
+        self._x = x
+        self._y = y
+        self.hidden = False
+
+    def _local(self):
+        if self.hidden:
+            return None
+        rect = None
+        for child in self._children:
+            rect = _union(rect, child._local())
+        if rect is None:
+            return None
+        s = self._scale
+        return self._x + rect[0] * s, self._y + rect[1] * s, rect[2] * s, rect[3] * s
+
+    def _moved(self, attr, value):
+        before = self._changing()
+        setattr(self, attr, value)
+        self._changed(before)
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._moved("_x", value)
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._moved("_y", value)
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @scale.setter
+    def scale(self, value):
+        self._moved("_scale", value)
+
+    def insert(self, index, layer):
+        if layer._parent is not None:
+            raise ValueError("Layer already in a group")
+        self._children.insert(index, layer)
+        layer._parent = self
+        layer._changed(None)
+
+    def append(self, layer):
+        self.insert(len(self._children), layer)
+
+    def remove(self, layer):
+        self.pop(self._children.index(layer))
+
+    def pop(self, i=-1):
+        layer = self._children[i]
+        before = layer._changing()
+        display = layer._display()
+        del self._children[i]
+        layer._parent = None
+        if display is not None:
+            display._dirty(layer, before)
+        return layer
+
+    def index(self, layer):
+        return self._children.index(layer)
+
+    def __contains__(self, layer):
+        return layer in self._children
+
+    def __len__(self):
+        return len(self._children)
+
+    def __getitem__(self, index):
+        return self._children[index]
+
+    def __iter__(self):
+        return iter(self._children)
+
+
+class Display:
+    """board.DISPLAY: width x height, counting refreshes and what they'd send."""
+
+    def __init__(self, width=240, height=135):
+        self.width = width
+        self.height = height
+        self.auto_refresh = True
+        self.brightness = 1.0
+        self.rotation = 0
+        self._root = None
+        self._areas = {}          # object -> dirty rect, screen coordinates
+        self.changes = 0          # dirty-making changes to what's shown
+        self.refreshes = 0        # refreshes that sent something
+        self.pixels = 0           # pixels sent, all refreshes
+        self.bytes = 0            # ... at 2 bytes a pixel
+
+    @property
+    def root_group(self):
+        return self._root
+
+    @root_group.setter
+    def root_group(self, group):
+        if self._root is not None:
+            self._root._shown_on = None
+        self._root = group
+        self._areas = {}
+        if group is not None:
+            group._shown_on = self
+            self._areas[group] = (0, 0, self.width, self.height)
+        if self.auto_refresh:
+            self._send()
+
+    def _dirty(self, node, rect):
+        if rect is None:
+            return
+        self.changes += 1
+        self._areas[node] = _union(self._areas.get(node), rect)
+        if self.auto_refresh:
+            self._send()
+
+    def _send(self):
+        if not self._areas:
+            return False
+        for x, y, w, h in self._areas.values():
+            x0, y0 = max(0, int(x)), max(0, int(y))
+            x1, y1 = min(self.width, int(x + w)), min(self.height, int(y + h))
+            if x1 > x0 and y1 > y0:
+                self.pixels += (x1 - x0) * (y1 - y0)
+        self.bytes = self.pixels * 2
+        self._areas = {}
+        self.refreshes += 1
+        return True
+
+    def refresh(self, *, target_frames_per_second=None, minimum_frames_per_second=0):
+        sim.check()
+        self._send()
+        return True
@@ -0,0 +1,98 @@
+# Stand-in for keypad: Keys, Event and EventQueue. Key 0 follows the
+# scripted button timeline in sim.state.presses. Keys "scans" every
+# `interval` from creation, as the background scan on the board does, and
+# queues an event stamped with the scan that saw the change, so presses
+# shorter than a scan can be missed there too. The scan catches up
+# whenever the queue is read.
+
+import sim
+
+TICKS_MASK = (1 << 29) - 1
+
+
+def _ticks(t):
+    """supervisor.ticks_ms()-style stamp for `t` seconds into the run."""
+    return int((sim.state.clock.start + t) * 1000) & TICKS_MASK
+
+
+class Event:
+    def __init__(self, key_number=0, pressed=True):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = 0
+
+    @property
+    def released(self):
+        return not self.pressed
+
+    def __repr__(self):
+        return "<Event: key_number %d %s>" % (self.key_number, "pressed" if self.pressed else "released")
+
+
+class EventQueue:
+    def __init__(self, keys, max_events):
+        self._keys = keys
+        self._max = max_events
+        self._queue = []
+        self._overflowed = False
+
+    @property
+    def overflowed(self):
+        """Read-only, as on the board: clear() resets it."""
+        return self._overflowed
+
+    def _put(self, key_number, pressed, timestamp):
+        if len(self._queue) >= self._max:
+            self._overflowed = True
+            return
+        self._queue.append((key_number, pressed, timestamp))
+
+    def get_into(self, event):
+        sim.check()
+        self._keys._scan()
+        if not self._queue:
+            return False
+        event.key_number, event.pressed, event.timestamp = self._queue.pop(0)
+        return True
+
+    def get(self):
+        event = Event()
+        return event if self.get_into(event) else None
+
+    def clear(self):
+        self._queue = []
+        self._overflowed = False
+
+    def __len__(self):
+        self._keys._scan()
+        return len(self._queue)
+
+    def __bool__(self):
+        return len(self) > 0
+
+
+class Keys:
+    def __init__(self, pins, *, value_when_pressed, pull=True, interval=0.020, max_events=64):
+        self.key_count = len(pins)
+        self.interval = interval
+        self._scanned = sim.elapsed()
+        self._down = False
+        self.events = EventQueue(self, max_events)
+
+    def _scan(self):
+        now = sim.elapsed()
+        t = self._scanned + self.interval
+        while t <= now:
+            down = sim.button_down(t)
+            if down != self._down:
+                self._down = down
+                self.events._put(0, down, _ticks(t))
+            self._scanned = t
+            t += self.interval
+
+    def reset(self):
+        self._scan()
+        self._down = False
+
+    def deinit(self):
+        pass
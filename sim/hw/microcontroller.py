@@ -0,0 +1,37 @@
+# Stand-in for microcontroller: just nvm, as a byte array backed by a file
+# (sim.run(nvm=path), python3 -m sim --nvm PATH) that keeps its contents
+# between runs, or by memory when no file is given. Erased bytes are 0xFF,
+# as on flash. Every slice write goes straight to the file.
+
+import os
+
+import sim
+
+NVM_SIZE = 8192
+
+
+class NVM:
+    def __init__(self, path=None, size=NVM_SIZE):
+        self.path = path
+        self.writes = 0
+        self._buf = bytearray(b"\xff" * size)
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read(size)
+            self._buf[:len(data)] = data
+
+    def __len__(self):
+        return len(self._buf)
+
+    def __getitem__(self, index):
+        return self._buf[index]
+
+    def __setitem__(self, index, value):
+        self._buf[index] = value
+        self.writes += 1
+        if self.path:
+            with open(self.path, "wb") as f:
+                f.write(self._buf)
+
+
+nvm = NVM(sim.state.nvm_file)
@@ -0,0 +1,91 @@
+# Stand-in for neopixel.NeoPixel. Keeps an RGB byte buffer, accepts the same
+# item / slice / flat-slice writes as CircuitPython's PixelBuf, and blocks in
+# show() for the time the data would take on the wire (800 kHz + latch).
+# Every show() is appended to the run's frame trace when one is open.
+
+import time
+
+import sim
+
+RGB = "RGB"
+GRB = "GRB"
+RGBW = "RGBW"
+GRBW = "GRBW"
+
+WIRE_SECONDS_PER_BYTE = 8 / 800000
+LATCH_SECONDS = 0.00008
+
+
+class NeoPixel:
+    def __init__(self, pin, n, *, bpp=3, brightness=1.0, auto_write=True, pixel_order=None):
+        self.pin = pin
+        self.n = n
+        self.bpp = len(pixel_order) if pixel_order else bpp
+        self.byteorder = pixel_order or (GRB if self.bpp == 3 else GRBW)
+        self.brightness = brightness
+        self.auto_write = auto_write
+        self.buf = bytearray(n * self.bpp)
+        self.shows = 0
+        sim.state.strips.append(self)
+
+    def __len__(self):
+        return self.n
+
+    def _put(self, i, color):
+        o = i * self.bpp
+        if isinstance(color, int):
+            color = ((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF)
+        for c in range(self.bpp):
+            self.buf[o + c] = color[c] if c < len(color) else 0
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            idx = range(self.n)[index]
+            if len(value) == len(idx) * self.bpp and idx.step == 1:
+                self.buf[idx.start * self.bpp:idx.stop * self.bpp] = value
+            elif len(value) == len(idx) * self.bpp:
+                bpp = self.bpp
+                for j, i in enumerate(idx):
+                    self.buf[i * bpp:i * bpp + bpp] = bytes(value[j * bpp:j * bpp + bpp])
+            elif len(value) == len(idx):
+                for j, i in enumerate(idx):
+                    self._put(i, value[j])
+            else:
+                raise ValueError("Unmatched number of items on RHS")
+        else:
+            if index < 0:
+                index += self.n
+            self._put(index, value)
+        if self.auto_write:
+            self.show()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(self.n)[index]]
+        o = index * self.bpp
+        return tuple(self.buf[o:o + self.bpp])
+
+    def fill(self, color):
+        auto = self.auto_write
+        self.auto_write = False
+        for i in range(self.n):
+            self._put(i, color)
+        self.auto_write = auto
+        if auto:
+            self.show()
+
+    def output(self):
+        """Bytes as they'd leave the pin, brightness applied (RGB order)."""
+        if self.brightness >= 1.0:
+            return bytes(self.buf)
+        b = self.brightness
+        return bytes(int(v * b) for v in self.buf)
+
+    def show(self):
+        sim.check()
+        self.shows += 1
+        sim.traced_show(self)
+        time.sleep(len(self.buf) * WIRE_SECONDS_PER_BYTE + LATCH_SECONDS)
+
+    def deinit(self):
+        pass
@@ -0,0 +1,7 @@
+# Stand-in for socketpool: the SocketPool adafruit_requests.Session is
+# handed; the stand-in Session doesn't use it.
+
+
+class SocketPool:
+    def __init__(self, radio):
+        self.radio = radio
@@ -0,0 +1,36 @@
+# Stand-in for terminalio: FONT, the built-in 6x12 monospaced font, with
+# glyphs for printable ASCII and Latin-1.
+
+
+class Glyph:
+    def __init__(self, bitmap, tile_index, width, height, dx, dy, shift_x, shift_y):
+        self.bitmap = bitmap
+        self.tile_index = tile_index
+        self.width = width
+        self.height = height
+        self.dx = dx
+        self.dy = dy
+        self.shift_x = shift_x
+        self.shift_y = shift_y
+
+
+class BuiltinFont:
+    def __init__(self, width=6, height=12):
+        self.width = width
+        self.height = height
+        self._glyphs = {}
+
+    def get_bounding_box(self):
+        return self.width, self.height
+
+    def get_glyph(self, codepoint):
+        if not (32 <= codepoint <= 126 or 160 <= codepoint <= 255):
+            return None
+        g = self._glyphs.get(codepoint)
+        if g is None:
+            g = Glyph(None, codepoint, self.width, self.height, 0, 0, self.width, 0)
+            self._glyphs[codepoint] = g
+        return g
+
+
+FONT = BuiltinFont()
@@ -0,0 +1,231 @@
+# Spectral band analysis over the capture buffer.
+# Hann-windowed FFT (pure-Python radix-2 on the board, numpy on a host; ulab
+# on request: its fft and array math return new arrays every capture, where
+# PyFFT reuses its own, so it isn't the default under the GC), magnitudes summed over log-spaced bands (wider bands up top make
+# up for music's falling high end). Each band rides its
+# own slowly-decaying peak so bass doesn't drown out treble (but never below
+# a fraction of the loudest band, so leakage next to a lone tone stays dark),
+# then goes through its own attack/release envelope. bands[0] is the lowest.
+# levels holds the same normalized values before the envelope (for onsets).
+
+import math
+import array
+
+try:
+    from ulab import numpy as _ulab_np
+    try:
+        from ulab import utils as _ulab_utils
+    except ImportError:
+        _ulab_utils = None
+except ImportError:
+    _ulab_np = None
+    _ulab_utils = None
+
+try:
+    import numpy as _host_np
+except ImportError:
+    _host_np = None
+
+
+def hann(n):
+    return [0.5 - 0.5 * math.cos(2.0 * math.pi * i / (n - 1)) for i in range(n)]
+
+
+def _bit_reverse(i, bits):
+    r = 0
+    for _ in range(bits):
+        r = (r << 1) | (i & 1)
+        i >>= 1
+    return r
+
+
+class PyFFT:
+    """In-place iterative radix-2 FFT on preallocated float arrays."""
+    name = "python"
+
+    def __init__(self, n):
+        self.n = n
+        bits = n.bit_length() - 1
+        self.rev = array.array("H", [_bit_reverse(i, bits) for i in range(n)])
+        self.cos = array.array("f", [math.cos(2.0 * math.pi * k / n) for k in range(n // 2)])
+        self.sin = array.array("f", [math.sin(2.0 * math.pi * k / n) for k in range(n // 2)])
+        self.window = array.array("f", [w / 32768.0 for w in hann(n)])
+        self.re = array.array("f", [0.0] * n)
+        self.im = array.array("f", [0.0] * n)
+        self.mags = array.array("f", [0.0] * (n // 2))
+
+    def magnitudes(self, buf):
+        n = self.n
+        m = len(buf) if len(buf) < n else n
+        s = 0
+        for i in range(m):
+            s += buf[i]
+        dc = s / m
+        re = self.re
+        im = self.im
+        rev = self.rev
+        win = self.window
+        for i in range(n):
+            j = rev[i]
+            re[j] = (buf[i] - dc) * win[i] if i < m else 0.0
+            im[i] = 0.0
+
+        cos = self.cos
+        sin = self.sin
+        size = 2
+        while size <= n:
+            half = size >> 1
+            step = n // size
+            for start in range(0, n, size):
+                k = 0
+                for a in range(start, start + half):
+                    b = a + half
+                    c = cos[k]
+                    sn = sin[k]
+                    tr = re[b] * c + im[b] * sn
+                    ti = im[b] * c - re[b] * sn
+                    re[b] = re[a] - tr
+                    im[b] = im[a] - ti
+                    re[a] += tr
+                    im[a] += ti
+                    k += step
+            size <<= 1
+
+        mags = self.mags
+        for i in range(n // 2):
+            mags[i] = math.sqrt(re[i] * re[i] + im[i] * im[i])
+        return mags
+
+
+class ArrayFFT:
+    """ulab.numpy or numpy FFT over the raw buffer."""
+
+    def __init__(self, n, np, name, utils=None):
+        self.n = n
+        self.name = name
+        self._np = np
+        self._utils = utils
+        self._float = np.float if name == "ulab" else np.float64
+        self.window = np.array([w / 32768.0 for w in hann(n)])
+
+    def magnitudes(self, buf):
+        np = self._np
+        n = self.n
+        raw = np.frombuffer(buf, dtype=np.uint16)
+        if len(raw) >= n:
+            x = np.array(raw[:n], dtype=self._float)
+            x = x - np.mean(x)
+        else:
+            # DC from the samples only, as PyFFT does; the padding stays 0
+            x = np.zeros(n)
+            x[:len(raw)] = raw - np.mean(raw)
+        x = x * self.window
+        if self._utils is not None:
+            return self._utils.spectrogram(x)
+        if self.name == "numpy":
+            return np.abs(np.fft.rfft(x))
+        re, im = np.fft.fft(x)  # ulab without complex support returns (real, imag)
+        return np.sqrt(re * re + im * im)
+
+
+def available():
+    names = []
+    if _ulab_np is not None:
+        names.append("ulab")
+    if _host_np is not None:
+        names.append("numpy")
+    names.append("python")
+    return names
+
+
+def make_fft(n, backend=None):
+    if n & (n - 1):
+        raise ValueError("FFT size must be a power of two")
+    if backend is None:
+        backend = "numpy" if _host_np is not None else "python"
+    if backend == "ulab" and _ulab_np is not None:
+        return ArrayFFT(n, _ulab_np, "ulab", _ulab_utils)
+    if backend == "numpy" and _host_np is not None:
+        return ArrayFFT(n, _host_np, "numpy")
+    if backend == "python":
+        return PyFFT(n)
+    raise ValueError("FFT backend not available: " + str(backend))
+
+
+def band_edges(n_fft, sample_rate, n_bands, f_min, f_max):
+    """FFT bin boundaries for n_bands log-spaced bands; every band gets >= 1 bin."""
+    top = n_fft // 2
+    edges = []
+    ratio = f_max / f_min
+    for k in range(n_bands + 1):
+        f = f_min * ratio ** (k / n_bands)
+        edges.append(int(f * n_fft / sample_rate + 0.5))
+    edges[0] = max(1, edges[0])
+    for k in range(1, n_bands + 1):
+        if edges[k] <= edges[k - 1]:
+            edges[k] = edges[k - 1] + 1
+    if edges[-1] > top:
+        raise ValueError("too many bands for this FFT size")
+    return edges
+
+
+class SpectrumAnalyzer:
+    def __init__(self, n_fft=256, sample_rate=16000, n_bands=5, f_min=60.0, f_max=6000.0,
+                 attack=0.6, release=0.15, peak_decay=0.995, floor=0.04, relative_floor=0.1,
+                 backend=None):
+        self.fft = make_fft(n_fft, backend)
+        self.n_bands = n_bands
+        self.edges = band_edges(n_fft, sample_rate, n_bands, f_min, f_max)
+        self.attack = attack
+        self.release = release
+        self.peak_decay = peak_decay
+        self.relative_floor = relative_floor
+        # floor is per FFT bin (silence stays dark however wide the band is)
+        self._floors = array.array("f", [floor * (self.edges[k + 1] - self.edges[k])
+                                         for k in range(n_bands)])
+        self.bands = array.array("f", [0.0] * n_bands)
+        self.levels = array.array("f", [0.0] * n_bands)
+        self._peaks = array.array("f", self._floors)
+        self._loudest = 0.0
+
+    def update(self, buf):
+        mags = self.fft.magnitudes(buf)
+        edges = self.edges
+        bands = self.bands
+        levels = self.levels
+        peaks = self._peaks
+        floors = self._floors
+        shared = self._loudest * self.relative_floor
+        loudest = 0.0
+        for k in range(self.n_bands):
+            lo = edges[k]
+            hi = edges[k + 1]
+            m = 0.0
+            for b in range(lo, hi):
+                m += mags[b]
+
+            p = peaks[k] * self.peak_decay
+            if m > p:
+                p = m
+            peaks[k] = p
+            if p > loudest:
+                loudest = p
+            if p < shared:
+                p = shared
+            if p < floors[k]:
+                p = floors[k]
+
+            x = m / p
+            levels[k] = x
+            e = bands[k]
+            if x > e:
+                e += (x - e) * self.attack
+            else:
+                e += (x - e) * self.release
+            bands[k] = e
+        self._loudest = loudest
+
+    def reset(self):
+        for k in range(self.n_bands):
+            self.bands[k] = 0.0
+            self.levels[k] = 0.0
@@ -0,0 +1,201 @@
+# Onset detection and tempo (BPM) tracking.
+# Each audio update yields an onset strength: spectral flux over the band
+# levels when the FFT ran, otherwise log-energy flux of the broadband level.
+# Strengths are spread onto a fixed-rate grid (split between the two nearest
+# slots, since updates don't land on grid times) and kept in a small ring;
+# every grid step refreshes a leaky autocorrelation out to twice the slowest
+# beat period (O(lags) work, fixed memory). Each candidate lag scores its own
+# correlation plus half of its double (so a beat isn't mistaken for every
+# other beat), lightly weighted toward ~120 BPM; the best one, refined to a
+# fraction of a slot, gives the tempo. A phase oscillator runs at that tempo
+# and is steered toward the circular mean of the phases onsets land on
+# (weighted by strength squared, so kicks outvote hats and off-beats half a
+# turn away cancel rather than tug); it's exposed as beat_phase.
+
+import math
+import array
+
+
+def spectral_flux(levels, prev):
+    """Mean per-band rise since the last call; prev is updated in place."""
+    flux = 0.0
+    for k in range(len(levels)):
+        d = levels[k] - prev[k]
+        if d > 0.0:
+            flux += d
+        prev[k] = levels[k]
+    return flux / len(levels)
+
+
+class BeatTracker:
+    def __init__(self, rate=50.0, bpm_min=70.0, bpm_max=180.0, decay=0.995,
+                 prior_bpm=120.0, prior_octaves=1.5, lock=0.1, phase_memory=0.97,
+                 min_confidence=0.2):
+        self.rate = rate
+        self.lag_min = int(60.0 * rate / bpm_max)
+        self.lag_max = int(60.0 * rate / bpm_min + 0.999)
+        self.decay = decay
+        self.lock = lock
+        self.phase_memory = phase_memory
+        self.min_confidence = min_confidence
+
+        # acf[i] holds lag lag_min - 1 + i, out to 2 * lag_max + 2
+        self._lo = self.lag_min - 1
+        n_acf = 2 * self.lag_max + 3 - self._lo
+        self._ring = array.array("f", [0.0] * (2 * self.lag_max + 3))
+        self._pos = 0
+        self._acf = array.array("f", [0.0] * n_acf)
+        self._acf0 = 0.0
+        n_lags = self.lag_max - self.lag_min + 1
+        self._weight = array.array("f", [0.0] * n_lags)
+        for i in range(n_lags):
+            bpm = 60.0 * rate / (self.lag_min + i)
+            octaves = math.log(bpm / prior_bpm) / math.log(2.0) / prior_octaves
+            self._weight[i] = math.exp(-0.5 * octaves * octaves)
+
+        self._mean = 0.0
+        self._cx = 0.0          # leaky onset-weighted phase vector
+        self._cy = 0.0
+        self._t = None          # grid time of the slot being filled
+        self._slot = 0.0        # onset landing in that slot
+        self._next = 0.0        # ... and in the one after it
+        self._last_level = None
+
+        self.bpm = prior_bpm
+        self.confidence = 0.0
+        self.phase = 0.0        # 0..1, 0 = on the beat
+        self.phase_time = 0.0   # time phase was last advanced to
+        self.beats = 0          # bumps every time phase wraps
+        self.onset = 0.0        # last onset strength
+
+    @property
+    def locked(self):
+        return self.confidence >= self.min_confidence
+
+    def level_flux(self, level):
+        """Onset strength from the broadband 0..1 level (log-energy rise)."""
+        lv = math.log(level + 0.0001)
+        prev = self._last_level
+        self._last_level = lv
+        if prev is None or lv < prev:
+            return 0.0
+        return lv - prev
+
+    def reset(self):
+        """Forget timing (audio paused); the learned tempo stays."""
+        self._t = None
+        self._slot = 0.0
+        self._next = 0.0
+        self._last_level = None
+
+    def update(self, onset, now):
+        self.onset = onset
+        if self._t is None:
+            self._t = now
+            self.phase_time = now
+        elif now - self._t > 16.0 / self.rate:
+            # long gap: restart the grid rather than fill it with silence
+            self.reset()
+            self._t = now
+            self.phase_time = now
+
+        period = 1.0 / self.rate
+        stepped = False
+        while now - self._t >= period:
+            self._step(self._slot)
+            self._slot = self._next
+            self._next = 0.0
+            self._t += period
+            stepped = True
+        frac = (now - self._t) * self.rate
+        self._slot += onset * (1.0 - frac)
+        self._next += onset * frac
+        if stepped:
+            self._estimate()
+
+        self._advance(now)
+        self._align(onset)
+
+    def _step(self, o):
+        self._mean += (o - self._mean) * 0.02
+        c = o - self._mean
+
+        ring = self._ring
+        n = len(ring)
+        pos = self._pos
+        ring[pos] = c
+        d = self.decay
+        self._acf0 = self._acf0 * d + c * c
+        acf = self._acf
+        lag = self._lo
+        for i in range(len(acf)):
+            acf[i] = acf[i] * d + c * ring[(pos - lag) % n]
+            lag += 1
+        self._pos = (pos + 1) % n
+
+    def _estimate(self):
+        acf = self._acf
+        w = self._weight
+        lo = self._lo
+        best = 0
+        best_score = None
+        for i in range(len(w)):
+            k = self.lag_min + i - lo               # index of this lag
+            d = 2 * (self.lag_min + i) - lo         # index of its double
+            s = (acf[k - 1] + acf[k] + acf[k + 1]
+                 + 0.5 * (acf[d - 1] + acf[d] + acf[d + 1])) * w[i]
+            if best_score is None or s > best_score:
+                best = i
+                best_score = s
+
+        k = self.lag_min + best - lo
+        peak = acf[k - 1] + acf[k] + acf[k + 1]
+        if self._acf0 <= 0.0 or peak <= 0.0:
+            self.confidence = 0.0
+            return
+        self.confidence = peak / (3.0 * self._acf0)
+
+        # Centre of mass over the peak (it straddles slots) for sub-slot BPM
+        a = k - 2 if k >= 2 else 0
+        b = k + 3 if k + 3 <= len(acf) else len(acf)
+        base = acf[a]
+        for j in range(a, b):
+            if acf[j] < base:
+                base = acf[j]
+        mass = 0.0
+        moment = 0.0
+        for j in range(a, b):
+            m = acf[j] - base
+            mass += m
+            moment += m * (j + lo)
+        if mass > 0.0:
+            self.bpm = 60.0 * self.rate / (moment / mass)
+
+    def _align(self, onset):
+        # Where in the beat onsets have been landing; turn the phase (and the
+        # vector with it) a little toward putting that at 0
+        k = self.phase_memory
+        w = onset * onset
+        a = 2.0 * math.pi * self.phase
+        cx = self._cx * k + w * math.cos(a)
+        cy = self._cy * k + w * math.sin(a)
+        if cx == 0.0 and cy == 0.0:
+            return
+        turn = self.lock * math.atan2(cy, cx)
+        self.phase = (self.phase - turn / (2.0 * math.pi)) % 1.0
+        c = math.cos(turn)
+        s = math.sin(turn)
+        self._cx = cx * c + cy * s
+        self._cy = cy * c - cx * s
+
+    def _advance(self, now):
+        p = self.phase + (now - self.phase_time) * self.bpm / 60.0
+        self.phase_time = now
+        if p >= 1.0:
+            self.beats += int(p)
+            p -= int(p)
+        self.phase = p
+
+    def phase_at(self, now):
+        """Beat phase extrapolated to `now` (for rendering between updates)."""
+        return (self.phase + (now - self.phase_time) * self.bpm / 60.0) % 1.0
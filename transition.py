@@ -0,0 +1,87 @@
+# Crossfade between modes instead of a hard cut through black.
+# The outgoing and incoming modes each render into their own offscreen
+# FrameBuffer (made once, same layout as the output); every frame of the
+# fade the output gets (old * (256 - w) + new * w) >> 8 per byte, w rising
+# 0..256 over `duration`. The bytes are past the output stage already, so
+# nothing is looked up twice. Two uniform fills blend as one pixel and a fill.
+# When it's done the incoming mode goes back to drawing on the output
+# directly and the outgoing one exit()s.
+
+from framebuffer import FrameBuffer
+
+
+class Crossfade:
+    def __init__(self, out, duration=0.4):
+        self.out = out
+        self.duration = duration
+        self.old_fb = FrameBuffer(None, out.layout, out.output)
+        self.new_fb = FrameBuffer(None, out.layout, out.output)
+        self.old = None
+        self.new = None
+        self.t = 0.0
+        self.running = False
+
+    def start(self, old, new):
+        """Fade from `old` (on the output now) to `new`; enters `new`."""
+        if self.running:
+            # Pressed again mid-fade: carry on from what's on the strips now
+            self.old.exit()
+            self.old.fb = self.out
+            old = self.new
+        # The outgoing mode keeps drawing over the last frame shown, so modes
+        # that only draw on entry (OFF, STATIC) still have theirs
+        self.old_fb.copy_from(self.out)
+        old.fb = self.old_fb
+        self.new_fb.fill(0, 0, 0)
+        new.fb = self.new_fb
+        new.enter()
+        self.old = old
+        self.new = new
+        self.t = 0.0
+        self.running = True
+
+    def finish(self):
+        self.out.copy_from(self.new_fb)
+        self.old.exit()
+        self.old.fb = self.out
+        self.new.fb = self.out
+        self.old = None
+        self.new = None
+        self.running = False
+
+    def render(self, features, dt):
+        """One frame of the fade into the output buffer."""
+        self.old.render(features, dt)
+        self.new.render(features, dt)
+        self.t += dt
+        if self.t >= self.duration:
+            self.finish()
+            return
+        w = int(self.t * 256 / self.duration)
+        self.blend(w)
+
+    def blend(self, w):
+        out = self.out
+        a = self.old_fb
+        b = self.new_fb
+        wa = 256 - w
+        ua = a._uniform
+        ub = b._uniform
+        if ua >= 0 and ub >= 0:
+            out.fill_raw(((ua >> 16) * wa + (ub >> 16) * w) >> 8,
+                         (((ua >> 8) & 0xFF) * wa + ((ub >> 8) & 0xFF) * w) >> 8,
+                         ((ua & 0xFF) * wa + (ub & 0xFF) * w) >> 8)
+            return
+        buf = out.buf
+        x = a.buf
+        y = b.buf
+        load = 0
+        for i in range(len(buf)):
+            v = (x[i] * wa + y[i] * w) >> 8
+            buf[i] = v
+            load += v
+        out.load = load
+        dirty = out.dirty
+        for s in range(len(dirty)):
+            dirty[s] = 1
+        out._uniform = -1
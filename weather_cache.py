@@ -0,0 +1,176 @@
+# Last good weather observation, kept on flash, for the weather displays
+# (Testing/IconWeather, Testing/ChineseWeather; copy this file and
+# json_extract.py next to their code.py).
+#
+# At boot load() hands back what was showing before the reset, so the
+# screen has it before Wi-Fi is even up. update() only goes to the network
+# once the observation is older than `fresh` seconds, and then asks
+# conditionally: the ETag / Last-Modified the server sent last time go back
+# as If-None-Match / If-Modified-Since, and a 304 just renews the
+# observation without a body to download or parse. A failed fetch raises
+# and leaves the last good observation in place.
+#
+# The response is never built as a document: read_owm streams it through
+# json_extract in CHUNK_SIZE pieces and keeps only the fields the displays
+# use, which are saved as a small JSON file. CircuitPython's filesystem is
+# read-only to code.py unless boot.py remounts it
+# (storage.remount("/", readonly=False)); without that the cache still
+# works, just in memory for this session.
+#
+# Age across a reset needs the wall clock: once the RTC is set (it is kept
+# over soft reloads on most boards) a saved observation can still count as
+# fresh; without it the first update() after boot always asks the server.
+
+import json
+import time
+
+import json_extract
+
+UPDATED = "updated"              # new observation downloaded
+NOT_MODIFIED = "not modified"    # server said 304: same observation, renewed
+FRESH = "fresh"                  # still within the window, network skipped
+
+CLOCK_VALID_AFTER = 1600000000   # time.time() before this (2020) means the RTC was never set
+CHUNK_SIZE = 64                  # bytes read from the socket at a time
+
+# Observation field -> path in an OpenWeatherMap /weather response
+OWM_FIELDS = (
+    ("name", "name"),
+    ("temp", "main.temp"),
+    ("feels_like", "main.feels_like"),
+    ("id", "weather.0.id"),
+    ("main", "weather.0.main"),
+    ("description", "weather.0.description"),
+    ("icon", "weather.0.icon"),
+    ("dt", "dt"),
+)
+OWM_DEFAULTS = {"name": "", "id": 800, "main": "", "description": "", "icon": "01d", "dt": 0}
+OWM_PATHS = tuple(path for _, path in OWM_FIELDS) + ("cod",)
+
+
+def clock_valid():
+    return time.time() > CLOCK_VALID_AFTER
+
+
+def observation(found):
+    """The fields the displays use, from {path: value} of an OpenWeatherMap /weather response."""
+    cod = found.get("cod", 200)
+    if int(str(cod)) != 200:
+        raise RuntimeError("API error %s" % cod)
+    obs = {}
+    for field, path in OWM_FIELDS:
+        value = found.get(path)
+        obs[field] = OWM_DEFAULTS.get(field) if value is None else value
+    return obs
+
+
+def read_owm(response, chunk_size=CHUNK_SIZE):
+    """Stream the wanted fields out of a response, without parsing the rest."""
+    return observation(json_extract.extract(response.iter_content(chunk_size), OWM_PATHS))
+
+
+def parse_owm(data):
+    """The same from a response already parsed into dicts."""
+    return observation({path: json_extract.lookup(data, path) for path in OWM_PATHS})
+
+
+def _header(headers, name):
+    # adafruit_requests lower-cases header names; other clients may not
+    value = headers.get(name)
+    if value is None:
+        for k in headers:
+            if k.lower() == name:
+                return headers[k]
+    return value
+
+
+class WeatherCache:
+    def __init__(self, path="/weather.json", fresh=600, read=read_owm):
+        self.path = path
+        self.fresh = fresh
+        self.read = read
+        self.observation = None
+        self.fetched = 0          # time.time() of the last good fetch (0 = clock wasn't set)
+        self.etag = None
+        self.last_modified = None
+        self.from_flash = False   # observation came from flash and hasn't been confirmed since
+        self.writable = True
+        self.requests = 0         # network requests made
+        self.not_modified = 0     # ... answered 304
+        self._fetched_mono = None  # time.monotonic() of a fetch this session
+
+    def load(self):
+        """The observation saved last session, or None."""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            self.observation = saved["observation"]
+            self.fetched = saved.get("fetched", 0)
+            self.etag = saved.get("etag")
+            self.last_modified = saved.get("last_modified")
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        self.from_flash = True
+        return self.observation
+
+    def save(self):
+        if not self.writable:
+            return False
+        try:
+            with open(self.path, "w") as f:
+                json.dump({"observation": self.observation, "fetched": self.fetched,
+                           "etag": self.etag, "last_modified": self.last_modified}, f)
+        except OSError as e:
+            # Read-only filesystem (see above): carry on in memory
+            print("Weather cache not saved:", e)
+            self.writable = False
+            return False
+        return True
+
+    def age(self):
+        """Seconds since the observation was fetched or renewed, None if unknown."""
+        if self._fetched_mono is not None:
+            return time.monotonic() - self._fetched_mono
+        if self.fetched and clock_valid():
+            return max(0, time.time() - self.fetched)
+        return None
+
+    def is_fresh(self):
+        age = self.age()
+        return self.observation is not None and age is not None and age < self.fresh
+
+    def update(self, session, url, timeout=10):
+        """
+        Refresh the observation through an adafruit_requests-style session
+        if it's stale: UPDATED, NOT_MODIFIED or FRESH. Raises on a network,
+        HTTP or API error, keeping the last good observation.
+        """
+        if self.is_fresh():
+            return FRESH
+        headers = {}
+        if self.observation is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+        self.requests += 1
+        r = session.get(url, headers=headers, timeout=timeout)
+        try:
+            status = r.status_code
+            if status == 304 and self.observation is not None:
+                self.not_modified += 1
+                result = NOT_MODIFIED
+            elif status == 200:
+                self.observation = self.read(r)
+                self.etag = _header(r.headers, "etag")
+                self.last_modified = _header(r.headers, "last-modified")
+                result = UPDATED
+            else:
+                raise RuntimeError("HTTP %d" % status)
+        finally:
+            r.close()
+        self._fetched_mono = time.monotonic()
+        self.fetched = time.time() if clock_valid() else 0
+        self.from_flash = False
+        self.save()
+        return result